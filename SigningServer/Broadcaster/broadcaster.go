@@ -0,0 +1,356 @@
+package broadcaster
+
+import (
+	"context"
+	"log/slog"
+	"slices"
+	"strings"
+	"sync"
+	"time"
+
+	"github.com/ethereum/go-ethereum/common"
+	"github.com/ethereum/go-ethereum/common/hexutil"
+	"github.com/ethereum/go-ethereum/core/types"
+	"github.com/ethereum/go-ethereum/rpc"
+)
+
+type Status string
+
+const (
+	// waiting behind earlier nonces of the same sender
+	StatusQueued Status = "queued"
+	// accepted by the node, no receipt yet
+	StatusPending  Status = "pending"
+	StatusMined    Status = "mined"
+	StatusReverted Status = "reverted"
+	// rejected by the node
+	StatusFailed Status = "failed"
+)
+
+const (
+	// receipts asked for per JSON-RPC batch
+	maxReceiptBatch = 100
+	sendTimeout     = 10 * time.Second
+)
+
+// Node is the JSON-RPC connection transactions are sent through, satisfied
+// by *rpc.Client.
+type Node interface {
+	CallContext(ctx context.Context, result interface{}, method string, args ...interface{}) error
+	BatchCallContext(ctx context.Context, b []rpc.BatchElem) error
+}
+
+// BumpFunc re-signs tx with the same nonce and fees high enough for the
+// node to accept it as a replacement.
+type BumpFunc func(ctx context.Context, from common.Address, tx *types.Transaction) (*types.Transaction, error)
+
+// TxStatus is what the status endpoint reports for a transaction, looked up
+// by the hash of any of its versions.
+type TxStatus struct {
+	Hash   common.Hash `json:"hash"`
+	Status Status      `json:"status"`
+	Nonce  uint64      `json:"nonce"`
+	// the version that was mined, or the latest one submitted
+	Current      common.Hash `json:"current"`
+	Replacements int         `json:"replacements"`
+	BlockNumber  uint64      `json:"blockNumber,omitempty"`
+	GasUsed      uint64      `json:"gasUsed,omitempty"`
+	Error        string      `json:"error,omitempty"`
+}
+
+type tracked struct {
+	from common.Address
+	// the signed transaction first, then its fee bumped replacements
+	versions     []*types.Transaction
+	status       Status
+	submittedAt  uint64
+	mined        common.Hash
+	blockNumber  uint64
+	gasUsed      uint64
+	err          string
+	finishedTime time.Time
+}
+
+func (t *tracked) latest() *types.Transaction {
+	return t.versions[len(t.versions)-1]
+}
+
+type sender struct {
+	mu      sync.Mutex
+	queue   []*tracked
+	running bool
+}
+
+// Broadcaster submits signed transactions in nonce order per sender, without
+// waiting for earlier ones to be mined, then matches their receipts in bulk
+// on every new head. Transactions left unmined for stuckBlocks are replaced
+// with fee bumped versions.
+type Broadcaster struct {
+	node        Node
+	bump        BumpFunc
+	stuckBlocks uint64
+	// how long finished transactions can still be polled
+	keep    time.Duration
+	logger  *slog.Logger
+	senders sync.Map
+
+	mu       sync.Mutex
+	head     uint64
+	byHash   map[common.Hash]*tracked
+	inFlight map[*tracked]struct{}
+	finished []*tracked
+	queued   int
+}
+
+func NewBroadcaster(node Node, bump BumpFunc, stuckBlocks uint64, keep time.Duration, logger *slog.Logger) *Broadcaster {
+	return &Broadcaster{
+		node:        node,
+		bump:        bump,
+		stuckBlocks: stuckBlocks,
+		keep:        keep,
+		logger:      logger,
+		byHash:      make(map[common.Hash]*tracked),
+		inFlight:    make(map[*tracked]struct{}),
+	}
+}
+
+// Submit queues tx for submission after the queued transactions of from
+// with lower nonces and returns right away.
+func (b *Broadcaster) Submit(from common.Address, tx *types.Transaction) {
+	t := &tracked{from: from, versions: []*types.Transaction{tx}, status: StatusQueued}
+	b.mu.Lock()
+	b.byHash[tx.Hash()] = t
+	b.queued++
+	b.mu.Unlock()
+
+	v, _ := b.senders.LoadOrStore(from, &sender{})
+	s := v.(*sender)
+	s.mu.Lock()
+	s.queue = append(s.queue, t)
+	start := !s.running
+	s.running = true
+	s.mu.Unlock()
+	if start {
+		go b.drain(s)
+	}
+}
+
+// drain sends the queue of s until it is empty. Each sender has at most one
+// drain running, so its transactions reach the node in nonce order.
+func (b *Broadcaster) drain(s *sender) {
+	for {
+		s.mu.Lock()
+		queue := s.queue
+		s.queue = nil
+		if len(queue) == 0 {
+			s.running = false
+			s.mu.Unlock()
+			return
+		}
+		s.mu.Unlock()
+		slices.SortFunc(queue, func(x, y *tracked) int {
+			return compareNonce(x.latest().Nonce(), y.latest().Nonce())
+		})
+		for _, t := range queue {
+			err := b.send(t.latest())
+			b.mu.Lock()
+			b.queued--
+			if err != nil {
+				b.finish(t, StatusFailed)
+				t.err = err.Error()
+			} else {
+				t.status = StatusPending
+				t.submittedAt = b.head
+				b.inFlight[t] = struct{}{}
+			}
+			b.mu.Unlock()
+		}
+	}
+}
+
+func compareNonce(x, y uint64) int {
+	switch {
+	case x < y:
+		return -1
+	case x > y:
+		return 1
+	}
+	return 0
+}
+
+func (b *Broadcaster) send(tx *types.Transaction) error {
+	raw, err := tx.MarshalBinary()
+	if err != nil {
+		return err
+	}
+	ctx, cancel := context.WithTimeout(context.Background(), sendTimeout)
+	defer cancel()
+	err = b.node.CallContext(ctx, nil, "eth_sendRawTransaction", hexutil.Encode(raw))
+	// resent after a timeout that reached the node anyway
+	if err != nil && strings.Contains(err.Error(), "already known") {
+		return nil
+	}
+	return err
+}
+
+// finish moves t out of flight, b.mu must be held.
+func (b *Broadcaster) finish(t *tracked, status Status) {
+	t.status = status
+	t.finishedTime = time.Now()
+	delete(b.inFlight, t)
+	b.finished = append(b.finished, t)
+}
+
+// Run polls the head every interval and, on each new block, checks the
+// transactions in flight until ctx is done.
+func (b *Broadcaster) Run(ctx context.Context, interval time.Duration) {
+	ticker := time.NewTicker(interval)
+	defer ticker.Stop()
+	for {
+		select {
+		case <-ctx.Done():
+			return
+		case <-ticker.C:
+		}
+		var head hexutil.Uint64
+		if err := b.node.CallContext(ctx, &head, "eth_blockNumber"); err != nil {
+			b.logger.Error("Failed to get block number", "err", err)
+			continue
+		}
+		b.mu.Lock()
+		isNew := uint64(head) > b.head
+		b.head = max(b.head, uint64(head))
+		b.mu.Unlock()
+		if isNew {
+			b.onHead(ctx, uint64(head))
+		}
+		b.prune()
+	}
+}
+
+// onHead asks for the receipts of every version of every transaction in
+// flight and replaces the ones that have been pending for too long.
+func (b *Broadcaster) onHead(ctx context.Context, head uint64) {
+	b.mu.Lock()
+	var hashes []common.Hash
+	owners := make(map[common.Hash]*tracked)
+	for t := range b.inFlight {
+		for _, tx := range t.versions {
+			hashes = append(hashes, tx.Hash())
+			owners[tx.Hash()] = t
+		}
+	}
+	b.mu.Unlock()
+
+	for start := 0; start < len(hashes); start += maxReceiptBatch {
+		chunk := hashes[start:min(start+maxReceiptBatch, len(hashes))]
+		receipts := make([]*types.Receipt, len(chunk))
+		batch := make([]rpc.BatchElem, len(chunk))
+		for i, hash := range chunk {
+			batch[i] = rpc.BatchElem{
+				Method: "eth_getTransactionReceipt",
+				Args:   []interface{}{hash},
+				Result: &receipts[i],
+			}
+		}
+		if err := b.node.BatchCallContext(ctx, batch); err != nil {
+			b.logger.Error("Failed to get receipts", "err", err)
+			return
+		}
+		b.mu.Lock()
+		for i, receipt := range receipts {
+			t := owners[chunk[i]]
+			if batch[i].Error != nil || receipt == nil || t.status != StatusPending {
+				continue
+			}
+			t.mined = chunk[i]
+			t.blockNumber = receipt.BlockNumber.Uint64()
+			t.gasUsed = receipt.GasUsed
+			if receipt.Status == types.ReceiptStatusSuccessful {
+				b.finish(t, StatusMined)
+			} else {
+				b.finish(t, StatusReverted)
+			}
+		}
+		b.mu.Unlock()
+	}
+
+	if b.bump == nil || b.stuckBlocks == 0 {
+		return
+	}
+	b.mu.Lock()
+	var stuck []*tracked
+	for t := range b.inFlight {
+		if head-t.submittedAt >= b.stuckBlocks {
+			stuck = append(stuck, t)
+		}
+	}
+	b.mu.Unlock()
+	for _, t := range stuck {
+		b.replace(ctx, t, head)
+	}
+}
+
+func (b *Broadcaster) replace(ctx context.Context, t *tracked, head uint64) {
+	tx, err := b.bump(ctx, t.from, t.latest())
+	if err == nil {
+		err = b.send(tx)
+	}
+	if err != nil {
+		// usually an earlier version was mined, which the next head shows
+		b.logger.Warn("Failed to replace tx", "hash", t.latest().Hash().Hex(), "err", err)
+		return
+	}
+	b.mu.Lock()
+	t.versions = append(t.versions, tx)
+	t.submittedAt = head
+	b.byHash[tx.Hash()] = t
+	b.mu.Unlock()
+	b.logger.Info("Replaced stuck tx", "from", t.from.Hex(), "nonce", tx.Nonce(), "hash", tx.Hash().Hex())
+}
+
+// prune forgets transactions finished more than keep ago.
+func (b *Broadcaster) prune() {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	n := 0
+	for n < len(b.finished) && time.Since(b.finished[n].finishedTime) > b.keep {
+		for _, tx := range b.finished[n].versions {
+			delete(b.byHash, tx.Hash())
+		}
+		n++
+	}
+	b.finished = b.finished[n:]
+}
+
+// Depth returns how many transactions wait for submission and how many
+// have been submitted but not mined.
+func (b *Broadcaster) Depth() (queued, pending int) {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	return b.queued, len(b.inFlight)
+}
+
+// Status reports on the transaction one of whose versions hashes to hash.
+func (b *Broadcaster) Status(hash common.Hash) (TxStatus, bool) {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	t, ok := b.byHash[hash]
+	if !ok {
+		return TxStatus{}, false
+	}
+	current := t.mined
+	if t.status != StatusMined && t.status != StatusReverted {
+		current = t.latest().Hash()
+	}
+	return TxStatus{
+		Hash:         hash,
+		Status:       t.status,
+		Nonce:        t.versions[0].Nonce(),
+		Current:      current,
+		Replacements: len(t.versions) - 1,
+		BlockNumber:  t.blockNumber,
+		GasUsed:      t.gasUsed,
+		Error:        t.err,
+	}, true
+}
@@ -0,0 +1,92 @@
+package campaign
+
+import (
+	"bufio"
+	"bytes"
+	"encoding/json"
+	"io"
+	"os"
+	"sync"
+
+	"github.com/ethereum/go-ethereum/common"
+	"github.com/ethereum/go-ethereum/common/hexutil"
+)
+
+// Record is a line of the log: a signed transaction of a campaign, or with
+// Released set, the mark that the campaign was handed to the broadcaster.
+type Record struct {
+	Campaign string         `json:"campaign"`
+	Index    int            `json:"index"`
+	From     common.Address `json:"from"`
+	Nonce    uint64         `json:"nonce"`
+	Tx       hexutil.Bytes  `json:"tx,omitempty"`
+	Released bool           `json:"released,omitempty"`
+}
+
+// Log is an append-only file of JSON lines. Appends are written in one go
+// and synced before they return, so a campaign reported as signed survives
+// a crash. A line torn by a crash is cut off when the log is opened.
+type Log struct {
+	mu   sync.Mutex
+	file *os.File
+}
+
+func Open(path string) (*Log, error) {
+	file, err := os.OpenFile(path, os.O_RDWR|os.O_APPEND|os.O_CREATE, 0o600)
+	if err != nil {
+		return nil, err
+	}
+	data, err := io.ReadAll(file)
+	if err != nil {
+		file.Close()
+		return nil, err
+	}
+	if len(data) > 0 && data[len(data)-1] != '\n' {
+		if err := file.Truncate(int64(bytes.LastIndexByte(data, '\n') + 1)); err != nil {
+			file.Close()
+			return nil, err
+		}
+	}
+	return &Log{file: file}, nil
+}
+
+func (l *Log) Append(records []Record) error {
+	var buf []byte
+	for _, record := range records {
+		line, err := json.Marshal(record)
+		if err != nil {
+			return err
+		}
+		buf = append(append(buf, line...), '\n')
+	}
+	l.mu.Lock()
+	defer l.mu.Unlock()
+	if _, err := l.file.Write(buf); err != nil {
+		return err
+	}
+	return l.file.Sync()
+}
+
+// ReadAll calls fn with every record in the order they were appended.
+func (l *Log) ReadAll(fn func(Record)) error {
+	l.mu.Lock()
+	defer l.mu.Unlock()
+	if _, err := l.file.Seek(0, io.SeekStart); err != nil {
+		return err
+	}
+	scanner := bufio.NewScanner(l.file)
+	// a signed deployment can be far longer than the default 64KiB
+	scanner.Buffer(nil, 4<<20)
+	for scanner.Scan() {
+		var record Record
+		if err := json.Unmarshal(scanner.Bytes(), &record); err != nil {
+			return err
+		}
+		fn(record)
+	}
+	return scanner.Err()
+}
+
+func (l *Log) Close() error {
+	return l.file.Close()
+}
@@ -0,0 +1,102 @@
+package feeoracle
+
+import (
+	"context"
+	"errors"
+	"math/big"
+	"sync"
+	"sync/atomic"
+	"time"
+
+	"github.com/ethereum/go-ethereum/core/types"
+)
+
+// local hardhat chain, which has no eth_maxPriorityFeePerGas
+const hardhatChainID = 1337
+
+// 2 gwei, the lowest tip handed out
+var minPriorityFee = big.NewInt(2_000_000_000)
+
+// FeeSource is the node view the oracle reads fees from, satisfied by
+// *ethclient.Client.
+type FeeSource interface {
+	HeaderByNumber(ctx context.Context, number *big.Int) (*types.Header, error)
+	SuggestGasTipCap(ctx context.Context) (*big.Int, error)
+}
+
+// Fees must not be modified, the same values are handed to every caller
+// until the next refresh.
+type Fees struct {
+	MaxFeePerGas         *big.Int
+	MaxPriorityFeePerGas *big.Int
+}
+
+type cachedFees struct {
+	fees      Fees
+	fetchedAt time.Time
+}
+
+// FeeOracle computes EIP-1559 fees the way `getGasPrices` in
+// scripts/DeploymentUtils.ts does and keeps them for maxAge, so signing
+// requests do not each cost a block and a tip lookup.
+type FeeOracle struct {
+	source  FeeSource
+	chainID *big.Int
+	maxAge  time.Duration
+	mu      sync.Mutex
+	cached  atomic.Pointer[cachedFees]
+}
+
+func NewFeeOracle(source FeeSource, chainID *big.Int, maxAge time.Duration) *FeeOracle {
+	return &FeeOracle{
+		source:  source,
+		chainID: chainID,
+		maxAge:  maxAge,
+	}
+}
+
+func (o *FeeOracle) fresh() (Fees, bool) {
+	c := o.cached.Load()
+	if c == nil || time.Since(c.fetchedAt) > o.maxAge {
+		return Fees{}, false
+	}
+	return c.fees, true
+}
+
+// Fees returns the cached fees, refreshing them from the node when they
+// are older than maxAge. Concurrent callers share one refresh.
+func (o *FeeOracle) Fees(ctx context.Context) (Fees, error) {
+	if fees, ok := o.fresh(); ok {
+		return fees, nil
+	}
+	o.mu.Lock()
+	defer o.mu.Unlock()
+	if fees, ok := o.fresh(); ok {
+		return fees, nil
+	}
+
+	header, err := o.source.HeaderByNumber(ctx, nil)
+	if err != nil {
+		return Fees{}, err
+	}
+	if header.BaseFee == nil {
+		return Fees{}, errors.New("undefined block base fee per gas")
+	}
+	tip := new(big.Int).Set(minPriorityFee)
+	if o.chainID.Cmp(big.NewInt(hardhatChainID)) != 0 {
+		tip, err = o.source.SuggestGasTipCap(ctx)
+		if err != nil {
+			return Fees{}, err
+		}
+	}
+	tip = new(big.Int).Div(new(big.Int).Mul(tip, big.NewInt(125)), big.NewInt(100))
+	if tip.Cmp(minPriorityFee) < 0 {
+		tip = new(big.Int).Set(minPriorityFee)
+	}
+	fees := Fees{
+		MaxFeePerGas:         new(big.Int).Add(new(big.Int).Mul(header.BaseFee, big.NewInt(2)), tip),
+		MaxPriorityFeePerGas: tip,
+	}
+	o.cached.Store(&cachedFees{fees: fees, fetchedAt: time.Now()})
+	return fees, nil
+}
@@ -0,0 +1,101 @@
+package hexcodec
+
+import (
+	"encoding/hex"
+	"errors"
+	"math/big"
+	"slices"
+)
+
+var ErrInvalidHex = errors.New("Invalid hexadecimal value")
+
+func trimPrefix(src []byte) []byte {
+	if len(src) >= 2 && src[0] == '0' && (src[1] == 'x' || src[1] == 'X') {
+		return src[2:]
+	}
+	return src
+}
+
+func nibble(c byte) (byte, bool) {
+	switch {
+	case '0' <= c && c <= '9':
+		return c - '0', true
+	case 'a' <= c && c <= 'f':
+		return c - 'a' + 10, true
+	case 'A' <= c && c <= 'F':
+		return c - 'A' + 10, true
+	}
+	return 0, false
+}
+
+// AppendEncode appends the 0x prefixed hex encoding of src to dst.
+func AppendEncode(dst, src []byte) []byte {
+	n := len(dst) + 2
+	dst = slices.Grow(dst, 2+2*len(src))
+	dst = append(dst, '0', 'x')
+	dst = dst[:n+2*len(src)]
+	hex.Encode(dst[n:], src)
+	return dst
+}
+
+// AppendDecode appends the bytes encoded by src, with or without 0x, to
+// dst. Byte strings such as call data must have an even number of digits.
+func AppendDecode(dst, src []byte) ([]byte, error) {
+	src = trimPrefix(src)
+	if len(src)%2 == 1 {
+		return dst, ErrInvalidHex
+	}
+	return appendDecodeDigits(dst, src)
+}
+
+// appendDecodeQuantity is AppendDecode for quantities, whose leading zero
+// digit may be left out, so an odd number of digits is allowed.
+func appendDecodeQuantity(dst, src []byte) ([]byte, error) {
+	src = trimPrefix(src)
+	if len(src)%2 == 1 {
+		b, ok := nibble(src[0])
+		if !ok {
+			return dst, ErrInvalidHex
+		}
+		dst = append(dst, b)
+		src = src[1:]
+	}
+	return appendDecodeDigits(dst, src)
+}
+
+// appendDecodeDigits appends the bytes of an even number of hex digits.
+func appendDecodeDigits(dst, src []byte) ([]byte, error) {
+	n := len(dst)
+	dst = slices.Grow(dst, len(src)/2)[:n+len(src)/2]
+	if _, err := hex.Decode(dst[n:], src); err != nil {
+		return dst[:n], ErrInvalidHex
+	}
+	return dst, nil
+}
+
+// DecodeFixed decodes src into dst, which it has to fill exactly, e.g. an
+// address.
+func DecodeFixed(dst, src []byte) error {
+	src = trimPrefix(src)
+	if len(src) != 2*len(dst) {
+		return ErrInvalidHex
+	}
+	if _, err := hex.Decode(dst, src); err != nil {
+		return ErrInvalidHex
+	}
+	return nil
+}
+
+// DecodeBig sets z to the quantity encoded by src. scratch is used for the
+// intermediate bytes and returned for reuse.
+func DecodeBig(z *big.Int, src, scratch []byte) ([]byte, error) {
+	if len(trimPrefix(src)) == 0 {
+		return scratch, ErrInvalidHex
+	}
+	scratch, err := appendDecodeQuantity(scratch[:0], src)
+	if err != nil {
+		return scratch, err
+	}
+	z.SetBytes(scratch)
+	return scratch, nil
+}
@@ -0,0 +1,43 @@
+package hexcodec
+
+import (
+	"bytes"
+	"errors"
+	"math/big"
+	"testing"
+)
+
+func TestAppendDecode(t *testing.T) {
+	for _, src := range []string{"0x0102ff", "0102FF"} {
+		got, err := AppendDecode(nil, []byte(src))
+		if err != nil {
+			t.Fatalf("%s: %s", src, err)
+		}
+		if !bytes.Equal(got, []byte{1, 2, 0xff}) {
+			t.Fatalf("%s decoded to %x", src, got)
+		}
+	}
+	// a missing digit in call data is an error, not a leading zero
+	for _, src := range []string{"0x102ff", "0xzz", "0x0g"} {
+		if _, err := AppendDecode(nil, []byte(src)); !errors.Is(err, ErrInvalidHex) {
+			t.Fatalf("%s: got %v, want ErrInvalidHex", src, err)
+		}
+	}
+}
+
+func TestDecodeBig(t *testing.T) {
+	var z big.Int
+	for src, want := range map[string]int64{"0x0": 0, "0x3b9aca00": 1000000000, "0x102ff": 0x102ff} {
+		if _, err := DecodeBig(&z, []byte(src), nil); err != nil {
+			t.Fatalf("%s: %s", src, err)
+		}
+		if z.Int64() != want {
+			t.Fatalf("%s decoded to %s, want %d", src, &z, want)
+		}
+	}
+	for _, src := range []string{"0x", "", "0xz"} {
+		if _, err := DecodeBig(&z, []byte(src), nil); !errors.Is(err, ErrInvalidHex) {
+			t.Fatalf("%s: got %v, want ErrInvalidHex", src, err)
+		}
+	}
+}
@@ -0,0 +1,110 @@
+package keystore
+
+import (
+	"crypto/ecdsa"
+	"encoding/json"
+	"fmt"
+	"os"
+	"strings"
+	"sync"
+	"sync/atomic"
+
+	"github.com/ethereum/go-ethereum/common"
+	"github.com/ethereum/go-ethereum/crypto"
+)
+
+// Account is an entry of the key file, testPrivateKeys.json.
+type Account struct {
+	Address    string `json:"address"`
+	PrivateKey string `json:"privateKey"`
+}
+
+type File struct {
+	Accounts []Account `json:"accounts"`
+}
+
+// Key is a parsed private key with the address derived from it once.
+type Key struct {
+	Address    common.Address
+	PrivateKey *ecdsa.PrivateKey
+	// as written in the key file, to tell unchanged keys apart on reload
+	hex string
+}
+
+// KeyStore holds the keys of a key file. Lookups read an immutable index
+// through an atomic pointer, so they never wait for a reload, which swaps
+// in a new index.
+type KeyStore struct {
+	path  string
+	index atomic.Pointer[map[common.Address]*Key]
+	// serialises reloads
+	mu sync.Mutex
+}
+
+// Load reads the key file at path.
+func Load(path string) (*KeyStore, error) {
+	k := &KeyStore{path: path}
+	empty := make(map[common.Address]*Key)
+	k.index.Store(&empty)
+	if _, _, err := k.Reload(); err != nil {
+		return nil, err
+	}
+	return k, nil
+}
+
+// Get returns the key of addr.
+func (k *KeyStore) Get(addr common.Address) (*Key, bool) {
+	key, ok := (*k.index.Load())[addr]
+	return key, ok
+}
+
+func (k *KeyStore) Len() int {
+	return len(*k.index.Load())
+}
+
+// Reload reads the key file again, keeping the parsed keys that did not
+// change. The old index stays in use if the file is invalid.
+func (k *KeyStore) Reload() (added, removed int, err error) {
+	k.mu.Lock()
+	defer k.mu.Unlock()
+	data, err := os.ReadFile(k.path)
+	if err != nil {
+		return 0, 0, err
+	}
+	var file File
+	if err := json.Unmarshal(data, &file); err != nil {
+		return 0, 0, err
+	}
+
+	old := *k.index.Load()
+	index := make(map[common.Address]*Key, len(file.Accounts))
+	for _, account := range file.Accounts {
+		hex := strings.TrimPrefix(account.PrivateKey, "0x")
+		addr := common.HexToAddress(account.Address)
+		if key, ok := old[addr]; ok && key.hex == hex {
+			index[addr] = key
+			continue
+		}
+		privateKey, err := crypto.HexToECDSA(hex)
+		if err != nil {
+			return 0, 0, fmt.Errorf("key of %s: %w", account.Address, err)
+		}
+		key := &Key{
+			Address:    crypto.PubkeyToAddress(privateKey.PublicKey),
+			PrivateKey: privateKey,
+			hex:        hex,
+		}
+		if account.Address != "" && key.Address != addr {
+			return 0, 0, fmt.Errorf("key listed for %s belongs to %s", account.Address, key.Address.Hex())
+		}
+		index[key.Address] = key
+		added++
+	}
+	for addr := range old {
+		if _, ok := index[addr]; !ok {
+			removed++
+		}
+	}
+	k.index.Store(&index)
+	return added, removed, nil
+}
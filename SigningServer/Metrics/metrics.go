@@ -0,0 +1,166 @@
+package metrics
+
+import (
+	"fmt"
+	"io"
+	"sort"
+	"strconv"
+	"sync"
+	"sync/atomic"
+	"time"
+)
+
+// DefaultBuckets are the histogram bounds in seconds, from a bare signature
+// up to a node round-trip under load.
+var DefaultBuckets = []float64{0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5}
+
+type metric interface {
+	write(w io.Writer)
+}
+
+// Registry writes its metrics in the Prometheus text exposition format, in
+// the order they were registered.
+type Registry struct {
+	mu      sync.Mutex
+	metrics []metric
+}
+
+func (r *Registry) register(m metric) {
+	r.mu.Lock()
+	r.metrics = append(r.metrics, m)
+	r.mu.Unlock()
+}
+
+func (r *Registry) Write(w io.Writer) {
+	r.mu.Lock()
+	metrics := r.metrics
+	r.mu.Unlock()
+	for _, m := range metrics {
+		m.write(w)
+	}
+}
+
+func header(w io.Writer, name, help, kind string) {
+	fmt.Fprintf(w, "# HELP %s %s\n# TYPE %s %s\n", name, help, name, kind)
+}
+
+func seconds(nanos uint64) string {
+	return strconv.FormatFloat(float64(nanos)/1e9, 'g', -1, 64)
+}
+
+// Histogram counts durations into cumulative buckets. Observe takes no lock.
+type Histogram struct {
+	name, help string
+	bounds     []float64
+	// one more than bounds, for +Inf
+	counts []atomic.Uint64
+	sum    atomic.Uint64
+}
+
+func (r *Registry) NewHistogram(name, help string, bounds []float64) *Histogram {
+	h := &Histogram{name: name, help: help, bounds: bounds, counts: make([]atomic.Uint64, len(bounds)+1)}
+	r.register(h)
+	return h
+}
+
+func (h *Histogram) Observe(d time.Duration) {
+	i := sort.SearchFloat64s(h.bounds, d.Seconds())
+	h.counts[i].Add(1)
+	h.sum.Add(uint64(d))
+}
+
+// Since observes the time elapsed since start.
+func (h *Histogram) Since(start time.Time) {
+	h.Observe(time.Since(start))
+}
+
+func (h *Histogram) write(w io.Writer) {
+	header(w, h.name, h.help, "histogram")
+	var total uint64
+	for i := range h.counts {
+		total += h.counts[i].Load()
+		le := "+Inf"
+		if i < len(h.bounds) {
+			le = strconv.FormatFloat(h.bounds[i], 'g', -1, 64)
+		}
+		fmt.Fprintf(w, "%s_bucket{le=%q} %d\n", h.name, le, total)
+	}
+	fmt.Fprintf(w, "%s_sum %s\n%s_count %d\n", h.name, seconds(h.sum.Load()), h.name, total)
+}
+
+// CounterVec counts per value of one label. Values are keyed by K so that
+// callers need not format the label on the hot path; format is only called
+// on scrapes.
+type CounterVec[K comparable] struct {
+	name, help, label string
+	format            func(K) string
+	values            sync.Map
+}
+
+func NewCounterVec[K comparable](r *Registry, name, help, label string, format func(K) string) *CounterVec[K] {
+	c := &CounterVec[K]{name: name, help: help, label: label, format: format}
+	r.register(c)
+	return c
+}
+
+func (c *CounterVec[K]) Add(key K, n uint64) {
+	v, ok := c.values.Load(key)
+	if !ok {
+		v, _ = c.values.LoadOrStore(key, new(atomic.Uint64))
+	}
+	v.(*atomic.Uint64).Add(n)
+}
+
+func (c *CounterVec[K]) Inc(key K) {
+	c.Add(key, 1)
+}
+
+func (c *CounterVec[K]) write(w io.Writer) {
+	header(w, c.name, c.help, "counter")
+	var lines []string
+	c.values.Range(func(key, v any) bool {
+		lines = append(lines, fmt.Sprintf("%s{%s=%q} %d\n", c.name, c.label, c.format(key.(K)), v.(*atomic.Uint64).Load()))
+		return true
+	})
+	sort.Strings(lines)
+	for _, line := range lines {
+		io.WriteString(w, line)
+	}
+}
+
+type Gauge struct {
+	name, help string
+	value      atomic.Int64
+}
+
+func (r *Registry) NewGauge(name, help string) *Gauge {
+	g := &Gauge{name: name, help: help}
+	r.register(g)
+	return g
+}
+
+func (g *Gauge) Add(n int64) {
+	g.value.Add(n)
+}
+
+func (g *Gauge) write(w io.Writer) {
+	header(w, g.name, g.help, "gauge")
+	fmt.Fprintf(w, "%s %d\n", g.name, g.value.Load())
+}
+
+// GaugeFunc reports the value of fn at scrape time.
+type GaugeFunc struct {
+	name, help string
+	fn         func() float64
+}
+
+func (r *Registry) NewGaugeFunc(name, help string, fn func() float64) *GaugeFunc {
+	g := &GaugeFunc{name: name, help: help, fn: fn}
+	r.register(g)
+	return g
+}
+
+func (g *GaugeFunc) write(w io.Writer) {
+	header(w, g.name, g.help, "gauge")
+	fmt.Fprintf(w, "%s %s\n", g.name, strconv.FormatFloat(g.fn(), 'g', -1, 64))
+}
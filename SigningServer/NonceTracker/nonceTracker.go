@@ -1,21 +1,230 @@
 package noncetracker
 
-import "sync"
+import (
+	"context"
+	"log/slog"
+	"sort"
+	"sync"
+	"time"
 
-type NonceTracker struct {
+	"github.com/ethereum/go-ethereum/common"
+)
+
+// NonceSource is the node view the tracker seeds and re-syncs from,
+// satisfied by *ethclient.Client.
+type NonceSource interface {
+	PendingNonceAt(ctx context.Context, account common.Address) (uint64, error)
+}
+
+type account struct {
 	sync.Mutex
-	nonce uint64
+	seeded bool
+	next   uint64
+	// nonces handed out and given back unused, reused lowest first
+	released []uint64
+	// nonces below held are signed for a later broadcast, so the node not
+	// knowing them yet does not mean they were dropped
+	held uint64
+	// pending nonce of the node at the last sync, and since when the node
+	// has been behind next without that pending nonce moving
+	pending     uint64
+	behindSince time.Time
+}
+
+// NonceTracker hands out nonces per sender without asking the node on
+// every request. Each sender is seeded from the pending nonce once; after
+// that nonces come from a local counter under a per-sender lock.
+type NonceTracker struct {
+	source NonceSource
+	// how long the pending nonce of the node may stay behind the local
+	// counter without moving before the missing nonces are treated as
+	// dropped
+	staleAfter time.Duration
+	accounts   sync.Map // common.Address -> *account
+	logger     *slog.Logger
 }
 
-func NewNonceTracker() *NonceTracker {
+func NewNonceTracker(source NonceSource, staleAfter time.Duration, logger *slog.Logger) *NonceTracker {
 	return &NonceTracker{
-		nonce: 0,
+		source:     source,
+		staleAfter: staleAfter,
+		logger:     logger,
+	}
+}
+
+func (nt *NonceTracker) account(addr common.Address) *account {
+	if a, ok := nt.accounts.Load(addr); ok {
+		return a.(*account)
+	}
+	a, _ := nt.accounts.LoadOrStore(addr, &account{})
+	return a.(*account)
+}
+
+// seed must be called with a locked
+func (nt *NonceTracker) seed(ctx context.Context, addr common.Address, a *account) error {
+	if a.seeded {
+		return nil
+	}
+	pending, err := nt.source.PendingNonceAt(ctx, addr)
+	if err != nil {
+		return err
+	}
+	a.next = pending
+	a.seeded = true
+	return nil
+}
+
+// GetNonce returns the next unused nonce for addr.
+func (nt *NonceTracker) GetNonce(ctx context.Context, addr common.Address) (uint64, error) {
+	return nt.nextNonce(ctx, addr, false)
+}
+
+// HoldNonce is GetNonce for a transaction that the server does not
+// broadcast itself, see HoldNonces.
+func (nt *NonceTracker) HoldNonce(ctx context.Context, addr common.Address) (uint64, error) {
+	return nt.nextNonce(ctx, addr, true)
+}
+
+func (nt *NonceTracker) nextNonce(ctx context.Context, addr common.Address, hold bool) (uint64, error) {
+	a := nt.account(addr)
+	a.Lock()
+	defer a.Unlock()
+	if err := nt.seed(ctx, addr, a); err != nil {
+		return 0, err
+	}
+	var nonce uint64
+	if len(a.released) > 0 {
+		nonce = a.released[0]
+		a.released = a.released[1:]
+	} else {
+		nonce = a.next
+		a.next++
+	}
+	if hold {
+		a.held = max(a.held, nonce+1)
 	}
+	return nonce, nil
 }
 
-func (nt *NonceTracker) GetNonce() uint64 {
-	nt.Lock()
-	defer nt.Unlock()
-	nt.nonce++
-	return nt.nonce
+// GetNonces reserves count consecutive nonces for addr and returns the
+// first. Released nonces are left for GetNonce as they break the sequence.
+func (nt *NonceTracker) GetNonces(ctx context.Context, addr common.Address, count int) (uint64, error) {
+	return nt.reserve(ctx, addr, count, false)
+}
+
+// HoldNonces is GetNonces for transactions that the server does not
+// broadcast itself, e.g. signed for a later release or returned to the
+// client. Sync never hands the held range out again, however long the node
+// takes to see it.
+func (nt *NonceTracker) HoldNonces(ctx context.Context, addr common.Address, count int) (uint64, error) {
+	return nt.reserve(ctx, addr, count, true)
+}
+
+func (nt *NonceTracker) reserve(ctx context.Context, addr common.Address, count int, hold bool) (uint64, error) {
+	a := nt.account(addr)
+	a.Lock()
+	defer a.Unlock()
+	if err := nt.seed(ctx, addr, a); err != nil {
+		return 0, err
+	}
+	first := a.next
+	a.next += uint64(count)
+	if hold {
+		a.held = a.next
+	}
+	return first, nil
+}
+
+// Hold marks the nonces of addr below next as held, e.g. after a restart
+// for transactions signed before it and not broadcast yet.
+func (nt *NonceTracker) Hold(ctx context.Context, addr common.Address, next uint64) error {
+	a := nt.account(addr)
+	a.Lock()
+	defer a.Unlock()
+	if err := nt.seed(ctx, addr, a); err != nil {
+		return err
+	}
+	a.next = max(a.next, next)
+	a.held = max(a.held, next)
+	return nil
+}
+
+// Release gives back a nonce that was handed out but never used, e.g.
+// because signing failed, so that it is not left as a gap.
+func (nt *NonceTracker) Release(addr common.Address, nonce uint64) {
+	a := nt.account(addr)
+	a.Lock()
+	defer a.Unlock()
+	if !a.seeded || nonce >= a.next {
+		return
+	}
+	if nonce == a.next-1 {
+		a.next--
+		a.held = min(a.held, a.next)
+		return
+	}
+	i := sort.Search(len(a.released), func(i int) bool { return a.released[i] >= nonce })
+	if i < len(a.released) && a.released[i] == nonce {
+		return
+	}
+	a.released = append(a.released, 0)
+	copy(a.released[i+1:], a.released[i:])
+	a.released[i] = nonce
+}
+
+// Sync compares the local counter of addr with the pending nonce of the
+// node. A node that is ahead (transactions sent around the tracker) moves
+// the counter forward. A node whose pending nonce stays behind the unheld
+// nonces without moving for longer than staleAfter means the transactions
+// with the missing nonces were dropped, so the counter restarts from the
+// pending nonce, or after the held nonces. How often nonces are handed out
+// in the meantime does not matter.
+func (nt *NonceTracker) Sync(ctx context.Context, addr common.Address) error {
+	pending, err := nt.source.PendingNonceAt(ctx, addr)
+	if err != nil {
+		return err
+	}
+	a := nt.account(addr)
+	a.Lock()
+	defer a.Unlock()
+	if !a.seeded || pending > a.next {
+		a.next = pending
+		a.seeded = true
+	}
+	switch {
+	case pending >= a.next || a.next <= a.held:
+		// nothing handed out that the node should know about yet
+		a.behindSince = time.Time{}
+	case pending != a.pending || a.behindSince.IsZero():
+		// behind, but the node is still making progress
+		a.behindSince = time.Now()
+	case time.Since(a.behindSince) > nt.staleAfter:
+		a.next = max(pending, a.held)
+		a.released = nil
+		a.behindSince = time.Time{}
+	}
+	a.pending = pending
+	// released nonces the node has already seen are used after all
+	i := sort.Search(len(a.released), func(i int) bool { return a.released[i] >= pending })
+	a.released = a.released[i:]
+	return nil
+}
+
+// Watch syncs every known sender each interval until ctx is done.
+func (nt *NonceTracker) Watch(ctx context.Context, interval time.Duration) {
+	ticker := time.NewTicker(interval)
+	defer ticker.Stop()
+	for {
+		select {
+		case <-ctx.Done():
+			return
+		case <-ticker.C:
+			nt.accounts.Range(func(key, _ any) bool {
+				if err := nt.Sync(ctx, key.(common.Address)); err != nil {
+					nt.logger.Error("Failed to sync nonce", "from", key.(common.Address).Hex(), "err", err)
+				}
+				return true
+			})
+		}
+	}
 }
@@ -0,0 +1,148 @@
+package noncetracker
+
+import (
+	"context"
+	"io"
+	"log/slog"
+	"sync/atomic"
+	"testing"
+	"time"
+
+	"github.com/ethereum/go-ethereum/common"
+)
+
+// fixedNode reports the pending nonce stored in it for every account.
+type fixedNode struct {
+	pending atomic.Uint64
+}
+
+func (n *fixedNode) PendingNonceAt(ctx context.Context, account common.Address) (uint64, error) {
+	return n.pending.Load(), nil
+}
+
+const staleAfter = 20 * time.Millisecond
+
+func newTracker(node *fixedNode) *NonceTracker {
+	return NewNonceTracker(node, staleAfter, slog.New(slog.NewJSONHandler(io.Discard, nil)))
+}
+
+// syncFor syncs addr repeatedly for longer than staleAfter.
+func syncFor(t *testing.T, nt *NonceTracker, addr common.Address) {
+	t.Helper()
+	deadline := time.Now().Add(3 * staleAfter)
+	for time.Now().Before(deadline) {
+		if err := nt.Sync(context.Background(), addr); err != nil {
+			t.Fatal(err)
+		}
+		time.Sleep(staleAfter / 4)
+	}
+}
+
+func TestStuckNodeResyncsDespiteRequests(t *testing.T) {
+	ctx := context.Background()
+	node := &fixedNode{}
+	node.pending.Store(5)
+	nt := newTracker(node)
+	addr := common.HexToAddress("0x01")
+
+	// the sender keeps asking while the node never sees any of its nonces,
+	// until the tracker hands out the nonce the node is stuck at again
+	start := time.Now()
+	for i := 0; ; i++ {
+		nonce, err := nt.GetNonce(ctx, addr)
+		if err != nil {
+			t.Fatal(err)
+		}
+		if i > 0 && nonce == 5 {
+			if time.Since(start) < staleAfter {
+				t.Fatalf("nonce 5 reissued after %s, before staleAfter", time.Since(start))
+			}
+			return
+		}
+		if time.Since(start) > 10*staleAfter {
+			t.Fatalf("still at nonce %d, the stuck node was never resynced", nonce)
+		}
+		if err := nt.Sync(ctx, addr); err != nil {
+			t.Fatal(err)
+		}
+		time.Sleep(staleAfter / 4)
+	}
+}
+
+func TestProgressingNodeKeepsNonces(t *testing.T) {
+	ctx := context.Background()
+	node := &fixedNode{}
+	nt := newTracker(node)
+	addr := common.HexToAddress("0x02")
+
+	first, err := nt.GetNonces(ctx, addr, 100)
+	if err != nil {
+		t.Fatal(err)
+	}
+	// the node works through the range, slower than staleAfter in total
+	for pending := first; pending < first+10; pending++ {
+		node.pending.Store(pending)
+		if err := nt.Sync(ctx, addr); err != nil {
+			t.Fatal(err)
+		}
+		time.Sleep(staleAfter / 2)
+	}
+	nonce, err := nt.GetNonce(ctx, addr)
+	if err != nil {
+		t.Fatal(err)
+	}
+	if nonce != first+100 {
+		t.Fatalf("got nonce %d, want %d after the reserved range", nonce, first+100)
+	}
+}
+
+func TestHeldNoncesAreNotReissued(t *testing.T) {
+	ctx := context.Background()
+	node := &fixedNode{}
+	nt := newTracker(node)
+	addr := common.HexToAddress("0x03")
+
+	first, err := nt.HoldNonces(ctx, addr, 3)
+	if err != nil {
+		t.Fatal(err)
+	}
+	syncFor(t, nt, addr)
+	nonce, err := nt.GetNonce(ctx, addr)
+	if err != nil {
+		t.Fatal(err)
+	}
+	if nonce != first+3 {
+		t.Fatalf("got nonce %d inside the held range starting at %d", nonce, first)
+	}
+
+	// the unheld nonce is dropped, the held ones are kept
+	syncFor(t, nt, addr)
+	nonce, err = nt.GetNonce(ctx, addr)
+	if err != nil {
+		t.Fatal(err)
+	}
+	if nonce != first+3 {
+		t.Fatalf("got nonce %d, want %d after the dropped nonce", nonce, first+3)
+	}
+}
+
+func TestHeldNonceIsNotReissued(t *testing.T) {
+	ctx := context.Background()
+	node := &fixedNode{}
+	nt := newTracker(node)
+	addr := common.HexToAddress("0x04")
+
+	held, err := nt.HoldNonce(ctx, addr)
+	if err != nil {
+		t.Fatal(err)
+	}
+	// the client has not broadcast the signed transaction yet
+	syncFor(t, nt, addr)
+	nonce, err := nt.HoldNonce(ctx, addr)
+	if err != nil {
+		t.Fatal(err)
+	}
+	if nonce != held+1 {
+		t.Fatalf("got nonce %d, want %d after the held nonce %d", nonce, held+1, held)
+	}
+}
@@ -0,0 +1,211 @@
+package rpcclient
+
+import (
+	"context"
+	"encoding/json"
+	"errors"
+	"math/big"
+	"net"
+	"net/http"
+	"sync"
+	"time"
+
+	"github.com/ethereum/go-ethereum/common"
+	"github.com/ethereum/go-ethereum/common/hexutil"
+	"github.com/ethereum/go-ethereum/core/types"
+	"github.com/ethereum/go-ethereum/rpc"
+)
+
+const (
+	// how long a read waits for others to share its batch
+	DefaultWindow = 2 * time.Millisecond
+	// calls per JSON-RPC batch, most nodes refuse much larger ones
+	DefaultMaxBatch = 100
+	callTimeout     = 10 * time.Second
+)
+
+var ErrNotFound = errors.New("not found")
+
+// call is a read queued for, or on its way in, a batch. Identical reads
+// made while it is pending wait for it instead of being sent again.
+type call struct {
+	key    string
+	method string
+	args   []interface{}
+	done   chan struct{}
+	result json.RawMessage
+	err    error
+}
+
+// Client is a JSON-RPC client over a pooled HTTP transport. Reads made
+// through Call are coalesced with identical pending reads and the distinct
+// ones are sent together as a batch once per window. It satisfies the node
+// interfaces of NonceTracker, FeeOracle and Broadcaster.
+type Client struct {
+	rpc      *rpc.Client
+	window   time.Duration
+	maxBatch int
+
+	mu      sync.Mutex
+	pending map[string]*call
+	queue   []*call
+}
+
+// Dial connects to the node at url with DefaultWindow and DefaultMaxBatch.
+func Dial(url string) (*Client, error) {
+	transport := &http.Transport{
+		Proxy: http.ProxyFromEnvironment,
+		DialContext: (&net.Dialer{
+			Timeout:   5 * time.Second,
+			KeepAlive: 30 * time.Second,
+		}).DialContext,
+		// everything goes to the one node, keep the connections around
+		MaxIdleConns:        256,
+		MaxIdleConnsPerHost: 256,
+		IdleConnTimeout:     90 * time.Second,
+		ForceAttemptHTTP2:   true,
+	}
+	c, err := rpc.DialHTTPWithClient(url, &http.Client{Transport: transport})
+	if err != nil {
+		return nil, err
+	}
+	return NewClient(c, DefaultWindow, DefaultMaxBatch), nil
+}
+
+func NewClient(c *rpc.Client, window time.Duration, maxBatch int) *Client {
+	return &Client{
+		rpc:      c,
+		window:   window,
+		maxBatch: maxBatch,
+		pending:  make(map[string]*call),
+	}
+}
+
+// Call makes a read, shared with any identical read still pending and
+// batched with the other reads of the same window.
+func (c *Client) Call(ctx context.Context, result interface{}, method string, args ...interface{}) error {
+	key, err := json.Marshal(append([]interface{}{method}, args...))
+	if err != nil {
+		return err
+	}
+	c.mu.Lock()
+	cl, ok := c.pending[string(key)]
+	if !ok {
+		cl = &call{key: string(key), method: method, args: args, done: make(chan struct{})}
+		c.pending[cl.key] = cl
+		c.queue = append(c.queue, cl)
+		switch {
+		case len(c.queue) >= c.maxBatch:
+			go c.send(c.take())
+		case len(c.queue) == 1:
+			time.AfterFunc(c.window, c.flush)
+		}
+	}
+	c.mu.Unlock()
+
+	select {
+	case <-cl.done:
+	case <-ctx.Done():
+		return ctx.Err()
+	}
+	if cl.err != nil {
+		return cl.err
+	}
+	if string(cl.result) == "null" {
+		return ErrNotFound
+	}
+	return json.Unmarshal(cl.result, result)
+}
+
+// take empties the queue, c.mu must be held.
+func (c *Client) take() []*call {
+	queue := c.queue
+	c.queue = nil
+	return queue
+}
+
+func (c *Client) flush() {
+	c.mu.Lock()
+	queue := c.take()
+	c.mu.Unlock()
+	// already sent because it filled up
+	if len(queue) > 0 {
+		c.send(queue)
+	}
+}
+
+// send makes the calls of queue in one request. It is not tied to the
+// context of any caller, since all of them share it.
+func (c *Client) send(queue []*call) {
+	ctx, cancel := context.WithTimeout(context.Background(), callTimeout)
+	defer cancel()
+	if len(queue) == 1 {
+		queue[0].err = c.rpc.CallContext(ctx, &queue[0].result, queue[0].method, queue[0].args...)
+	} else {
+		batch := make([]rpc.BatchElem, len(queue))
+		for i, cl := range queue {
+			batch[i] = rpc.BatchElem{Method: cl.method, Args: cl.args, Result: &cl.result}
+		}
+		err := c.rpc.BatchCallContext(ctx, batch)
+		for i, cl := range queue {
+			if cl.err = err; cl.err == nil {
+				cl.err = batch[i].Error
+			}
+		}
+	}
+	c.mu.Lock()
+	for _, cl := range queue {
+		delete(c.pending, cl.key)
+	}
+	c.mu.Unlock()
+	for _, cl := range queue {
+		close(cl.done)
+	}
+}
+
+// CallContext sends a single call right away, for writes such as
+// eth_sendRawTransaction that must not be coalesced.
+func (c *Client) CallContext(ctx context.Context, result interface{}, method string, args ...interface{}) error {
+	return c.rpc.CallContext(ctx, result, method, args...)
+}
+
+func (c *Client) BatchCallContext(ctx context.Context, b []rpc.BatchElem) error {
+	return c.rpc.BatchCallContext(ctx, b)
+}
+
+func (c *Client) ChainID(ctx context.Context) (*big.Int, error) {
+	var id hexutil.Big
+	if err := c.Call(ctx, &id, "eth_chainId"); err != nil {
+		return nil, err
+	}
+	return (*big.Int)(&id), nil
+}
+
+func (c *Client) PendingNonceAt(ctx context.Context, account common.Address) (uint64, error) {
+	var nonce hexutil.Uint64
+	if err := c.Call(ctx, &nonce, "eth_getTransactionCount", account, "pending"); err != nil {
+		return 0, err
+	}
+	return uint64(nonce), nil
+}
+
+// HeaderByNumber returns the latest header for a nil number.
+func (c *Client) HeaderByNumber(ctx context.Context, number *big.Int) (*types.Header, error) {
+	block := "latest"
+	if number != nil {
+		block = hexutil.EncodeBig(number)
+	}
+	var header *types.Header
+	if err := c.Call(ctx, &header, "eth_getBlockByNumber", block, false); err != nil {
+		return nil, err
+	}
+	return header, nil
+}
+
+func (c *Client) SuggestGasTipCap(ctx context.Context) (*big.Int, error) {
+	var tip hexutil.Big
+	if err := c.Call(ctx, &tip, "eth_maxPriorityFeePerGas"); err != nil {
+		return nil, err
+	}
+	return (*big.Int)(&tip), nil
+}
@@ -0,0 +1,72 @@
+package rpcclient
+
+import (
+	"context"
+	"encoding/json"
+	"net/http"
+	"net/http/httptest"
+	"sync"
+	"sync/atomic"
+	"testing"
+	"time"
+
+	"github.com/ethereum/go-ethereum/common"
+)
+
+// countingNode answers every call with 0x1 and counts the HTTP requests and
+// the calls in them.
+func countingNode(requests, calls *atomic.Int64) *httptest.Server {
+	return httptest.NewServer(http.HandlerFunc(func(w http.ResponseWriter, r *http.Request) {
+		requests.Add(1)
+		var body json.RawMessage
+		json.NewDecoder(r.Body).Decode(&body)
+		answer := func(id json.RawMessage) map[string]any {
+			calls.Add(1)
+			return map[string]any{"jsonrpc": "2.0", "id": id, "result": "0x1"}
+		}
+		w.Header().Set("Content-Type", "application/json")
+		var req struct{ ID json.RawMessage }
+		if body[0] != '[' {
+			json.Unmarshal(body, &req)
+			json.NewEncoder(w).Encode(answer(req.ID))
+			return
+		}
+		var batch []struct{ ID json.RawMessage }
+		json.Unmarshal(body, &batch)
+		res := make([]map[string]any, len(batch))
+		for i, req := range batch {
+			res[i] = answer(req.ID)
+		}
+		json.NewEncoder(w).Encode(res)
+	}))
+}
+
+func TestCoalesceAndBatch(t *testing.T) {
+	var requests, calls atomic.Int64
+	node := countingNode(&requests, &calls)
+	defer node.Close()
+	client, err := Dial(node.URL)
+	if err != nil {
+		t.Fatal(err)
+	}
+	// wide enough for every goroutine to join the first window
+	client.window = 50 * time.Millisecond
+
+	addrs := []common.Address{{1}, {2}, {3}}
+	var wg sync.WaitGroup
+	for i := 0; i < 300; i++ {
+		wg.Add(1)
+		go func(i int) {
+			defer wg.Done()
+			nonce, err := client.PendingNonceAt(context.Background(), addrs[i%len(addrs)])
+			if err != nil || nonce != 1 {
+				t.Errorf("PendingNonceAt = %d, %v", nonce, err)
+			}
+		}(i)
+	}
+	wg.Wait()
+	if requests.Load() != 1 || calls.Load() != int64(len(addrs)) {
+		t.Errorf("300 reads of %d addresses made %d requests with %d calls, want 1 with %d",
+			len(addrs), requests.Load(), calls.Load(), len(addrs))
+	}
+}
@@ -0,0 +1,83 @@
+package shard
+
+import (
+	"fmt"
+	"slices"
+	"sort"
+
+	"github.com/ethereum/go-ethereum/common"
+)
+
+// points per instance on the ring, enough to spread senders evenly over a
+// handful of instances
+const DefaultReplicas = 128
+
+// Ring assigns every sender address to one instance by consistent hashing,
+// so adding an instance only moves the senders it takes over.
+type Ring struct {
+	self string
+	// sorted hashes of the virtual nodes and the instance each belongs to
+	points []uint64
+	owners []string
+}
+
+// NewRing builds the ring of peers, which are the base URLs of all
+// instances, self included. Every instance must be given the same peers.
+func NewRing(peers []string, self string, replicas int) (*Ring, error) {
+	if !slices.Contains(peers, self) {
+		return nil, fmt.Errorf("%s is not one of the peers", self)
+	}
+	type point struct {
+		hash  uint64
+		owner string
+	}
+	points := make([]point, 0, len(peers)*replicas)
+	for _, peer := range peers {
+		for i := 0; i < replicas; i++ {
+			points = append(points, point{hash64([]byte(fmt.Sprintf("%s#%d", peer, i))), peer})
+		}
+	}
+	sort.Slice(points, func(i, j int) bool { return points[i].hash < points[j].hash })
+	r := &Ring{self: self}
+	for _, p := range points {
+		r.points = append(r.points, p.hash)
+		r.owners = append(r.owners, p.owner)
+	}
+	return r, nil
+}
+
+// hash64 is FNV-1a, spelled out so that hashing an address on every
+// request does not allocate, followed by the murmur3 finalizer, without
+// which the virtual nodes of one instance bunch together on the ring.
+func hash64(b []byte) uint64 {
+	h := uint64(14695981039346656037)
+	for _, c := range b {
+		h ^= uint64(c)
+		h *= 1099511628211
+	}
+	h ^= h >> 33
+	h *= 0xff51afd7ed558ccd
+	h ^= h >> 33
+	h *= 0xc4ceb9fe1a85ec53
+	h ^= h >> 33
+	return h
+}
+
+// Owner returns the base URL of the instance that signs for addr.
+func (r *Ring) Owner(addr common.Address) string {
+	key := hash64(addr[:])
+	i := sort.Search(len(r.points), func(i int) bool { return r.points[i] >= key })
+	if i == len(r.points) {
+		i = 0
+	}
+	return r.owners[i]
+}
+
+// Owns tells whether this instance signs for addr.
+func (r *Ring) Owns(addr common.Address) bool {
+	return r.Owner(addr) == r.self
+}
+
+func (r *Ring) Self() string {
+	return r.self
+}
@@ -0,0 +1,234 @@
+package main
+
+import (
+	"context"
+	"crypto/ecdsa"
+	"encoding/json"
+	"errors"
+	"fmt"
+	"net/http"
+	"runtime"
+	"sync"
+	"sync/atomic"
+	"time"
+
+	noncetracker "signingserver/SigningServer/NonceTracker"
+
+	"github.com/ethereum/go-ethereum/common"
+	"github.com/ethereum/go-ethereum/core/types"
+	"github.com/valyala/fasthttp"
+)
+
+// parallel calls fn for every index in [0, n) on up to one goroutine per
+// core and returns the first error.
+func parallel(n int, fn func(i int) error) error {
+	var (
+		next     atomic.Int64
+		wg       sync.WaitGroup
+		once     sync.Once
+		firstErr error
+	)
+	for w := 0; w < min(runtime.NumCPU(), n); w++ {
+		wg.Add(1)
+		go func() {
+			defer wg.Done()
+			for i := int(next.Add(1) - 1); i < n; i = int(next.Add(1) - 1) {
+				if err := fn(i); err != nil {
+					once.Do(func() { firstErr = err })
+					return
+				}
+			}
+		}()
+	}
+	wg.Wait()
+	return firstErr
+}
+
+// reservation holds the keys and the nonces per sender of a batch between
+// reserving and signing.
+type reservation struct {
+	counts map[common.Address]int
+	firsts map[common.Address]uint64
+	// a reload during the batch cannot take a key away halfway
+	keys map[common.Address]*ecdsa.PrivateKey
+	// the nonce of every transaction, in order
+	nonces []uint64
+}
+
+func (r *reservation) release(nonces *noncetracker.NonceTracker) {
+	for from, first := range r.firsts {
+		// newest first so that the counter steps back over the range
+		for i := r.counts[from] - 1; i >= 0; i-- {
+			nonces.Release(from, first+uint64(i))
+		}
+	}
+}
+
+// reserve looks up the key of every sender of txs and reserves consecutive
+// nonces per sender, assigned in the order of txs. Held nonces are for
+// transactions broadcast much later. Nothing is reserved if any sender is
+// unknown.
+func (s *Signers) reserve(ctx context.Context, txs []*parsedTx, hold bool) (*reservation, error) {
+	r := &reservation{
+		counts: make(map[common.Address]int),
+		firsts: make(map[common.Address]uint64),
+		keys:   make(map[common.Address]*ecdsa.PrivateKey),
+		nonces: make([]uint64, len(txs)),
+	}
+	for _, tx := range txs {
+		r.counts[tx.from]++
+	}
+	for from, count := range r.counts {
+		key, err := s.getPrivateKey(ctx, from)
+		if err != nil {
+			r.release(s.nonces)
+			return nil, err
+		}
+		r.keys[from] = key
+		start := time.Now()
+		var first uint64
+		if hold {
+			first, err = s.nonces.HoldNonces(ctx, from, count)
+		} else {
+			first, err = s.nonces.GetNonces(ctx, from, count)
+		}
+		nonceDuration.Since(start)
+		if err != nil {
+			r.release(s.nonces)
+			return nil, err
+		}
+		r.firsts[from] = first
+	}
+
+	next := make(map[common.Address]uint64, len(r.firsts))
+	for from, first := range r.firsts {
+		next[from] = first
+	}
+	for i, tx := range txs {
+		r.nonces[i] = next[tx.from]
+		next[tx.from]++
+	}
+	return r, nil
+}
+
+// signReserved signs txs with the nonces of r on every core and gives the
+// nonces back if any signature fails.
+func (s *Signers) signReserved(ctx context.Context, txs []*parsedTx, r *reservation) ([]*types.Transaction, error) {
+	signed := make([]*types.Transaction, len(txs))
+	err := parallel(len(txs), func(i int) error {
+		defer signDuration.Since(time.Now())
+		data, err := s.txData(ctx, r.nonces[i], txs[i])
+		if err != nil {
+			return err
+		}
+		signed[i], err = types.SignNewTx(r.keys[txs[i].from], s.signer, data)
+		return err
+	})
+	if err != nil {
+		r.release(s.nonces)
+		return nil, err
+	}
+	for from, count := range r.counts {
+		senderTxs.Add(from, uint64(count))
+	}
+	return signed, nil
+}
+
+// SignTxBatch signs txs with consecutive nonces per sender, assigned in the
+// order of txs. The nonces are held, as clients broadcast the batch
+// themselves and may do so after the tracker would treat them as dropped.
+// Nothing is signed if any sender is unknown and the reserved nonces are
+// given back if any signature fails.
+func (s *Signers) SignTxBatch(ctx context.Context, txs []*parsedTx) ([]*types.Transaction, error) {
+	r, err := s.reserve(ctx, txs, true)
+	if err != nil {
+		return nil, err
+	}
+	return s.signReserved(ctx, txs, r)
+}
+
+// httpError is an error answered with its own status and message.
+type httpError struct {
+	status int
+	msg    string
+}
+
+func (e *httpError) Error() string {
+	return e.msg
+}
+
+// signBatch signs txs here and submits them in broadcast mode.
+func (s *Signers) signBatch(ctx context.Context, reqs []txRequest, txs []*parsedTx) ([]txResponse, error) {
+	signed, err := s.SignTxBatch(ctx, txs)
+	if err != nil {
+		signingErrors.Inc(signFailure(err))
+		logger.Error("Failed to sign batch", "size", len(txs), "err", err)
+		return nil, &httpError{http.StatusInternalServerError, "Failed to sign tx"}
+	}
+	if s.broadcaster != nil {
+		for i, tx := range signed {
+			s.broadcaster.Submit(txs[i].from, tx)
+		}
+	}
+	res := make([]txResponse, len(signed))
+	err = parallel(len(signed), func(i int) error {
+		var err error
+		res[i], err = newTxResponse(signed[i], &reqs[i], s.broadcaster != nil)
+		return err
+	})
+	if err != nil {
+		signingErrors.Inc(failEncode)
+		logger.Error("Failed to encode tx", "err", err)
+		return nil, &httpError{http.StatusInternalServerError, "Failed to encode tx"}
+	}
+	return res, nil
+}
+
+// handleSignBatch signs a JSON array of txRequest and answers with the
+// txResponse of each, in request order.
+func (s *Signers) handleSignBatch(ctx *fasthttp.RequestCtx) {
+	defer batchDuration.Since(time.Now())
+	inFlight.Add(1)
+	defer inFlight.Add(-1)
+	var reqs []txRequest
+	if err := json.Unmarshal(ctx.PostBody(), &reqs); err != nil {
+		signingErrors.Inc(failParse)
+		ctx.Error("Failed to parse json payload", http.StatusBadRequest)
+		return
+	}
+	txs := make([]*parsedTx, len(reqs))
+	for i := range reqs {
+		tx, err := parseTxRequest(&reqs[i])
+		if err != nil {
+			signingErrors.Inc(failParse)
+			ctx.Error(fmt.Sprintf("Request %d: %s", i, err), http.StatusBadRequest)
+			return
+		}
+		txs[i] = tx
+	}
+
+	var res []txResponse
+	var err error
+	if s.ring == nil {
+		res, err = s.signBatch(ctx, reqs, txs)
+	} else {
+		res, err = s.signShardedBatch(ctx, reqs, txs)
+	}
+	if err != nil {
+		var httpErr *httpError
+		if errors.As(err, &httpErr) {
+			ctx.Error(httpErr.msg, httpErr.status)
+		} else {
+			ctx.Error(err.Error(), http.StatusInternalServerError)
+		}
+		return
+	}
+
+	ctx.SetContentType("application/json")
+	b, err := json.Marshal(res)
+	if err != nil {
+		ctx.Error(err.Error(), http.StatusInternalServerError)
+		return
+	}
+	ctx.Write(b)
+}
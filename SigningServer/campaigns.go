@@ -0,0 +1,316 @@
+package main
+
+import (
+	"context"
+	"crypto/rand"
+	"encoding/hex"
+	"encoding/json"
+	"fmt"
+	"net/http"
+	"sync"
+
+	campaign "signingserver/SigningServer/Campaign"
+
+	"github.com/ethereum/go-ethereum/common"
+	"github.com/ethereum/go-ethereum/core/types"
+	"github.com/valyala/fasthttp"
+)
+
+const (
+	campaignSigning  = "signing"
+	campaignSigned   = "signed"
+	campaignReleased = "released"
+	campaignFailed   = "failed"
+)
+
+// campaignRequest is the body of POST /campaigns. Without an id one is
+// made up.
+type campaignRequest struct {
+	ID  string      `json:"id"`
+	Txs []txRequest `json:"txs"`
+}
+
+type campaignStatus struct {
+	ID     string `json:"id"`
+	Status string `json:"status"`
+	Count  int    `json:"count"`
+	Error  string `json:"error,omitempty"`
+}
+
+type campaignState struct {
+	status string
+	count  int
+	err    string
+	// the signed transactions, kept until the campaign is released
+	records []campaign.Record
+}
+
+// campaigns are transaction lists known ahead of time. Their nonces are
+// held when they are submitted, they are signed in the background into an
+// append-only log and releasing them only hands the signed transactions
+// to the broadcaster.
+type campaigns struct {
+	log  *campaign.Log
+	mu   sync.Mutex
+	byID map[string]*campaignState
+}
+
+// enableCampaigns opens the campaign log at path, restores the campaigns
+// in it and holds the nonces of the ones not released yet.
+func (s *Signers) enableCampaigns(ctx context.Context, path string) error {
+	entries, err := campaign.Open(path)
+	if err != nil {
+		return err
+	}
+	c := &campaigns{log: entries, byID: make(map[string]*campaignState)}
+	err = entries.ReadAll(func(record campaign.Record) {
+		state := c.byID[record.Campaign]
+		if state == nil {
+			state = &campaignState{status: campaignSigned}
+			c.byID[record.Campaign] = state
+		}
+		if record.Released {
+			state.status = campaignReleased
+			state.records = nil
+			return
+		}
+		state.count++
+		state.records = append(state.records, record)
+	})
+	if err != nil {
+		return err
+	}
+	held := make(map[common.Address]uint64)
+	for _, state := range c.byID {
+		for _, record := range state.records {
+			held[record.From] = max(held[record.From], record.Nonce+1)
+		}
+	}
+	for from, next := range held {
+		if err := s.nonces.Hold(ctx, from, next); err != nil {
+			return err
+		}
+	}
+	s.campaigns = c
+	return nil
+}
+
+func (c *campaigns) status(id string) (campaignStatus, bool) {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	state, ok := c.byID[id]
+	if !ok {
+		return campaignStatus{}, false
+	}
+	return campaignStatus{ID: id, Status: state.status, Count: state.count, Error: state.err}, true
+}
+
+func newCampaignID() string {
+	var id [8]byte
+	rand.Read(id[:])
+	return hex.EncodeToString(id[:])
+}
+
+func writeJSON(ctx *fasthttp.RequestCtx, status int, v any) {
+	b, err := json.Marshal(v)
+	if err != nil {
+		ctx.Error(err.Error(), http.StatusInternalServerError)
+		return
+	}
+	ctx.SetContentType("application/json")
+	ctx.SetStatusCode(status)
+	ctx.Write(b)
+}
+
+// handleCreateCampaign holds the nonces of a campaign right away, answers
+// 202 and signs it in the background.
+func (s *Signers) handleCreateCampaign(ctx *fasthttp.RequestCtx) {
+	var req campaignRequest
+	if err := json.Unmarshal(ctx.PostBody(), &req); err != nil || len(req.Txs) == 0 {
+		signingErrors.Inc(failParse)
+		ctx.Error("Failed to parse json payload", http.StatusBadRequest)
+		return
+	}
+	txs := make([]*parsedTx, len(req.Txs))
+	for i := range req.Txs {
+		tx, err := parseTxRequest(&req.Txs[i])
+		if err != nil {
+			signingErrors.Inc(failParse)
+			ctx.Error(fmt.Sprintf("Request %d: %s", i, err), http.StatusBadRequest)
+			return
+		}
+		if s.ring != nil && !s.ring.Owns(tx.from) {
+			ctx.Error(fmt.Sprintf("Request %d: sender is owned by %s", i, s.ring.Owner(tx.from)), http.StatusMisdirectedRequest)
+			return
+		}
+		txs[i] = tx
+	}
+	if req.ID == "" {
+		req.ID = newCampaignID()
+	}
+
+	c := s.campaigns
+	c.mu.Lock()
+	if _, ok := c.byID[req.ID]; ok {
+		c.mu.Unlock()
+		ctx.Error("Campaign "+req.ID+" exists", http.StatusConflict)
+		return
+	}
+	state := &campaignState{status: campaignSigning, count: len(txs)}
+	c.byID[req.ID] = state
+	c.mu.Unlock()
+
+	r, err := s.reserve(ctx, txs, true)
+	if err != nil {
+		c.mu.Lock()
+		delete(c.byID, req.ID)
+		c.mu.Unlock()
+		signingErrors.Inc(signFailure(err))
+		logger.Error("Failed to reserve campaign nonces", "campaign", req.ID, "err", err)
+		ctx.Error("Failed to reserve nonces", http.StatusInternalServerError)
+		return
+	}
+	go s.signCampaign(req.ID, state, txs, r)
+	status, _ := c.status(req.ID)
+	writeJSON(ctx, http.StatusAccepted, status)
+}
+
+// signCampaign signs a campaign on every core and appends it to the log.
+// The nonces are given back if either fails, the signatures are then lost.
+func (s *Signers) signCampaign(id string, state *campaignState, txs []*parsedTx, r *reservation) {
+	c := s.campaigns
+	fail := func(err error) {
+		logger.Error("Failed to sign campaign", "campaign", id, "err", err)
+		c.mu.Lock()
+		state.status = campaignFailed
+		state.err = err.Error()
+		c.mu.Unlock()
+	}
+	signed, err := s.signReserved(context.Background(), txs, r)
+	if err != nil {
+		signingErrors.Inc(signFailure(err))
+		fail(err)
+		return
+	}
+	records := make([]campaign.Record, len(signed))
+	err = parallel(len(signed), func(i int) error {
+		raw, err := signed[i].MarshalBinary()
+		records[i] = campaign.Record{Campaign: id, Index: i, From: txs[i].from, Nonce: signed[i].Nonce(), Tx: raw}
+		return err
+	})
+	if err == nil {
+		err = c.log.Append(records)
+	}
+	if err != nil {
+		r.release(s.nonces)
+		signingErrors.Inc(failEncode)
+		fail(err)
+		return
+	}
+	c.mu.Lock()
+	state.status = campaignSigned
+	state.records = records
+	c.mu.Unlock()
+	logger.Info("Signed campaign", "campaign", id, "count", len(records))
+}
+
+// handleReleaseCampaign hands the signed transactions of a campaign to the
+// broadcaster in log order.
+func (s *Signers) handleReleaseCampaign(ctx *fasthttp.RequestCtx) {
+	if s.broadcaster == nil {
+		ctx.Error("Broadcast mode is off", http.StatusConflict)
+		return
+	}
+	c := s.campaigns
+	id := string(ctx.QueryArgs().Peek("id"))
+	c.mu.Lock()
+	state, ok := c.byID[id]
+	if !ok || state.status != campaignSigned {
+		c.mu.Unlock()
+		if !ok {
+			ctx.Error("No campaign "+id, http.StatusNotFound)
+		} else {
+			ctx.Error("Campaign "+id+" is "+state.status, http.StatusConflict)
+		}
+		return
+	}
+	records := state.records
+	state.status = campaignReleased
+	state.records = nil
+	c.mu.Unlock()
+
+	for _, record := range records {
+		tx := new(types.Transaction)
+		if err := tx.UnmarshalBinary(record.Tx); err != nil {
+			logger.Error("Failed to decode campaign tx", "campaign", id, "index", record.Index, "err", err)
+			continue
+		}
+		s.broadcaster.Submit(record.From, tx)
+	}
+	// a crash before this line leaves the campaign signed, releasing it
+	// again resends the same transactions, which the node ignores
+	if err := c.log.Append([]campaign.Record{{Campaign: id, Released: true}}); err != nil {
+		logger.Error("Failed to log campaign release", "campaign", id, "err", err)
+	}
+	status, _ := c.status(id)
+	writeJSON(ctx, http.StatusOK, status)
+}
+
+func (s *Signers) handleCampaignStatus(ctx *fasthttp.RequestCtx) {
+	status, ok := s.campaigns.status(string(ctx.QueryArgs().Peek("id")))
+	if !ok {
+		ctx.Error("No such campaign", http.StatusNotFound)
+		return
+	}
+	writeJSON(ctx, http.StatusOK, status)
+}
+
+// handleCampaignTxs answers with the signed transactions of a campaign
+// that has not been released, for callers that broadcast them themselves.
+func (s *Signers) handleCampaignTxs(ctx *fasthttp.RequestCtx) {
+	c := s.campaigns
+	id := string(ctx.QueryArgs().Peek("id"))
+	c.mu.Lock()
+	state, ok := c.byID[id]
+	var records []campaign.Record
+	if ok {
+		records = state.records
+	}
+	c.mu.Unlock()
+	if !ok {
+		ctx.Error("No campaign "+id, http.StatusNotFound)
+		return
+	}
+	res := make([]txResponse, len(records))
+	for i, record := range records {
+		res[i] = txResponse{
+			SignedTx: "0x" + hex.EncodeToString(record.Tx),
+			Nonce:    record.Nonce,
+			From:     record.From.Hex(),
+		}
+	}
+	writeJSON(ctx, http.StatusOK, res)
+}
+
+// handleCampaigns routes /campaigns/..., which is only served with a
+// campaign log.
+func (s *Signers) handleCampaigns(ctx *fasthttp.RequestCtx) {
+	if s.campaigns == nil {
+		ctx.Error("Campaigns are off", http.StatusNotFound)
+		return
+	}
+	switch string(ctx.Path()) {
+	case "/campaigns":
+		if ctx.IsPost() {
+			s.handleCreateCampaign(ctx)
+		} else {
+			s.handleCampaignStatus(ctx)
+		}
+	case "/campaigns/release":
+		s.handleReleaseCampaign(ctx)
+	case "/campaigns/txs":
+		s.handleCampaignTxs(ctx)
+	default:
+		ctx.Error("Not found", http.StatusNotFound)
+	}
+}
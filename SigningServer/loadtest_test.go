@@ -0,0 +1,225 @@
+package main
+
+import (
+	"encoding/json"
+	"flag"
+	"fmt"
+	"net"
+	"net/http"
+	"net/http/httptest"
+	"os"
+	"path/filepath"
+	"runtime"
+	"slices"
+	"sync"
+	"testing"
+	"time"
+
+	keystore "signingserver/SigningServer/KeyStore"
+	rpcclient "signingserver/SigningServer/RPCClient"
+
+	"github.com/ethereum/go-ethereum/common"
+	"github.com/ethereum/go-ethereum/crypto"
+	"github.com/valyala/fasthttp"
+)
+
+var (
+	load            = flag.Bool("load", false, "run the /sign load test")
+	loadDuration    = flag.Duration("load.duration", 10*time.Second, "how long the load test sends requests")
+	loadConcurrency = flag.Int("load.concurrency", 4*runtime.NumCPU(), "concurrent load test clients")
+	loadSenders     = flag.Int("load.senders", 8, "accounts the load test signs for")
+)
+
+// standInNode answers the JSON-RPC calls and batches the signing server
+// makes, like a fresh hardhat node would.
+func standInNode() *httptest.Server {
+	header := map[string]string{
+		"parentHash":       common.Hash{}.Hex(),
+		"sha3Uncles":       common.Hash{}.Hex(),
+		"miner":            common.Address{}.Hex(),
+		"stateRoot":        common.Hash{}.Hex(),
+		"transactionsRoot": common.Hash{}.Hex(),
+		"receiptsRoot":     common.Hash{}.Hex(),
+		"logsBloom":        "0x" + fmt.Sprintf("%0512x", 0),
+		"difficulty":       "0x0",
+		"number":           "0x1",
+		"gasLimit":         "0x1c9c380",
+		"gasUsed":          "0x0",
+		"timestamp":        "0x0",
+		"extraData":        "0x",
+		"mixHash":          common.Hash{}.Hex(),
+		"nonce":            "0x0000000000000000",
+		"baseFeePerGas":    "0x3b9aca00",
+	}
+	results := map[string]any{
+		"eth_chainId":              "0x539",
+		"eth_getTransactionCount":  "0x0",
+		"eth_getBlockByNumber":     header,
+		"eth_maxPriorityFeePerGas": "0x3b9aca00",
+	}
+	type request struct {
+		ID     json.RawMessage `json:"id"`
+		Method string          `json:"method"`
+	}
+	answer := func(req request) map[string]any {
+		res := map[string]any{"jsonrpc": "2.0", "id": req.ID}
+		if result, ok := results[req.Method]; ok {
+			res["result"] = result
+		} else {
+			res["error"] = map[string]any{"code": -32601, "message": "method not found"}
+		}
+		return res
+	}
+	return httptest.NewServer(http.HandlerFunc(func(w http.ResponseWriter, r *http.Request) {
+		var body json.RawMessage
+		if err := json.NewDecoder(r.Body).Decode(&body); err != nil {
+			http.Error(w, err.Error(), http.StatusBadRequest)
+			return
+		}
+		w.Header().Set("Content-Type", "application/json")
+		if body[0] != '[' {
+			var req request
+			json.Unmarshal(body, &req)
+			json.NewEncoder(w).Encode(answer(req))
+			return
+		}
+		var batch []request
+		json.Unmarshal(body, &batch)
+		res := make([]map[string]any, len(batch))
+		for i, req := range batch {
+			res[i] = answer(req)
+		}
+		json.NewEncoder(w).Encode(res)
+	}))
+}
+
+// writeKeys writes count new keys in the testPrivateKeys.json format and
+// returns the file and the addresses.
+func writeKeys(t testing.TB, count int) (string, []common.Address) {
+	var keys keystore.File
+	addrs := make([]common.Address, count)
+	for i := range addrs {
+		key, err := crypto.GenerateKey()
+		if err != nil {
+			t.Fatal(err)
+		}
+		addrs[i] = crypto.PubkeyToAddress(key.PublicKey)
+		keys.Accounts = append(keys.Accounts, keystore.Account{
+			Address:    addrs[i].Hex(),
+			PrivateKey: fmt.Sprintf("0x%x", crypto.FromECDSA(key)),
+		})
+	}
+	data, err := json.Marshal(keys)
+	if err != nil {
+		t.Fatal(err)
+	}
+	path := filepath.Join(t.TempDir(), "keys.json")
+	if err := os.WriteFile(path, data, 0o600); err != nil {
+		t.Fatal(err)
+	}
+	return path, addrs
+}
+
+func percentile(sorted []time.Duration, p float64) time.Duration {
+	return sorted[int(float64(len(sorted)-1)*p)]
+}
+
+// TestLoad serves /sign on loopback against a stand-in node and reports
+// latency percentiles and allocations per signature. Fees are left to the
+// fee oracle, like most callers do.
+//
+//	go test ./SigningServer -run TestLoad -load -load.duration 30s
+func TestLoad(t *testing.T) {
+	if !*load {
+		t.Skip("load test runs with -load")
+	}
+	discardLogs(t)
+	node := standInNode()
+	defer node.Close()
+	client, err := rpcclient.Dial(node.URL)
+	if err != nil {
+		t.Fatal(err)
+	}
+	keyFile, senders := writeKeys(t, *loadSenders)
+	signers, err := NewSigners(client, keyFile)
+	if err != nil {
+		t.Fatal(err)
+	}
+
+	ln, err := net.Listen("tcp", "127.0.0.1:0")
+	if err != nil {
+		t.Fatal(err)
+	}
+	server := &fasthttp.Server{Handler: signers.Handler}
+	go server.Serve(ln)
+	defer server.Shutdown()
+	url := "http://" + ln.Addr().String() + "/sign"
+
+	bodies := make([][]byte, len(senders))
+	for i, from := range senders {
+		req := mintRequest(from)
+		req.MaxFeePerGas, req.MaxPriorityFeePerGas = "", ""
+		bodies[i], _ = json.Marshal(req)
+	}
+
+	var (
+		mu        sync.Mutex
+		latencies []time.Duration
+		failures  int
+		wg        sync.WaitGroup
+		before    runtime.MemStats
+		after     runtime.MemStats
+	)
+	httpClient := &fasthttp.Client{MaxConnsPerHost: *loadConcurrency}
+	runtime.GC()
+	runtime.ReadMemStats(&before)
+	start := time.Now()
+	deadline := start.Add(*loadDuration)
+	for c := 0; c < *loadConcurrency; c++ {
+		wg.Add(1)
+		go func(c int) {
+			defer wg.Done()
+			req := fasthttp.AcquireRequest()
+			res := fasthttp.AcquireResponse()
+			defer fasthttp.ReleaseRequest(req)
+			defer fasthttp.ReleaseResponse(res)
+			req.Header.SetMethod(fasthttp.MethodPost)
+			req.SetRequestURI(url)
+			var own []time.Duration
+			failed := 0
+			for i := c; time.Now().Before(deadline); i++ {
+				req.SetBody(bodies[i%len(bodies)])
+				sent := time.Now()
+				err := httpClient.Do(req, res)
+				own = append(own, time.Since(sent))
+				if err != nil || res.StatusCode() != fasthttp.StatusOK {
+					failed++
+				}
+			}
+			mu.Lock()
+			latencies = append(latencies, own...)
+			failures += failed
+			mu.Unlock()
+		}(c)
+	}
+	wg.Wait()
+	elapsed := time.Since(start)
+	runtime.ReadMemStats(&after)
+
+	if len(latencies) == 0 {
+		t.Fatal("no requests were sent")
+	}
+	if failures > 0 {
+		t.Errorf("%d of %d requests failed", failures, len(latencies))
+	}
+	slices.Sort(latencies)
+	// process wide, so the load test clients are counted too
+	allocs := float64(after.Mallocs-before.Mallocs) / float64(len(latencies))
+	t.Logf("requests %d  %.0f tx/s  p50 %s  p99 %s  %.1f allocs/signature",
+		len(latencies),
+		float64(len(latencies))/elapsed.Seconds(),
+		percentile(latencies, 0.50),
+		percentile(latencies, 0.99),
+		allocs,
+	)
+}
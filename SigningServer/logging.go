@@ -0,0 +1,23 @@
+package main
+
+import (
+	"log/slog"
+	"os"
+	"sync/atomic"
+)
+
+var logger = slog.New(slog.NewJSONHandler(os.Stdout, nil))
+
+// sampler lets one in every n calls through, so that per request logging
+// costs nothing on the hot path most of the time.
+type sampler struct {
+	n     uint64
+	count atomic.Uint64
+}
+
+func (s *sampler) Sample() bool {
+	return s.count.Add(1)%s.n == 1%s.n
+}
+
+// one signed transaction in a thousand is logged, errors always are
+var signLogSampler = &sampler{n: 1000}
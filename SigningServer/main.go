@@ -1,135 +1,431 @@
 package main
 
 import (
-	"bytes"
 	"context"
 	"crypto/ecdsa"
-	"encoding/hex"
 	"encoding/json"
+	"errors"
+	"flag"
 	"fmt"
 	"log"
+	"log/slog"
 	"math/big"
 	"net/http"
 	"os"
+	"os/signal"
 	"strings"
+	"syscall"
+	"time"
+
+	broadcaster "signingserver/SigningServer/Broadcaster"
+	feeoracle "signingserver/SigningServer/FeeOracle"
+	hexcodec "signingserver/SigningServer/HexCodec"
+	keystore "signingserver/SigningServer/KeyStore"
+	noncetracker "signingserver/SigningServer/NonceTracker"
+	rpcclient "signingserver/SigningServer/RPCClient"
+	shard "signingserver/SigningServer/Shard"
 
 	"github.com/ethereum/go-ethereum/common"
+	"github.com/ethereum/go-ethereum/common/hexutil"
 	"github.com/ethereum/go-ethereum/core/types"
-	"github.com/ethereum/go-ethereum/crypto"
-	"github.com/ethereum/go-ethereum/ethclient"
-	"github.com/ethereum/go-ethereum/rlp"
 	"github.com/valyala/fasthttp"
 )
 
+// A request with gasPrice is signed as a legacy transaction, otherwise as
+// an EIP-1559 one; fee fields left out are filled in by the fee oracle.
 type txRequest struct {
-	To       string `json:"to"`
-	From     string `json:"from"`
-	Gas      uint64 `json:"gas"`
-	GasPrice string `json:"gasPrice"`
-	Value    string `json:"value"`
-	Data     string `json:"data"`
-}
-
-type SignedTransaction struct {
-	Nonce string `json:"nonce"`
-	GasPrice string `json:"gasPrice"`
-	Gas string `json:"gas"`
-	To string `json:"to"`
-	Value string `json:"value"`
-	Data string `json:"data"`
-	V string `json:"v"`
-	R string `json:"r"`
-	S string `json:"s"`
-	Hash string `json:"hash"`
+	To                   string `json:"to"`
+	From                 string `json:"from"`
+	Gas                  uint64 `json:"gas"`
+	GasPrice             string `json:"gasPrice,omitempty"`
+	MaxFeePerGas         string `json:"maxFeePerGas,omitempty"`
+	MaxPriorityFeePerGas string `json:"maxPriorityFeePerGas,omitempty"`
+	Value                string `json:"value"`
+	Data                 string `json:"data"`
 }
 
 type txResponse struct {
+	// canonical encoding, ready for eth_sendRawTransaction
 	SignedTx string `json:"signedTx"`
-	Nonce uint64 `json:"nonce"`
-	From string `json:"from"`
-	To string `json:"to"`
-}
-
-type PrivateKeys struct {
-	Accounts []string `json:"accounts"`
+	Nonce    uint64 `json:"nonce"`
+	From     string `json:"from"`
+	To       string `json:"to"`
+	// set in broadcast mode, for polling /tx/status
+	Hash string `json:"hash,omitempty"`
 }
 
 type Signers struct {
-	ethClient *ethclient.Client
-	keys map[common.Address]*ecdsa.PrivateKey
+	node   *rpcclient.Client
+	keys   *keystore.KeyStore
+	nonces *noncetracker.NonceTracker
+	// LatestSignerForChainID of the node's chain, built once
+	signer types.Signer
+	fees   *feeoracle.FeeOracle
+	// nil unless signed transactions are broadcast by the server
+	broadcaster *broadcaster.Broadcaster
+	// nil unless the senders are split between several instances
+	ring     *shard.Ring
+	redirect bool
+	peers    *fasthttp.Client
+	// nil unless campaigns can be signed ahead of time
+	campaigns *campaigns
 }
 
-func NewSigners(ethClient *ethclient.Client, privateKeyFilePath string) (*Signers, error) {
-	accounts, err := loadPrivateKey(privateKeyFilePath)
+func NewSigners(node *rpcclient.Client, privateKeyFilePath string) (*Signers, error) {
+	keys, err := keystore.Load(privateKeyFilePath)
+	if err != nil {
+		return nil, err
+	}
+	logger.Info("Loaded private keys", "count", keys.Len())
+	chainID, err := node.ChainID(context.Background())
 	if err != nil {
 		return nil, err
 	}
-	signers :=  &Signers{
-		ethClient: ethClient,
-		keys: accounts,
+	signers := &Signers{
+		node: node,
+		keys: keys,
+		// nonces the node stays behind on for a minute are treated as dropped
+		nonces: noncetracker.NewNonceTracker(node, time.Minute, logger),
+		signer: types.LatestSignerForChainID(chainID),
+		// base fees move once per block
+		fees: feeoracle.NewFeeOracle(node, chainID, 3*time.Second),
 	}
 	return signers, nil
 }
 
+var errKeyMissing = errors.New("no private key")
+
 func (s *Signers) getPrivateKey(ctx context.Context, addr common.Address) (*ecdsa.PrivateKey, error) {
-	key, ok := s.keys[addr]
+	key, ok := s.keys.Get(addr)
 	if !ok {
-		return nil, fmt.Errorf("no private key for address %s", addr.Hex())
+		return nil, fmt.Errorf("%w for address %s", errKeyMissing, addr.Hex())
+	}
+	return key.PrivateKey, nil
+}
+
+// txData builds a legacy transaction when the request sets a gas price and
+// a dynamic fee transaction otherwise.
+func (s *Signers) txData(ctx context.Context, nonce uint64, tx *parsedTx) (types.TxData, error) {
+	if tx.gasPrice != nil {
+		return &types.LegacyTx{
+			Nonce:    nonce,
+			GasPrice: tx.gasPrice,
+			Gas:      tx.gas,
+			To:       &tx.to,
+			Value:    tx.value,
+			Data:     tx.data,
+		}, nil
+	}
+	maxFee, maxPriorityFee := tx.maxFeePerGas, tx.maxPriorityFeePerGas
+	if maxFee == nil || maxPriorityFee == nil {
+		fees, err := s.fees.Fees(ctx)
+		if err != nil {
+			return nil, err
+		}
+		if maxFee == nil {
+			maxFee = fees.MaxFeePerGas
+		}
+		if maxPriorityFee == nil {
+			maxPriorityFee = fees.MaxPriorityFeePerGas
+		}
+	}
+	return &types.DynamicFeeTx{
+		ChainID:   s.signer.ChainID(),
+		Nonce:     nonce,
+		GasTipCap: maxPriorityFee,
+		GasFeeCap: maxFee,
+		Gas:       tx.gas,
+		To:        &tx.to,
+		Value:     tx.value,
+		Data:      tx.data,
+	}, nil
+}
+
+// replacements raise both fees by this much, nodes want at least 10%
+const feeBumpPercent = 20
+
+func bumped(fee *big.Int) *big.Int {
+	fee = new(big.Int).Mul(fee, big.NewInt(100+feeBumpPercent))
+	return fee.Div(fee, big.NewInt(100))
+}
+
+// bumpFees re-signs tx with the same nonce and higher fees, or the oracle's
+// fees when the base fee has risen past the bump.
+func (s *Signers) bumpFees(ctx context.Context, from common.Address, tx *types.Transaction) (*types.Transaction, error) {
+	privateKey, err := s.getPrivateKey(ctx, from)
+	if err != nil {
+		return nil, err
+	}
+	if tx.Type() == types.LegacyTxType {
+		return types.SignNewTx(privateKey, s.signer, &types.LegacyTx{
+			Nonce:    tx.Nonce(),
+			GasPrice: bumped(tx.GasPrice()),
+			Gas:      tx.Gas(),
+			To:       tx.To(),
+			Value:    tx.Value(),
+			Data:     tx.Data(),
+		})
 	}
-	return key, nil
+	maxFee, maxPriorityFee := bumped(tx.GasFeeCap()), bumped(tx.GasTipCap())
+	if fees, err := s.fees.Fees(ctx); err == nil {
+		if fees.MaxFeePerGas.Cmp(maxFee) > 0 {
+			maxFee = fees.MaxFeePerGas
+		}
+		if fees.MaxPriorityFeePerGas.Cmp(maxPriorityFee) > 0 {
+			maxPriorityFee = fees.MaxPriorityFeePerGas
+		}
+	}
+	return types.SignNewTx(privateKey, s.signer, &types.DynamicFeeTx{
+		ChainID:   s.signer.ChainID(),
+		Nonce:     tx.Nonce(),
+		GasTipCap: maxPriorityFee,
+		GasFeeCap: maxFee,
+		Gas:       tx.Gas(),
+		To:        tx.To(),
+		Value:     tx.Value(),
+		Data:      tx.Data(),
+	})
 }
-func (s *Signers) SignTx(ctx context.Context, to common.Address, from common.Address, value *big.Int, gasLimit uint64, gasPrice *big.Int, data []byte ) (*types.Transaction, error) {
-	
-	signer := types.FrontierSigner{}
-	nonce, err := s.ethClient.PendingNonceAt(ctx, from)
+
+func (s *Signers) SignTx(ctx context.Context, tx *parsedTx) (*types.Transaction, error) {
+	privateKey, err := s.getPrivateKey(ctx, tx.from)
 	if err != nil {
 		return nil, err
 	}
-	privateKey, err := s.getPrivateKey(ctx, from)
+	start := time.Now()
+	var nonce uint64
+	if s.broadcaster == nil {
+		// the client broadcasts the signed transaction itself, maybe after
+		// staleAfter, so Sync must not hand the nonce out again meanwhile
+		nonce, err = s.nonces.HoldNonce(ctx, tx.from)
+	} else {
+		nonce, err = s.nonces.GetNonce(ctx, tx.from)
+	}
+	nonceDuration.Since(start)
 	if err != nil {
 		return nil, err
 	}
-	tx := types.NewTransaction(nonce, to, value, gasLimit, gasPrice, data)
-	signedTx, err := types.SignTx(tx, signer, privateKey)
-	fmt.Printf("chainID: %d \n",signedTx.ChainId())
-	fmt.Printf("nonce: %d \n",signedTx.Nonce())
+	start = time.Now()
+	data, err := s.txData(ctx, nonce, tx)
 	if err != nil {
-		fmt.Printf("Failed to sign tx: %s\n", err)
+		s.nonces.Release(tx.from, nonce)
 		return nil, err
 	}
-
+	signedTx, err := types.SignNewTx(privateKey, s.signer, data)
+	if err != nil {
+		s.nonces.Release(tx.from, nonce)
+		return nil, err
+	}
+	signDuration.Since(start)
+	senderTxs.Inc(tx.from)
+	if signLogSampler.Sample() {
+		logger.LogAttrs(ctx, slog.LevelInfo, "signed tx",
+			slog.String("from", tx.from.Hex()),
+			slog.Uint64("nonce", nonce),
+			slog.String("hash", signedTx.Hash().Hex()),
+		)
+	}
 	return signedTx, nil
 }
 
+type parsedTx struct {
+	to    common.Address
+	from  common.Address
+	value *big.Int
+	gas   uint64
+	// nil when left out of the request
+	gasPrice             *big.Int
+	maxFeePerGas         *big.Int
+	maxPriorityFeePerGas *big.Int
+	data                 []byte
+}
+
+// parseHexBig converts a hex string to big.Int, returning nil for an empty
+// string when the field is optional.
+func parseHexBig(s string, optional bool) (*big.Int, error) {
+	if s == "" && optional {
+		return nil, nil
+	}
+	value, ok := new(big.Int).SetString(strings.TrimPrefix(s, "0x"), 16)
+	if !ok {
+		return nil, errors.New("Invalid hexadecimal value")
+	}
+	return value, nil
+}
 
-func loadPrivateKey(filepath string) (map[common.Address]*ecdsa.PrivateKey, error) {
-	data, err := os.ReadFile(filepath)
-	if err != nil {
+func parseTxRequest(req *txRequest) (*parsedTx, error) {
+	tx := &parsedTx{
+		to:   common.HexToAddress(req.To),
+		from: common.HexToAddress(req.From),
+		gas:  req.Gas,
+	}
+	var err error
+	// decoded like the data of /sign, 0x prefixed or not
+	if tx.data, err = hexcodec.AppendDecode(nil, []byte(req.Data)); err != nil {
 		return nil, err
 	}
-	var privateKeys PrivateKeys
-	err = json.Unmarshal(data, &privateKeys)
-	if err != nil {
+	if tx.value, err = parseHexBig(req.Value, false); err != nil {
+		return nil, err
+	}
+	if tx.gasPrice, err = parseHexBig(req.GasPrice, true); err != nil {
 		return nil, err
 	}
-	// create a mapping of address to private key
-	accounts := make(map[common.Address]*ecdsa.PrivateKey)
-	for _, key := range privateKeys.Accounts {
-		key = strings.TrimPrefix(key, "0x")
-		privateKey, err := crypto.HexToECDSA(key)
+	if tx.maxFeePerGas, err = parseHexBig(req.MaxFeePerGas, true); err != nil {
+		return nil, err
+	}
+	if tx.maxPriorityFeePerGas, err = parseHexBig(req.MaxPriorityFeePerGas, true); err != nil {
+		return nil, err
+	}
+	return tx, nil
+}
+
+func newTxResponse(signedTx *types.Transaction, req *txRequest, withHash bool) (txResponse, error) {
+	rawTx, err := signedTx.MarshalBinary()
+	if err != nil {
+		return txResponse{}, err
+	}
+	res := txResponse{
+		SignedTx: hexutil.Encode(rawTx),
+		Nonce:    signedTx.Nonce(),
+		From:     req.From,
+		To:       req.To,
+	}
+	if withHash {
+		res.Hash = signedTx.Hash().Hex()
+	}
+	return res, nil
+}
+
+// signFailure is the signingErrors type of an error from signing.
+func signFailure(err error) string {
+	if errors.Is(err, errKeyMissing) {
+		return failKeyMissing
+	}
+	return failSign
+}
+
+func (s *Signers) handleSign(ctx *fasthttp.RequestCtx) {
+	defer requestDuration.Since(time.Now())
+	inFlight.Add(1)
+	defer inFlight.Add(-1)
+	r := getSignRequest()
+	defer putSignRequest(r)
+	if err := r.parse(ctx.PostBody()); err != nil {
+		signingErrors.Inc(failParse)
+		if errors.Is(err, hexcodec.ErrInvalidHex) {
+			ctx.Error(err.Error(), http.StatusBadRequest)
+		} else {
+			ctx.Error("Failed to parse json payload", http.StatusBadRequest)
+		}
+		return
+	}
+	if s.ring != nil && !s.ring.Owns(r.tx.from) {
+		s.forward(ctx, s.ring.Owner(r.tx.from))
+		return
+	}
+	signedTx, err := s.SignTx(ctx, &r.tx)
+	if err != nil {
+		signingErrors.Inc(signFailure(err))
+		logger.Error("Failed to sign tx", "from", r.tx.from.Hex(), "err", err)
+		ctx.Error("Failed to sign tx", http.StatusInternalServerError)
+		return
+	}
+	if s.broadcaster != nil {
+		s.broadcaster.Submit(r.tx.from, signedTx)
+	}
+	if err := r.appendResponse(signedTx, s.broadcaster != nil); err != nil {
+		signingErrors.Inc(failEncode)
+		logger.Error("Failed to encode tx", "err", err)
+		ctx.Error("Failed to encode tx", http.StatusInternalServerError)
+		return
+	}
+	ctx.SetContentType("application/json")
+	ctx.Write(r.out)
+}
+
+func (s *Signers) Handler(ctx *fasthttp.RequestCtx) {
+	switch string(ctx.Path()) {
+	case "/sign":
+		s.handleSign(ctx)
+	case "/sign/batch":
+		s.handleSignBatch(ctx)
+	case "/tx/status":
+		s.handleTxStatus(ctx)
+	case "/campaigns", "/campaigns/release", "/campaigns/txs":
+		s.handleCampaigns(ctx)
+	case "/metrics":
+		ctx.SetContentType("text/plain; version=0.0.4")
+		registry.Write(ctx)
+	default:
+		// Handle other paths here, if any...
+	}
+}
+
+// handleTxStatus answers GET /tx/status?hash=0x..&hash=0x.. with the
+// TxStatus of each hash, in order. Unknown hashes are reported as null.
+func (s *Signers) handleTxStatus(ctx *fasthttp.RequestCtx) {
+	if s.broadcaster == nil {
+		ctx.Error("Broadcast mode is off", http.StatusNotFound)
+		return
+	}
+	hashes := ctx.QueryArgs().PeekMulti("hash")
+	statuses := make([]*broadcaster.TxStatus, len(hashes))
+	for i, hash := range hashes {
+		if status, ok := s.broadcaster.Status(common.HexToHash(string(hash))); ok {
+			statuses[i] = &status
+		}
+	}
+	b, err := json.Marshal(statuses)
+	if err != nil {
+		ctx.Error(err.Error(), http.StatusInternalServerError)
+		return
+	}
+	ctx.SetContentType("application/json")
+	ctx.Write(b)
+}
+
+// reloadKeysOnHangup reloads the key file on every SIGHUP, so keys can be
+// rotated without dropping the requests in flight.
+func reloadKeysOnHangup(keys *keystore.KeyStore) {
+	hangups := make(chan os.Signal, 1)
+	signal.Notify(hangups, syscall.SIGHUP)
+	for range hangups {
+		added, removed, err := keys.Reload()
 		if err != nil {
-			return nil, err
+			logger.Error("Failed to reload private keys", "err", err)
+			continue
 		}
-		accounts[crypto.PubkeyToAddress(privateKey.PublicKey)] = privateKey
-		fmt.Printf("Loaded private key for address %s\n", crypto.PubkeyToAddress(privateKey.PublicKey).Hex())
+		logger.Info("Reloaded private keys", "added", added, "removed", removed, "count", keys.Len())
 	}
-	return accounts, nil
+}
+
+// enableBroadcast makes the server submit what it signs to the node and
+// track it until mined.
+func (s *Signers) enableBroadcast(ctx context.Context) {
+	// replaced after 3 blocks, finished transactions are kept 10 minutes
+	s.broadcaster = broadcaster.NewBroadcaster(s.node, s.bumpFees, 3, 10*time.Minute, logger)
+	registry.NewGaugeFunc("signing_server_broadcast_queued_txs", "Signed transactions waiting to be submitted.", func() float64 {
+		queued, _ := s.broadcaster.Depth()
+		return float64(queued)
+	})
+	registry.NewGaugeFunc("signing_server_broadcast_pending_txs", "Submitted transactions not mined yet.", func() float64 {
+		_, pending := s.broadcaster.Depth()
+		return float64(pending)
+	})
+	go s.broadcaster.Run(ctx, time.Second)
 }
 
 func main() {
+	broadcast := flag.Bool("broadcast", false, "submit signed transactions to the node and track their receipts")
+	listen := flag.String("listen", "127.0.0.1:8080", "address to serve on")
+	peers := flag.String("peers", "", "comma separated base URLs of all instances to split the senders between, e.g. http://127.0.0.1:8080,http://127.0.0.1:8081")
+	self := flag.String("self", "", "base URL of this instance among -peers, http://<listen> by default")
+	campaignLog := flag.String("campaign-log", "", "append-only log of campaigns signed ahead of time, campaigns are off without it")
+	redirect := flag.Bool("redirect", false, "redirect requests for senders of other instances instead of forwarding them")
+	flag.Parse()
 
 	ethNodeAddr := "http://127.0.0.1:8545"
-	client, err := ethclient.Dial(ethNodeAddr)
+	client, err := rpcclient.Dial(ethNodeAddr)
 	if err != nil {
 		log.Fatal(err)
 	}
@@ -137,90 +433,28 @@ func main() {
 	if err != nil {
 		log.Fatal(err)
 	}
-	// Load private key from file and panic if error occurs
-	priv, err := loadPrivateKey("../testPrivateKeys.json")
-	if err != nil {
-		log.Fatal(err)
+	if *peers != "" {
+		if *self == "" {
+			*self = "http://" + *listen
+		}
+		if err := signers.enableSharding(strings.Split(*peers, ","), *self, *redirect); err != nil {
+			log.Fatal(err)
+		}
+	}
+	if *campaignLog != "" {
+		if err := signers.enableCampaigns(context.Background(), *campaignLog); err != nil {
+			log.Fatal(err)
+		}
+	}
+	if *broadcast {
+		signers.enableBroadcast(context.Background())
 	}
-	// privKey = priv
-	_ = priv
+	// re-sync senders whose signed transactions never reached the node
+	go signers.nonces.Watch(context.Background(), 15*time.Second)
+	go reloadKeysOnHangup(signers.keys)
 	// Create fasthttp server instance
 	server := fasthttp.Server{
-		Handler: func(ctx *fasthttp.RequestCtx) {
-			switch string(ctx.Path()) {
-			case "/sign":
-				// Parse request body JSON
-				var req txRequest
-		
-				if err := json.Unmarshal(ctx.PostBody(), &req); err != nil {
-					fmt.Println(err)
-					ctx.Error("Failed to parse json payload", http.StatusBadRequest)
-					return
-				}
-				// Convert value from hex string to big.Int
-				value, ok := new(big.Int).SetString(strings.TrimPrefix(req.Value, "0x"), 16)
-				if !ok {
-					ctx.Error("Invalid hexadecimal value", http.StatusBadRequest)
-					return
-				}
-				// Convert value from hex string to big.Int
-				gasPrice, ok := new(big.Int).SetString(strings.TrimPrefix(req.GasPrice, "0x"), 16)
-				if !ok {
-					ctx.Error("Invalid hexadecimal value", http.StatusBadRequest)
-					return
-				}
-				data := common.Hex2Bytes(req.Data)
-				// Create tx from request fields and sign it using private key
-				toAddr := common.HexToAddress(req.To)
-				fromAddr := common.HexToAddress(req.From)
-				fmt.Printf("To: %s\n", toAddr.Hex())
-				signedTx, err := signers.SignTx(ctx, toAddr, fromAddr, value, req.Gas, gasPrice, data)
-				v, r, s := signedTx.RawSignatureValues()
-				buf := new(bytes.Buffer)
-				signedTxObj := SignedTransaction{
-					Nonce: fmt.Sprintf("%x",signedTx.Nonce()),
-					GasPrice: signedTx.GasPrice().Text(16),
-					Gas: fmt.Sprintf("%x",signedTx.Gas()),
-					To: signedTx.To().Hex(),
-					Value: signedTx.Value().String(),
-					Data: hex.EncodeToString(signedTx.Data()),
-					V: v.Text(16),
-					R: r.Text(16),
-					S: s.Text(16),
-					Hash: signedTx.Hash().Hex(),
-				}
-				fmt.Printf("signedTxObj: %s\n", signedTxObj)
-				rlp.Encode(buf, signedTxObj)
-				signedTxHex := hex.EncodeToString(buf.Bytes())
-				fmt.Printf("signedTxHex: %s\n", signedTxHex)
-				if err != nil {
-					fmt.Printf("Failed to sign tx: %s\n", err)
-					ctx.Error("Failed to sign tx", http.StatusInternalServerError)
-					return
-				}
-				err = signedTx.EncodeRLP(buf)
-				if err != nil {
-					fmt.Printf("Failed to encode tx: %s\n", err)
-					ctx.Error("Failed to encode tx", http.StatusInternalServerError)
-					return
-				}
-				
-				
-				// Return signed tx in hex format
-				fmt.Println(signedTxHex)
-
-				ctx.SetContentType("application/json")
-				res := txResponse{SignedTx: signedTxHex, Nonce: signedTx.Nonce(), From: req.From, To: req.To}
-				b, err := json.Marshal(res)
-				if err != nil {
-					ctx.Error(err.Error(), http.StatusInternalServerError)
-					return
-				}
-				ctx.Write(b)
-			default:
-				// Handle other paths here, if any...
-			}
-		},
-	}
-	server.ListenAndServe("127.0.0.1:8080")
+		Handler: signers.Handler,
+	}
+	server.ListenAndServe(*listen)
 }
@@ -0,0 +1,155 @@
+package main
+
+import (
+	"context"
+	"encoding/json"
+	"io"
+	"log/slog"
+	"math/big"
+	"testing"
+	"time"
+
+	keystore "signingserver/SigningServer/KeyStore"
+	noncetracker "signingserver/SigningServer/NonceTracker"
+
+	"github.com/ethereum/go-ethereum/common"
+	"github.com/ethereum/go-ethereum/core/types"
+	"github.com/valyala/fasthttp"
+)
+
+// transactions signed per op of the batch benchmark
+const benchBatchSize = 100
+
+type zeroNonce struct{}
+
+func (zeroNonce) PendingNonceAt(ctx context.Context, account common.Address) (uint64, error) {
+	return 0, nil
+}
+
+// mintRequest is a GenericToken.mint(address,uint256) call from from. The
+// fees are set by the client, so the fee oracle is not needed.
+func mintRequest(from common.Address) txRequest {
+	return txRequest{
+		To:                   "0x5FbDB2315678afecb367f032d93F642f64180aa3",
+		From:                 from.Hex(),
+		Gas:                  100000,
+		MaxFeePerGas:         "0x77359400",
+		MaxPriorityFeePerGas: "0x3b9aca00",
+		Value:                "0x0",
+		Data:                 "40c10f19000000000000000000000000f39fd6e51aad88f6f4ce6ab8827279cfffb9226600000000000000000000000000000000000000000000000000000000000003e8",
+	}
+}
+
+// discardLogs silences the logger until the end of tb.
+func discardLogs(tb testing.TB) {
+	std := logger
+	logger = slog.New(slog.NewJSONHandler(io.Discard, nil))
+	tb.Cleanup(func() { logger = std })
+}
+
+func benchSigners(b *testing.B) (*Signers, txRequest) {
+	keyFile, senders := writeKeys(b, 1)
+	keys, err := keystore.Load(keyFile)
+	if err != nil {
+		b.Fatal(err)
+	}
+	signers := &Signers{
+		keys:   keys,
+		nonces: noncetracker.NewNonceTracker(zeroNonce{}, time.Minute, logger),
+		signer: types.LatestSignerForChainID(big.NewInt(1337)),
+	}
+	discardLogs(b)
+	return signers, mintRequest(senders[0])
+}
+
+func newRequestCtx() *fasthttp.RequestCtx {
+	var ctx fasthttp.RequestCtx
+	ctx.Init(&fasthttp.Request{}, nil, nil)
+	return &ctx
+}
+
+// serve runs the handler on ctx, which is reused between calls so that
+// allocs/op only counts the server.
+func serve(b *testing.B, s *Signers, ctx *fasthttp.RequestCtx, path string, body []byte) {
+	ctx.Request.Reset()
+	ctx.Response.Reset()
+	ctx.Request.Header.SetMethod(fasthttp.MethodPost)
+	ctx.Request.SetRequestURI(path)
+	ctx.Request.SetBody(body)
+	s.Handler(ctx)
+	if ctx.Response.StatusCode() != fasthttp.StatusOK {
+		b.Fatalf("%s: %d %s", path, ctx.Response.StatusCode(), ctx.Response.Body())
+	}
+}
+
+func reportTxRate(b *testing.B, txsPerOp int) {
+	b.ReportMetric(float64(b.N*txsPerOp)/b.Elapsed().Seconds(), "tx/s")
+}
+
+// BenchmarkSign signs one transaction per op, so allocs/op is the number of
+// allocations per signature.
+func BenchmarkSign(b *testing.B) {
+	s, req := benchSigners(b)
+	body, _ := json.Marshal(req)
+	ctx := newRequestCtx()
+	b.ReportAllocs()
+	b.ResetTimer()
+	for i := 0; i < b.N; i++ {
+		serve(b, s, ctx, "/sign", body)
+	}
+	reportTxRate(b, 1)
+}
+
+// BenchmarkSignParallel sends single requests from one client per core.
+func BenchmarkSignParallel(b *testing.B) {
+	s, req := benchSigners(b)
+	body, _ := json.Marshal(req)
+	b.ReportAllocs()
+	b.ResetTimer()
+	b.RunParallel(func(pb *testing.PB) {
+		ctx := newRequestCtx()
+		for pb.Next() {
+			serve(b, s, ctx, "/sign", body)
+		}
+	})
+	reportTxRate(b, 1)
+}
+
+func BenchmarkSignBatch(b *testing.B) {
+	s, req := benchSigners(b)
+	reqs := make([]txRequest, benchBatchSize)
+	for i := range reqs {
+		reqs[i] = req
+	}
+	body, _ := json.Marshal(reqs)
+	ctx := newRequestCtx()
+	b.ReportAllocs()
+	b.ResetTimer()
+	for i := 0; i < b.N; i++ {
+		serve(b, s, ctx, "/sign/batch", body)
+	}
+	reportTxRate(b, benchBatchSize)
+}
+
+func TestParseTxRequestData(t *testing.T) {
+	req := mintRequest(common.Address{})
+	want, err := parseTxRequest(&req)
+	if err != nil {
+		t.Fatal(err)
+	}
+	if len(want.data) != 68 {
+		t.Fatalf("decoded %d bytes of mint calldata, want 68", len(want.data))
+	}
+	req.Data = "0x" + req.Data
+	got, err := parseTxRequest(&req)
+	if err != nil {
+		t.Fatal(err)
+	}
+	if string(got.data) != string(want.data) {
+		t.Fatalf("0x prefixed data decoded to %x, want %x", got.data, want.data)
+	}
+	req.Data = "0xzz"
+	if _, err := parseTxRequest(&req); err == nil {
+		t.Fatal("invalid hex data was accepted")
+	}
+}
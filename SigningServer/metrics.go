@@ -0,0 +1,37 @@
+package main
+
+import (
+	metrics "signingserver/SigningServer/Metrics"
+
+	"github.com/ethereum/go-ethereum/common"
+)
+
+// failure types of signingErrors
+const (
+	failParse      = "parse"
+	failKeyMissing = "key_missing"
+	failSign       = "sign"
+	failEncode     = "encode"
+	// sharded mode only
+	failForward     = "forward"
+	failMisdirected = "misdirected"
+)
+
+var registry metrics.Registry
+
+var (
+	requestDuration = registry.NewHistogram("signing_server_sign_request_duration_seconds",
+		"Time to answer a /sign request.", metrics.DefaultBuckets)
+	batchDuration = registry.NewHistogram("signing_server_sign_batch_request_duration_seconds",
+		"Time to answer a /sign/batch request.", metrics.DefaultBuckets)
+	signDuration = registry.NewHistogram("signing_server_signature_duration_seconds",
+		"Time to build and sign one transaction once its nonce is known.", metrics.DefaultBuckets)
+	nonceDuration = registry.NewHistogram("signing_server_nonce_fetch_duration_seconds",
+		"Time to hand out the nonces of one request and sender.", metrics.DefaultBuckets)
+	senderTxs = metrics.NewCounterVec(&registry, "signing_server_signed_txs_total",
+		"Transactions signed per sender.", "sender", common.Address.Hex)
+	signingErrors = metrics.NewCounterVec(&registry, "signing_server_errors_total",
+		"Failed requests by failure type.", "type", func(s string) string { return s })
+	inFlight = registry.NewGauge("signing_server_requests_in_flight",
+		"Signing requests being handled.")
+)
@@ -0,0 +1,144 @@
+package main
+
+import (
+	"math/big"
+	"strconv"
+	"sync"
+
+	hexcodec "signingserver/SigningServer/HexCodec"
+
+	"github.com/buger/jsonparser"
+	"github.com/ethereum/go-ethereum/core/types"
+)
+
+// txRequest fields, in the order of txRequestPaths
+const (
+	fieldTo = iota
+	fieldFrom
+	fieldGas
+	fieldGasPrice
+	fieldMaxFeePerGas
+	fieldMaxPriorityFeePerGas
+	fieldValue
+	fieldData
+)
+
+var txRequestPaths = [][]string{
+	{"to"},
+	{"from"},
+	{"gas"},
+	{"gasPrice"},
+	{"maxFeePerGas"},
+	{"maxPriorityFeePerGas"},
+	{"value"},
+	{"data"},
+}
+
+// signRequest is the per request state of /sign, pooled so that a request
+// reuses the buffers of an earlier one. The parsed transaction points into
+// it and from, to point into the request body, so neither may outlive the
+// request.
+type signRequest struct {
+	tx parsedTx
+	// echoed back as given
+	from []byte
+	to   []byte
+
+	value                big.Int
+	gasPrice             big.Int
+	maxFeePerGas         big.Int
+	maxPriorityFeePerGas big.Int
+	data                 []byte
+	scratch              []byte
+	out                  []byte
+}
+
+var signRequests = sync.Pool{
+	New: func() any { return new(signRequest) },
+}
+
+func getSignRequest() *signRequest {
+	return signRequests.Get().(*signRequest)
+}
+
+func putSignRequest(r *signRequest) {
+	r.tx = parsedTx{}
+	r.from, r.to = nil, nil
+	signRequests.Put(r)
+}
+
+// parse reads a txRequest JSON object without copying strings out of body.
+// A missing to is the zero address like before; value is required.
+func (r *signRequest) parse(body []byte) error {
+	r.tx = parsedTx{}
+	r.data = r.data[:0]
+	hasValue := false
+	var err error
+	jsonparser.EachKey(body, func(idx int, value []byte, vt jsonparser.ValueType, e error) {
+		if err != nil {
+			return
+		}
+		if e != nil {
+			err = e
+			return
+		}
+		switch idx {
+		case fieldTo:
+			r.to = value
+			err = hexcodec.DecodeFixed(r.tx.to[:], value)
+		case fieldFrom:
+			r.from = value
+			err = hexcodec.DecodeFixed(r.tx.from[:], value)
+		case fieldGas:
+			var gas int64
+			gas, err = jsonparser.ParseInt(value)
+			r.tx.gas = uint64(gas)
+		case fieldGasPrice:
+			r.scratch, err = hexcodec.DecodeBig(&r.gasPrice, value, r.scratch)
+			r.tx.gasPrice = &r.gasPrice
+		case fieldMaxFeePerGas:
+			r.scratch, err = hexcodec.DecodeBig(&r.maxFeePerGas, value, r.scratch)
+			r.tx.maxFeePerGas = &r.maxFeePerGas
+		case fieldMaxPriorityFeePerGas:
+			r.scratch, err = hexcodec.DecodeBig(&r.maxPriorityFeePerGas, value, r.scratch)
+			r.tx.maxPriorityFeePerGas = &r.maxPriorityFeePerGas
+		case fieldValue:
+			r.scratch, err = hexcodec.DecodeBig(&r.value, value, r.scratch)
+			r.tx.value = &r.value
+			hasValue = true
+		case fieldData:
+			r.data, err = hexcodec.AppendDecode(r.data, value)
+			r.tx.data = r.data
+		}
+	}, txRequestPaths...)
+	if err != nil {
+		return err
+	}
+	if !hasValue {
+		return hexcodec.ErrInvalidHex
+	}
+	return nil
+}
+
+// appendResponse appends the txResponse JSON of signedTx to r.out.
+func (r *signRequest) appendResponse(signedTx *types.Transaction, withHash bool) error {
+	raw, err := signedTx.MarshalBinary()
+	if err != nil {
+		return err
+	}
+	out := append(r.out[:0], `{"signedTx":"`...)
+	out = hexcodec.AppendEncode(out, raw)
+	out = append(out, `","nonce":`...)
+	out = strconv.AppendUint(out, signedTx.Nonce(), 10)
+	out = append(out, `,"from":"`...)
+	out = append(out, r.from...)
+	out = append(out, `","to":"`...)
+	out = append(out, r.to...)
+	if withHash {
+		hash := signedTx.Hash()
+		out = append(out, `","hash":"`...)
+		out = hexcodec.AppendEncode(out, hash[:])
+	}
+	r.out = append(out, `"}`...)
+	return nil
+}
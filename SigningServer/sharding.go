@@ -0,0 +1,151 @@
+package main
+
+import (
+	"encoding/json"
+	"fmt"
+	"net/http"
+	"time"
+
+	shard "signingserver/SigningServer/Shard"
+
+	"github.com/valyala/fasthttp"
+)
+
+// set on requests an instance forwards to the owner of their sender
+const forwardedHeader = "X-Signing-Forwarded-By"
+
+// enableSharding makes the instance at self sign only for the senders the
+// ring of peers assigns to it. Requests for other senders are forwarded to
+// their owner, or redirected there when redirect is set, so each sender's
+// nonces are handed out by a single instance.
+func (s *Signers) enableSharding(peers []string, self string, redirect bool) error {
+	ring, err := shard.NewRing(peers, self, shard.DefaultReplicas)
+	if err != nil {
+		return err
+	}
+	s.ring = ring
+	s.redirect = redirect
+	s.peers = &fasthttp.Client{
+		ReadTimeout:  30 * time.Second,
+		WriteTimeout: 30 * time.Second,
+	}
+	return nil
+}
+
+func isForwarded(ctx *fasthttp.RequestCtx) bool {
+	return len(ctx.Request.Header.Peek(forwardedHeader)) > 0
+}
+
+// misdirected answers a forwarded request for a sender this instance does
+// not own. The peers disagree on the ring, and signing here could hand out
+// a nonce twice.
+func misdirected(owner string) *httpError {
+	signingErrors.Inc(failMisdirected)
+	return &httpError{http.StatusMisdirectedRequest, "Sender is owned by " + owner}
+}
+
+// forward hands a /sign request to owner and relays its answer.
+func (s *Signers) forward(ctx *fasthttp.RequestCtx, owner string) {
+	if isForwarded(ctx) {
+		err := misdirected(owner)
+		ctx.Error(err.msg, err.status)
+		return
+	}
+	if s.redirect {
+		ctx.Redirect(owner+string(ctx.RequestURI()), http.StatusTemporaryRedirect)
+		return
+	}
+	req := fasthttp.AcquireRequest()
+	defer fasthttp.ReleaseRequest(req)
+	ctx.Request.CopyTo(req)
+	req.SetRequestURI(owner + string(ctx.RequestURI()))
+	req.Header.Set(forwardedHeader, s.ring.Self())
+	if err := s.peers.Do(req, &ctx.Response); err != nil {
+		signingErrors.Inc(failForward)
+		logger.Error("Failed to forward request", "owner", owner, "err", err)
+		ctx.Error("Failed to reach the signer of this sender", http.StatusBadGateway)
+	}
+}
+
+// signShardedBatch signs the transactions of the senders this instance owns
+// and forwards the others to their owners, one sub-batch per owner, all at
+// once. Shards are not atomic: when one fails the others may already have
+// signed, and their nonces come back through the tracker's resync.
+func (s *Signers) signShardedBatch(ctx *fasthttp.RequestCtx, reqs []txRequest, txs []*parsedTx) ([]txResponse, error) {
+	groups := make(map[string][]int)
+	var owners []string
+	for i, tx := range txs {
+		owner := s.ring.Owner(tx.from)
+		if groups[owner] == nil {
+			owners = append(owners, owner)
+		}
+		groups[owner] = append(groups[owner], i)
+	}
+	if isForwarded(ctx) {
+		for _, owner := range owners {
+			if owner != s.ring.Self() {
+				return nil, misdirected(owner)
+			}
+		}
+	}
+
+	res := make([]txResponse, len(txs))
+	err := parallel(len(owners), func(o int) error {
+		indices := groups[owners[o]]
+		subReqs := make([]txRequest, len(indices))
+		subTxs := make([]*parsedTx, len(indices))
+		for j, i := range indices {
+			subReqs[j], subTxs[j] = reqs[i], txs[i]
+		}
+		var subRes []txResponse
+		var err error
+		if owners[o] == s.ring.Self() {
+			subRes, err = s.signBatch(ctx, subReqs, subTxs)
+		} else {
+			subRes, err = s.forwardBatch(owners[o], subReqs)
+		}
+		if err != nil {
+			return err
+		}
+		for j, i := range indices {
+			res[i] = subRes[j]
+		}
+		return nil
+	})
+	if err != nil {
+		return nil, err
+	}
+	return res, nil
+}
+
+func (s *Signers) forwardBatch(owner string, reqs []txRequest) ([]txResponse, error) {
+	body, err := json.Marshal(reqs)
+	if err != nil {
+		return nil, err
+	}
+	req := fasthttp.AcquireRequest()
+	res := fasthttp.AcquireResponse()
+	defer fasthttp.ReleaseRequest(req)
+	defer fasthttp.ReleaseResponse(res)
+	req.Header.SetMethod(fasthttp.MethodPost)
+	req.Header.SetContentType("application/json")
+	req.Header.Set(forwardedHeader, s.ring.Self())
+	req.SetRequestURI(owner + "/sign/batch")
+	req.SetBody(body)
+	if err := s.peers.Do(req, res); err != nil {
+		signingErrors.Inc(failForward)
+		logger.Error("Failed to forward batch", "owner", owner, "size", len(reqs), "err", err)
+		return nil, &httpError{http.StatusBadGateway, "Failed to reach the signer of a sender"}
+	}
+	if res.StatusCode() != fasthttp.StatusOK {
+		return nil, &httpError{res.StatusCode(), fmt.Sprintf("%s: %s", owner, res.Body())}
+	}
+	var subRes []txResponse
+	if err := json.Unmarshal(res.Body(), &subRes); err != nil {
+		return nil, err
+	}
+	if len(subRes) != len(reqs) {
+		return nil, fmt.Errorf("%s answered %d of %d transactions", owner, len(subRes), len(reqs))
+	}
+	return subRes, nil
+}
@@ -0,0 +1,139 @@
+package main
+
+import (
+	"encoding/json"
+	"fmt"
+	"net"
+	"sync"
+	"testing"
+
+	rpcclient "signingserver/SigningServer/RPCClient"
+
+	"github.com/ethereum/go-ethereum/common"
+	"github.com/valyala/fasthttp"
+)
+
+// TestShardedNonces runs three instances splitting eight senders and sends
+// every request to a random instance. Each sender must still get every
+// nonce exactly once, as with a single instance.
+func TestShardedNonces(t *testing.T) {
+	const instances, perSender = 3, 20
+	discardLogs(t)
+	node := standInNode()
+	defer node.Close()
+	keyFile, senders := writeKeys(t, 8)
+
+	var listeners []net.Listener
+	var peers []string
+	for i := 0; i < instances; i++ {
+		ln, err := net.Listen("tcp", "127.0.0.1:0")
+		if err != nil {
+			t.Fatal(err)
+		}
+		listeners = append(listeners, ln)
+		peers = append(peers, "http://"+ln.Addr().String())
+	}
+	for i, ln := range listeners {
+		client, err := rpcclient.Dial(node.URL)
+		if err != nil {
+			t.Fatal(err)
+		}
+		signers, err := NewSigners(client, keyFile)
+		if err != nil {
+			t.Fatal(err)
+		}
+		if err := signers.enableSharding(peers, peers[i], false); err != nil {
+			t.Fatal(err)
+		}
+		server := &fasthttp.Server{Handler: signers.Handler}
+		go server.Serve(ln)
+		defer server.Shutdown()
+	}
+
+	var (
+		mu     sync.Mutex
+		nonces = make(map[string][]uint64)
+		wg     sync.WaitGroup
+		client fasthttp.Client
+	)
+	post := func(url string, body []byte) ([]byte, error) {
+		req := fasthttp.AcquireRequest()
+		res := fasthttp.AcquireResponse()
+		defer fasthttp.ReleaseRequest(req)
+		defer fasthttp.ReleaseResponse(res)
+		req.Header.SetMethod(fasthttp.MethodPost)
+		req.SetRequestURI(url)
+		req.SetBody(body)
+		if err := client.Do(req, res); err != nil {
+			return nil, err
+		}
+		if res.StatusCode() != fasthttp.StatusOK {
+			return nil, fmt.Errorf("%s: %d %s", url, res.StatusCode(), res.Body())
+		}
+		return append([]byte(nil), res.Body()...), nil
+	}
+	record := func(res ...txResponse) {
+		mu.Lock()
+		defer mu.Unlock()
+		for _, r := range res {
+			nonces[r.From] = append(nonces[r.From], r.Nonce)
+		}
+	}
+
+	for i, from := range senders {
+		wg.Add(1)
+		go func(i int, from common.Address) {
+			defer wg.Done()
+			body, _ := json.Marshal(mintRequest(from))
+			for j := 0; j < perSender; j++ {
+				out, err := post(peers[(i+j)%instances]+"/sign", body)
+				if err != nil {
+					t.Error(err)
+					return
+				}
+				var res txResponse
+				if err := json.Unmarshal(out, &res); err != nil {
+					t.Error(err)
+					return
+				}
+				record(res)
+			}
+		}(i, from)
+	}
+	// one batch over all senders, split between the owners
+	batch := make([]txRequest, len(senders))
+	for i, from := range senders {
+		batch[i] = mintRequest(from)
+	}
+	body, _ := json.Marshal(batch)
+	out, err := post(peers[0]+"/sign/batch", body)
+	if err != nil {
+		t.Fatal(err)
+	}
+	wg.Wait()
+	var batchRes []txResponse
+	if err := json.Unmarshal(out, &batchRes); err != nil {
+		t.Fatal(err)
+	}
+	for i, res := range batchRes {
+		if res.From != batch[i].From {
+			t.Errorf("batch answer %d is from %s, want %s", i, res.From, batch[i].From)
+		}
+	}
+	record(batchRes...)
+
+	for _, from := range senders {
+		got := nonces[from.Hex()]
+		seen := make(map[uint64]bool)
+		for _, nonce := range got {
+			if seen[nonce] || nonce >= perSender+1 {
+				t.Errorf("%s: nonces %v are not 0..%d once each", from.Hex(), got, perSender)
+				break
+			}
+			seen[nonce] = true
+		}
+		if len(got) != perSender+1 {
+			t.Errorf("%s: signed %d transactions, want %d", from.Hex(), len(got), perSender+1)
+		}
+	}
+}
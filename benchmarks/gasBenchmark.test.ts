@@ -0,0 +1,418 @@
+import fs from "fs";
+import path from "path";
+import { expect } from "chai";
+import { ethers } from "hardhat";
+import { loadFixture } from "@nomicfoundation/hardhat-network-helpers";
+import { SignerWithAddress } from "@nomicfoundation/hardhat-ethers/signers";
+import { ContractTransactionResponse } from "ethers";
+import {
+  AssetNFT,
+  GenericToken,
+  MockAssetNFT,
+  MockERC20HookLogic,
+} from "../typechain-types";
+import { GenericTokenConfigStruct } from "../typechain-types/contracts/ERC20/GenericToken";
+import { NFTTokenConfigStruct } from "../typechain-types/contracts/ERC721/AssetNFT";
+import { deployGenericToken, deployMockERC20HookLogic } from "../tests/setup";
+import { MINT_10GCOIN_AMOUNT } from "../tests/constants";
+import { getERC20FeePercentInteger } from "../scripts/DeploymentUtils";
+
+// gas used per operation, recorded with `npm run gas-baseline`
+type GasBaseline = {
+  // how much more gas than the baseline an operation may use
+  thresholdPercent: number;
+  gas: { [operation: string]: number };
+};
+
+const BASELINE_PATH = path.join(__dirname, "gasBaseline.json");
+const UPDATE_BASELINE = process.env.UPDATE_GAS_BASELINE === "true";
+
+describe("Gas benchmark", () => {
+  const baseline: GasBaseline = JSON.parse(
+    fs.readFileSync(BASELINE_PATH, "utf-8")
+  );
+  const measured: { [operation: string]: number } = {};
+
+  // record the gas of an operation and fail if it regressed past the
+  // threshold or has no baseline yet
+  function check(operation: string, gas: bigint) {
+    measured[operation] = Number(gas);
+    if (UPDATE_BASELINE) {
+      return;
+    }
+    const previous = baseline.gas[operation];
+    expect(
+      previous,
+      `${operation} is not in the baseline, run npm run gas-baseline`
+    ).to.not.be.undefined;
+    const limit = Math.floor(previous * (1 + baseline.thresholdPercent / 100));
+    expect(
+      Number(gas),
+      `${operation} used ${gas} gas, the baseline is ${previous}`
+    ).to.be.at.most(limit);
+  }
+
+  async function gasOf(tx: Promise<ContractTransactionResponse>) {
+    const receipt = await (await tx).wait();
+    if (receipt === null) {
+      throw new Error("Transaction failed");
+    }
+    return receipt.gasUsed;
+  }
+
+  after(() => {
+    const rows = Object.keys(measured)
+      .sort()
+      .map((operation) => ({
+        operation,
+        gas: measured[operation],
+        baseline: baseline.gas[operation] ?? "-",
+      }));
+    console.table(rows);
+    if (UPDATE_BASELINE) {
+      const updated: GasBaseline = {
+        thresholdPercent: baseline.thresholdPercent,
+        gas: Object.fromEntries(
+          Object.keys(measured)
+            .sort()
+            .map((operation) => [operation, measured[operation]])
+        ),
+      };
+      fs.writeFileSync(BASELINE_PATH, JSON.stringify(updated, null, 2) + "\n");
+    }
+  });
+
+  describe("GenericToken", () => {
+    let token: GenericToken;
+    let mockAssetNFT: MockAssetNFT;
+    let mockERC20HookLogic: MockERC20HookLogic;
+    let admin: SignerWithAddress;
+    let assetGovernor: SignerWithAddress;
+    let feeCollector: SignerWithAddress;
+    let minter: SignerWithAddress;
+    let user1: SignerWithAddress;
+    let user2: SignerWithAddress;
+    let user3: SignerWithAddress;
+    const tokenValue = ethers.parseEther("100");
+    const transferAmount = ethers.parseEther("10");
+    // token ids 0-9 are converted to tokens for user1 and user2, the rest
+    // are left with the minter
+    const convertedIDs = 10;
+    // an asset nft of a value no other nft has
+    const otherValue = ethers.parseEther("50");
+    const otherTokenID = 1000;
+    async function deployFixture() {
+      [admin, assetGovernor, feeCollector, minter, user1, user2, user3] =
+        await ethers.getSigners();
+      const mockAssetNFTBase = await ethers.getContractFactory("MockAssetNFT");
+      const mockAssetNFTDeployTx = await mockAssetNFTBase.deploy();
+      await mockAssetNFTDeployTx.waitForDeployment();
+      const mockAssetNFTAddress = await mockAssetNFTDeployTx.getAddress();
+      mockAssetNFT = await ethers.getContractAt(
+        "MockAssetNFT",
+        mockAssetNFTAddress
+      );
+      const tokenConfig: GenericTokenConfigStruct = {
+        name: "TestToken",
+        symbol: "TEST",
+        decimals: 18,
+        transferHook: ethers.ZeroAddress,
+        mintHook: ethers.ZeroAddress,
+        burnHook: ethers.ZeroAddress,
+        feeCollector: feeCollector.address,
+        admin: admin.address,
+        assetNFT: mockAssetNFTAddress,
+        feePercent: 0,
+        assetGovernor: assetGovernor.address,
+      };
+      token = await deployGenericToken("GenericToken", tokenConfig);
+      mockERC20HookLogic = await deployMockERC20HookLogic(
+        await token.getAddress()
+      );
+      for (let tokenID = 0; tokenID < convertedIDs + 10; tokenID++) {
+        await mockAssetNFT.mint(tokenValue, tokenID, minter.address);
+      }
+      await mockAssetNFT
+        .connect(minter)
+        .setApprovalForAll(await token.getAddress(), true);
+      for (let tokenID = 0; tokenID < convertedIDs; tokenID++) {
+        const to = tokenID % 2 === 0 ? user1 : user2;
+        await token
+          .connect(minter)
+          ["mint(address,uint256)"](to.address, tokenID);
+      }
+    }
+
+    beforeEach(async () => {
+      await loadFixture(deployFixture);
+    });
+
+    async function turnOnHooks() {
+      await mockERC20HookLogic.turnOnAfterHook();
+      const hook = await mockERC20HookLogic.getAddress();
+      await token.connect(admin).setExtTransferHook(hook);
+      await token.connect(admin).setExtMintHook(hook);
+      await token.connect(admin).setExtBurnHook(hook);
+    }
+
+    async function turnOnFees() {
+      await token.connect(admin).setFee(getERC20FeePercentInteger(0.001));
+    }
+
+    it("_transfer", async () => {
+      check(
+        "GenericToken.transfer",
+        await gasOf(
+          token.connect(user1).transfer(user2.address, transferAmount)
+        )
+      );
+    });
+
+    it("_transfer with fee", async () => {
+      await turnOnFees();
+      check(
+        "GenericToken.transfer with fee",
+        await gasOf(
+          token.connect(user1).transfer(user2.address, transferAmount)
+        )
+      );
+    });
+
+    it("_transfer with hook", async () => {
+      await turnOnHooks();
+      check(
+        "GenericToken.transfer with hook",
+        await gasOf(
+          token.connect(user1).transfer(user2.address, transferAmount)
+        )
+      );
+    });
+
+    it("_transfer with fee and hook", async () => {
+      await turnOnFees();
+      await turnOnHooks();
+      check(
+        "GenericToken.transfer with fee and hook",
+        await gasOf(
+          token.connect(user1).transfer(user2.address, transferAmount)
+        )
+      );
+    });
+
+    it("mint", async () => {
+      check(
+        "GenericToken.mint",
+        await gasOf(
+          token
+            .connect(minter)
+            ["mint(address,uint256)"](user1.address, convertedIDs)
+        )
+      );
+    });
+
+    it("mint with hooks", async () => {
+      await turnOnHooks();
+      check(
+        "GenericToken.mint with hooks",
+        await gasOf(
+          token
+            .connect(minter)
+            ["mint(address,uint256)"](user1.address, convertedIDs)
+        )
+      );
+    });
+
+    // the plain mint and burn keep tokenValue indexed in the available values;
+    // these two add and remove a value, which writes the index
+    it("mint of a new value", async () => {
+      await mockAssetNFT.mint(otherValue, otherTokenID, minter.address);
+      check(
+        "GenericToken.mint of a new value",
+        await gasOf(
+          token
+            .connect(minter)
+            ["mint(address,uint256)"](user1.address, otherTokenID)
+        )
+      );
+    });
+
+    it("burn of the last nft of a value", async () => {
+      await mockAssetNFT.mint(otherValue, otherTokenID, minter.address);
+      await token
+        .connect(minter)
+        ["mint(address,uint256)"](user1.address, otherTokenID);
+      check(
+        "GenericToken.burn of the last nft of a value",
+        await gasOf(token.connect(user1).burn(otherValue))
+      );
+    });
+
+    it("burn", async () => {
+      check(
+        "GenericToken.burn",
+        await gasOf(token.connect(user1).burn(tokenValue))
+      );
+    });
+
+    it("burn with hooks", async () => {
+      await turnOnHooks();
+      check(
+        "GenericToken.burn with hooks",
+        await gasOf(token.connect(user1).burn(tokenValue))
+      );
+    });
+
+    it("recaptureFrozenFunds", async () => {
+      await token.connect(assetGovernor).freezeAccount(user1.address);
+      check(
+        "GenericToken.recaptureFrozenFunds",
+        await gasOf(
+          token.connect(assetGovernor).recaptureFrozenFunds(user1.address)
+        )
+      );
+    });
+
+    // transfers that add, keep or remove holders of the EnumerableERC20
+    // owner list
+    it("owner list: add owner", async () => {
+      check(
+        "EnumerableERC20 transfer to new owner",
+        await gasOf(
+          token.connect(user1).transfer(user3.address, transferAmount)
+        )
+      );
+    });
+
+    it("owner list: keep owners", async () => {
+      check(
+        "EnumerableERC20 transfer between owners",
+        await gasOf(
+          token.connect(user1).transfer(user2.address, transferAmount)
+        )
+      );
+    });
+
+    it("owner list: remove owner", async () => {
+      const balance = await token.balanceOf(user1.address);
+      check(
+        "EnumerableERC20 transfer of whole balance",
+        await gasOf(
+          token.connect(user1).transfer(user2.address, balance)
+        )
+      );
+    });
+
+    it("owner list: replace owner", async () => {
+      const balance = await token.balanceOf(user1.address);
+      check(
+        "EnumerableERC20 transfer of whole balance to new owner",
+        await gasOf(
+          token.connect(user1).transfer(user3.address, balance)
+        )
+      );
+    });
+  });
+
+  describe("AssetNFT", () => {
+    let assetNFT: AssetNFT;
+    let admin: SignerWithAddress;
+    let assetGovernor: SignerWithAddress;
+    let metaDataOperator: SignerWithAddress;
+    let nftMinter: SignerWithAddress;
+    let nftBurner: SignerWithAddress;
+    // stands in for the erc20 contract, which freezes accounts
+    let erc20: SignerWithAddress;
+    let user1: SignerWithAddress;
+    const testTokenURI = ethers.solidityPackedKeccak256(["string"], ["test"]);
+    let chipCount = 0;
+
+    function mintInputs(count: number, to: string) {
+      const inputs: AssetNFT.MintInputStruct[] = [];
+      for (let i = 0; i < count; i++) {
+        inputs.push({
+          to: to,
+          erc20Value: MINT_10GCOIN_AMOUNT,
+          tokenURI: testTokenURI,
+          // every chip may only be minted once
+          chip: ethers.solidityPackedKeccak256(["uint256"], [chipCount++]),
+        });
+      }
+      return inputs;
+    }
+
+    async function deployFixture() {
+      [
+        admin,
+        assetGovernor,
+        metaDataOperator,
+        nftMinter,
+        nftBurner,
+        erc20,
+        user1,
+      ] = await ethers.getSigners();
+      const nftBase = await ethers.getContractFactory("AssetNFT");
+      const nftDeployTx = await nftBase.deploy();
+      await nftDeployTx.waitForDeployment();
+      assetNFT = await ethers.getContractAt(
+        "AssetNFT",
+        await nftDeployTx.getAddress()
+      );
+      const nftConfig: NFTTokenConfigStruct = {
+        name: "testNFT",
+        symbol: "TNFT",
+        admin: admin.address,
+        minter: nftMinter.address,
+        burner: nftBurner.address,
+        metaDataOperator: metaDataOperator.address,
+        baseURI: "https://test.com/",
+        assetGovernor: assetGovernor.address,
+        ERC20Address: erc20.address,
+      };
+      await assetNFT.initialize(nftConfig);
+      await assetNFT
+        .connect(nftMinter)
+        ["mint((address,uint256,string,string)[])"](
+          mintInputs(100, user1.address)
+        );
+    }
+
+    beforeEach(async () => {
+      await loadFixture(deployFixture);
+    });
+
+    for (const batchSize of [1, 10, 100]) {
+      it(`mint batch of ${batchSize}`, async () => {
+        check(
+          `AssetNFT.mint batch of ${batchSize}`,
+          await gasOf(
+            assetNFT
+              .connect(nftMinter)
+              ["mint((address,uint256,string,string)[])"](
+                mintInputs(batchSize, user1.address)
+              )
+          )
+        );
+      });
+    }
+
+    it("recaptureFrozenFunds", async () => {
+      await assetNFT.connect(erc20).freezeAccount(user1.address);
+      check(
+        "AssetNFT.recaptureFrozenFunds of 10",
+        await gasOf(
+          assetNFT
+            .connect(assetGovernor)
+            .recaptureFrozenFunds(user1.address, 10)
+        )
+      );
+    });
+
+    it("getUserPositions", async () => {
+      // a view, measured as the gas of calling it in a transaction
+      check(
+        "AssetNFT.getUserPositions of 100",
+        await assetNFT.getUserPositions.estimateGas(user1.address, 0, 100)
+      );
+    });
+  });
+});
@@ -74,21 +74,35 @@ contract GenericToken is
     IERC721ReceiverUpgradeable,
     EnumerableERC20
 {
+    using EnumerableSetUpgradeable for EnumerableSetUpgradeable.UintSet;
     bytes32 public constant FEE_COLLECTOR_ROLE =
         keccak256("FEE_COLLECTOR_ROLE");
     bytes32 public constant ASSET_GOVERNOR_ROLE =
         keccak256("ASSET_GOVERNOR_ROLE");
+    // most asset nfts converted by one mintBatch call. Estimated at about
+    // 60k gas per nft, not yet measured; the mintBatch gas test fails if a
+    // full batch no longer fits into a 30M gas block
+    uint256 public constant MAX_MINT_BATCH_SIZE = 200;
     IAssetNFT internal _assetNFT;
     // mapping of asset nft value to list of token ids
     mapping(uint256 => uint256[]) internal _assetNFTValueToTokenIds;
     // mapping account to frozen status
     mapping(address => bool) internal _frozenAccounts;
+    // values with at least one token id in _assetNFTValueToTokenIds, only
+    // complete on its own for tokens that held no asset nfts before it
+    // existed, see indexAvailableValues
+    EnumerableSetUpgradeable.UintSet internal _availableValues;
     error NoNFTWithValue(uint256 amount_);
+    error InvalidDenominations();
+    error NoNFTsForAmount(uint256 amount_, uint256 remainder_);
+    error ZeroAmount();
     error MissingAssetNFTAddress();
     error MissingAssetGovernorAddress();
     error AccountFrozen(address account_);
     error AccountNotFrozen(address account_);
     error NotOwnerOfNFT(uint256 tokenID_);
+    error EmptyMintBatch();
+    error MintBatchTooLarge(uint256 size_, uint256 maxSize_);
     event RecapturedFrozenFunds(address account_);
     event FrozeAccount(address account_);
     event UnfrozeAccount(address account_);
@@ -280,6 +294,25 @@ contract GenericToken is
         _mint(msg.sender, tokenID_);
     }
 
+    /**
+     * @dev Mints tokens for several asset NFTs in one call. The mint hook
+     * is called once and the balance of `to_` is updated once, both with
+     * the summed value of the NFTs.
+     *
+     * Requirements:
+     * - same as `mint` for every token ID in `tokenIDs_`
+     * - `tokenIDs_` must not be empty
+     * - `tokenIDs_` must hold at most `MAX_MINT_BATCH_SIZE` token IDs
+     * @param to_ The address to mint tokens to.
+     * @param tokenIDs_ The IDs of the asset NFTs to mint tokens for.
+     */
+    function mintBatch(
+        address to_,
+        uint256[] calldata tokenIDs_
+    ) public whenNotPaused {
+        _mintBatch(to_, tokenIDs_);
+    }
+
     /**
      * @dev Burns a specified amount of tokens to claim ownership of an NFT with equivalent value.
      *
@@ -310,14 +343,8 @@ contract GenericToken is
      * @param amount_ The amount of tokens to burn.
      */
     function burn(uint256 amount_) public whenNotPaused {
-        uint256 length = _assetNFTValueToTokenIds[amount_].length;
-        if (length == 0) {
-            // if there are no nfts with the value of the amount
-            revert NoNFTWithValue(amount_);
-        }
         // get available nft id
-        uint256 tokenID = _assetNFTValueToTokenIds[amount_][length - 1];
-        _assetNFTValueToTokenIds[amount_].pop();
+        uint256 tokenID = _takeAvailableNFT(amount_);
         // get the hook address
         address h = _getBurnHook();
         if (h == address(0)) {
@@ -339,6 +366,73 @@ contract GenericToken is
         }
     }
 
+    /**
+     * @dev Burns `amount_` tokens to claim several NFTs whose values add up
+     * to exactly `amount_`.
+     *
+     * The NFTs are picked greedily: as many NFTs of the first denomination
+     * as fit in the remaining amount and are available, then the next
+     * denomination and so on. The burn hook is called once for `amount_`.
+     * `getAvailableValues` lists the denominations that can be redeemed.
+     *
+     * Requirements:
+     *
+     * - The contract must not be paused.
+     * - `amount_` must not be zero.
+     * - The caller must have a sufficient token balance to burn `amount_`.
+     * - `denominations_` must be non-zero and strictly descending.
+     * - The available NFTs of `denominations_` must add up to `amount_`.
+     *
+     * @param amount_ The amount of tokens to burn.
+     * @param denominations_ The NFT values to redeem, largest first.
+     * @return tokenIDs The IDs of the NFTs transferred to the caller.
+     */
+    function redeem(
+        uint256 amount_,
+        uint256[] calldata denominations_
+    ) public whenNotPaused returns (uint256[] memory tokenIDs) {
+        if (amount_ == 0) revert ZeroAmount();
+        // count the nfts of each denomination before taking any
+        uint256[] memory counts = new uint256[](denominations_.length);
+        uint256 remainder = amount_;
+        uint256 total;
+        for (uint256 i = 0; i < denominations_.length; i++) {
+            uint256 value = denominations_[i];
+            if (value == 0 || (i > 0 && value >= denominations_[i - 1]))
+                revert InvalidDenominations();
+            uint256 count = remainder / value;
+            uint256 available = _assetNFTValueToTokenIds[value].length;
+            if (count > available) count = available;
+            counts[i] = count;
+            remainder -= count * value;
+            total += count;
+        }
+        if (remainder != 0) revert NoNFTsForAmount(amount_, remainder);
+        tokenIDs = new uint256[](total);
+        uint256 j = 0;
+        for (uint256 i = 0; i < denominations_.length; i++) {
+            for (uint256 k = 0; k < counts[i]; k++) {
+                tokenIDs[j] = _takeAvailableNFT(denominations_[i]);
+                j++;
+            }
+        }
+        // get the hook address
+        address h = _getBurnHook();
+        IExtHookLogic impl = IExtHookLogic(h);
+        bool doAH;
+        if (h != address(0)) {
+            doAH = impl.beforeTokenBurn(msg.sender, amount_); // wake-disable-line
+        }
+        _burn(msg.sender, amount_);
+        for (uint256 i = 0; i < total; i++) {
+            _assetNFT.safeTransferFrom(address(this), msg.sender, tokenIDs[i]);
+        }
+        if (doAH) {
+            // IF AFTER HOOK IS REQUIRED, CALL IT
+            impl.afterTokenBurn(msg.sender, amount_);
+        }
+    }
+
     /**
      * @dev Collects all the fees accumulated by the contract and sends them to the specified address.
      *
@@ -464,6 +558,46 @@ contract GenericToken is
         return _isFrozen(account_);
     }
 
+    /**
+     * @dev Adds values that already have asset nfts to the index read by
+     * `getAvailableValues`. Only needed for tokens that held asset nfts
+     * before the index existed; values without an asset nft are skipped.
+     *
+     * Requirements:
+     * - the caller must be the admin
+     * @param values_ the asset nft values to index
+     */
+    function indexAvailableValues(
+        uint256[] calldata values_
+    ) public onlyAdmin {
+        for (uint256 i = 0; i < values_.length; i++) {
+            if (_assetNFTValueToTokenIds[values_[i]].length > 0)
+                _availableValues.add(values_[i]);
+        }
+    }
+
+    /**
+     * @dev returns the values of the asset nfts held by this contract,
+     * the denominations that can be passed to `redeem`. Asset nfts held
+     * from before the index existed are only listed once their values are
+     * passed to `indexAvailableValues`.
+     * @return uint256[] the values with at least one asset nft, unordered
+     */
+    function getAvailableValues() public view returns (uint256[] memory) {
+        return _availableValues.values();
+    }
+
+    /**
+     * @dev returns the number of asset nfts held by this contract with a value
+     * @param value_ the value of the asset nfts
+     * @return uint256 the number of asset nfts that can be redeemed for `value_`
+     */
+    function getAvailableNFTCount(
+        uint256 value_
+    ) public view returns (uint256) {
+        return _assetNFTValueToTokenIds[value_].length;
+    }
+
     /**
      * @dev This function wraps the base _transfer function
      * This function invokes the custom before and after hook logic.
@@ -555,7 +689,7 @@ contract GenericToken is
         address h = _getMintHook();
         uint256 value = _assetNFT.getTokenValue(tokenID_);
         // add the token id to the asset nft value mapping
-        _assetNFTValueToTokenIds[value].push(tokenID_);
+        _addAvailableNFT(value, tokenID_);
         if (h == address(0)) {
             _assetNFT.safeTransferFrom(msg.sender, address(this), tokenID_);
             super._mint(to_, value);
@@ -572,6 +706,42 @@ contract GenericToken is
         }
     }
 
+    /**
+     * @dev Batched form of `_mint`. Every token ID is added to the
+     * `_assetNFTValueToTokenIds` mapping and every asset NFT is transferred
+     * from the caller, but the hooks and the ERC20 mint run once for the
+     * summed value.
+     * @param to_ The address to mint tokens to.
+     * @param tokenIDs_ The IDs of the asset NFTs to mint tokens for.
+     */
+    function _mintBatch(address to_, uint256[] calldata tokenIDs_) internal {
+        if (tokenIDs_.length == 0) revert EmptyMintBatch();
+        if (tokenIDs_.length > MAX_MINT_BATCH_SIZE)
+            revert MintBatchTooLarge(tokenIDs_.length, MAX_MINT_BATCH_SIZE);
+        // get the hook address
+        address h = _getMintHook();
+        uint256 total;
+        for (uint256 i = 0; i < tokenIDs_.length; i++) {
+            uint256 value = _assetNFT.getTokenValue(tokenIDs_[i]);
+            // add the token id to the asset nft value mapping
+            _addAvailableNFT(value, tokenIDs_[i]);
+            total += value;
+        }
+        IExtHookLogic impl = IExtHookLogic(h);
+        bool doAH;
+        if (h != address(0)) {
+            doAH = impl.beforeTokenMint(to_, total); // wake-disable-line
+        }
+        for (uint256 i = 0; i < tokenIDs_.length; i++) {
+            _assetNFT.safeTransferFrom(msg.sender, address(this), tokenIDs_[i]);
+        }
+        super._mint(to_, total);
+        if (doAH) {
+            // IF AFTER HOOK IS REQUIRED, CALL IT
+            impl.afterTokenMint(to_, total);
+        }
+    }
+
     /**
      * @dev this function overrides the _beforeTokenTransfer function with the
      * _beforeTokenTransfer function from ERC20PausableUpgradeable
@@ -604,6 +774,36 @@ contract GenericToken is
         return _frozenAccounts[account_];
     }
 
+    /**
+     * @dev adds an asset nft held by this contract to the nfts of its value
+     * @param value_ the value of the asset nft
+     * @param tokenID_ the id of the asset nft
+     */
+    function _addAvailableNFT(uint256 value_, uint256 tokenID_) internal {
+        uint256[] storage tokenIDs = _assetNFTValueToTokenIds[value_];
+        if (tokenIDs.length == 0) _availableValues.add(value_);
+        tokenIDs.push(tokenID_);
+    }
+
+    /**
+     * @dev removes the last added asset nft of a value
+     * @param value_ the value of the asset nft
+     * @return tokenID the id of the asset nft
+     */
+    function _takeAvailableNFT(
+        uint256 value_
+    ) internal returns (uint256 tokenID) {
+        uint256[] storage tokenIDs = _assetNFTValueToTokenIds[value_];
+        uint256 length = tokenIDs.length;
+        if (length == 0) {
+            // if there are no nfts with the value of the amount
+            revert NoNFTWithValue(value_);
+        }
+        tokenID = tokenIDs[length - 1];
+        tokenIDs.pop();
+        if (length == 1) _availableValues.remove(value_);
+    }
+
     function _onlyFeesAdmin() internal override onlyAdmin {}
 
     function _onlyHookAdmin() internal override onlyAdmin {}
@@ -9,7 +9,16 @@ interface IGenericToken is IERC20Upgradeable {
 
     function mint(uint256 amount) external;
 
+    function mintBatch(address to_, uint256[] calldata tokenIDs_) external;
+
     function burn(uint256 amount) external;
+
+    function redeem(
+        uint256 amount_,
+        uint256[] calldata denominations_
+    ) external returns (uint256[] memory tokenIDs);
+
+    function getAvailableValues() external view returns (uint256[] memory);
 }
 
 interface IGenericTokenAdmin {
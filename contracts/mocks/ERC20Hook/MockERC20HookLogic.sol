@@ -17,6 +17,8 @@ contract MockERC20HookLogic is ERC20HookLogic, Ownable {
     address public beforeBurnFrom;
     uint256 public beforeBurnAmount;
     bool public afterBurnHookRan;
+    uint256 public beforeBurnCalls;
+    uint256 public afterBurnCalls;
     address public beforeTransferFrom;
     address public beforeTransferTo;
     uint256 public beforeTransferAmount;
@@ -63,6 +65,7 @@ contract MockERC20HookLogic is ERC20HookLogic, Ownable {
     ) internal virtual override {
         beforeBurnFrom = from_;
         beforeBurnAmount = amount_;
+        beforeBurnCalls++;
     }
 
     function _beforeTransfer(
@@ -89,6 +92,7 @@ contract MockERC20HookLogic is ERC20HookLogic, Ownable {
         uint256 amount_
     ) internal virtual override {
         afterBurnHookRan = true;
+        afterBurnCalls++;
         return;
     }
 
@@ -3,6 +3,7 @@ module signingserver
 go 1.21.1
 
 require (
+	github.com/buger/jsonparser v1.1.1
 	github.com/ethereum/go-ethereum v1.13.2
 	github.com/valyala/fasthttp v1.50.0
 )
@@ -13,7 +14,6 @@ require (
 	github.com/andybalholm/brotli v1.0.5 // indirect
 	github.com/bits-and-blooms/bitset v1.5.0 // indirect
 	github.com/btcsuite/btcd/btcec/v2 v2.2.0 // indirect
-	github.com/buger/jsonparser v1.1.1 // indirect
 	github.com/consensys/bavard v0.1.13 // indirect
 	github.com/consensys/gnark-crypto v0.10.0 // indirect
 	github.com/crate-crypto/go-kzg-4844 v0.3.0 // indirect
@@ -0,0 +1,338 @@
+"""
+Batching of read-only calls made through the generated contract classes.
+
+Calls are queued explicitly with `CallBatch.call(contract.method, *args)`,
+which returns a `PendingCall` instead of issuing an eth_call. Calls made
+directly on the contracts inside `batch_calls()` are not affected. The queue
+is sent on exit, either as a single JSON-RPC batch request or as one
+`aggregate3` call to a Multicall3 contract, and each `PendingCall.value` then
+holds the usual typed return value.
+"""
+from __future__ import annotations
+
+import json
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type, Union
+
+from woke.development.core import Abi, Account, Address, Chain, RequestType
+from woke.development.json_rpc.communicator import JsonRpcError
+from woke.utils import get_package_version
+
+from pytypes._codec import codec_for
+
+# canonical Multicall3 deployment, available at the same address on most chains
+MULTICALL3_ADDRESS = Address("0xcA11bde05977b3631167028862bE2a173976CA11")
+# aggregate3((address,bool,bytes)[])
+_AGGREGATE3_SELECTOR = bytes.fromhex("82ad56cb")
+
+# woke versions whose chain interface internals the JSON-RPC batch transport
+# below was checked against
+_SUPPORTED_WOKE_VERSIONS = {"3.4.2"}
+
+
+class BatchNotSentError(Exception):
+    pass
+
+
+class BatchResponseError(Exception):
+    pass
+
+
+class UnsupportedBatchTransportError(Exception):
+    pass
+
+
+def _send_json_rpc_batch(chain: Chain, block: Union[int, str], calls: List[Dict]) -> List[Dict]:
+    """
+    Send `calls` as one JSON-RPC batch of eth_call requests.
+
+    Woke only exposes single requests, so this is the one place that reaches
+    into the private transport of the chain interface.
+    """
+    version = get_package_version("woke")
+    if version not in _SUPPORTED_WOKE_VERSIONS:
+        raise UnsupportedBatchTransportError(
+            f"JSON-RPC batching is only supported with woke "
+            f"{', '.join(sorted(_SUPPORTED_WOKE_VERSIONS))}, found {version}; "
+            f"pass a multicall address instead"
+        )
+    chain_interface = chain.chain_interface
+    try:
+        protocol = chain_interface._communicator._protocol
+        encoded_block = chain_interface._encode_block_identifier(block)
+        requests = [
+            {
+                "jsonrpc": "2.0",
+                "method": "eth_call",
+                "params": [chain_interface._encode_tx_params(params), encoded_block],
+                "id": i,
+            }
+            for i, params in enumerate(calls)
+        ]
+    except AttributeError as e:
+        raise UnsupportedBatchTransportError(
+            f"The woke chain interface does not support JSON-RPC batching: {e}"
+        ) from e
+
+    responses = protocol.send_recv(json.dumps(requests))
+    if isinstance(responses, dict):
+        # some nodes answer a rejected batch with a single error object
+        raise BatchResponseError(
+            f"Node rejected a batch of {len(requests)} eth_call requests: "
+            f"{responses.get('error', responses)}"
+        )
+    if not isinstance(responses, list):
+        raise BatchResponseError(
+            f"Expected a list of responses to a batch of {len(requests)} "
+            f"eth_call requests, got {type(responses).__name__}"
+        )
+    return responses
+
+
+class PendingCall:
+    __slots__ = ("chain", "to", "data", "abi", "return_type", "_result", "_error", "_done")
+
+    def __init__(
+        self, chain: Chain, to: str, data: bytes, abi: Dict, return_type: Type
+    ) -> None:
+        self.chain = chain
+        self.to = to
+        self.data = data
+        self.abi = abi
+        self.return_type = return_type
+        self._result = None
+        self._error: Optional[Exception] = None
+        self._done = False
+
+    def __repr__(self) -> str:
+        return f"<PendingCall {self.abi.get('name')} to {self.to}>"
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def value(self) -> Any:
+        if not self._done:
+            raise BatchNotSentError("Batch has not been sent yet")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def _set_output(self, output: bytes) -> None:
+        try:
+            self._result = self.chain._process_return_data(
+                None, output, self.abi, self.return_type
+            )
+        except Exception as e:
+            self._error = e
+        self._done = True
+
+    def _set_revert(self, revert_data: bytes) -> None:
+        try:
+            self.chain._process_revert_data(None, revert_data)
+        except Exception as e:
+            self._error = e
+        self._done = True
+
+    def _set_rpc_error(self, error: Dict) -> None:
+        try:
+            # raises the typed revert error if the node reported one
+            self.chain._process_call_revert(JsonRpcError(error))
+            raise JsonRpcError(error)
+        except Exception as e:
+            self._error = e
+        self._done = True
+
+    def _set_error(self, error: Exception) -> None:
+        self._error = error
+        self._done = True
+
+
+class _CallRecorder:
+    """
+    Stands in for a contract when a generated method is called through
+    `CallBatch.call`, so the call is queued instead of executed.
+    """
+
+    def __init__(self, batch: CallBatch, contract: Any) -> None:
+        self.chain = contract.chain
+        self.address = contract.address
+        self._batch = batch
+        self._abi = type(contract)._abi
+
+    def _execute(
+        self,
+        chain: Chain,
+        request_type: RequestType,
+        data: str,
+        arguments,
+        return_tx: bool,
+        return_type: Type,
+        from_,
+        to,
+        value,
+        gas_limit,
+        gas_price,
+        max_fee_per_gas,
+        max_priority_fee_per_gas,
+        access_list,
+        type,
+        block,
+        confirmations,
+    ) -> PendingCall:
+        selector = bytes.fromhex(data)
+        abi = self._abi.get(selector)
+        if abi is None or abi.get("stateMutability") not in {"view", "pure"}:
+            raise ValueError("Only view and pure functions can be batched")
+        if request_type != RequestType.CALL:
+            raise ValueError("Only request_type='call' can be batched")
+        if chain is not self._batch.chain:
+            raise ValueError("Contract does not belong to the chain of the batch")
+        if from_ is not None or value not in {0, "0"}:
+            raise ValueError("Calls with from_ or value cannot be batched")
+        if block is not None and block != self._batch.block:
+            raise ValueError(f"Call block {block} differs from the batch block {self._batch.block}")
+        if isinstance(to, Account):
+            to = to.address
+        return self._batch._enqueue(str(to), abi, selector, list(arguments), return_type)
+
+
+class CallBatch:
+    def __init__(
+        self,
+        chain: Chain,
+        *,
+        multicall: Optional[Union[Account, Address, str]] = None,
+        block: Union[int, str] = "latest",
+        max_size: int = 500,
+    ) -> None:
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.chain = chain
+        if isinstance(multicall, Account):
+            multicall = multicall.address
+        self.multicall = str(multicall) if multicall is not None else None
+        self.block = block
+        self.max_size = max_size
+        self._queue: List[PendingCall] = []
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def call(self, method: Callable, *args, **kwargs) -> PendingCall:
+        """
+        Queue a view or pure method of a deployed contract, e.g.
+        `batch.call(token.balanceOf, account)`.
+        """
+        contract = getattr(method, "__self__", None)
+        if contract is None or not hasattr(type(contract), "_abi"):
+            raise TypeError("Expected a method of a deployed contract")
+        return method.__func__(_CallRecorder(self, contract), *args, **kwargs)
+
+    def _enqueue(
+        self, to: str, abi: Dict, selector: bytes, arguments: List, return_type: Type
+    ) -> PendingCall:
+        data = selector + codec_for(abi).encode(self.chain, arguments)
+        call = PendingCall(self.chain, to, data, abi, return_type)
+        self._queue.append(call)
+        return call
+
+    def send(self) -> None:
+        while self._queue:
+            chunk = self._queue[: self.max_size]
+            del self._queue[: self.max_size]
+            if self.multicall is None:
+                self._send_rpc_batch(chunk)
+            else:
+                self._send_multicall(chunk)
+
+    def _call_params(self, call: PendingCall) -> Dict:
+        params: Dict[str, Any] = {"to": call.to, "data": call.data}
+        if self.chain.default_call_account is not None:
+            params["from"] = str(self.chain.default_call_account.address)
+        return params
+
+    def _send_rpc_batch(self, chunk: List[PendingCall]) -> None:
+        try:
+            responses = _send_json_rpc_batch(
+                self.chain, self.block, [self._call_params(c) for c in chunk]
+            )
+        except Exception as e:
+            for call in chunk:
+                call._set_error(e)
+            raise
+        by_id = {r.get("id"): r for r in responses if isinstance(r, dict)}
+        for i, call in enumerate(chunk):
+            response = by_id.get(i)
+            if response is None:
+                call._set_error(
+                    BatchResponseError(
+                        f"Node returned no response for batched call {i} "
+                        f"({call.abi.get('name')} on {call.to})"
+                    )
+                )
+            elif "error" in response:
+                call._set_rpc_error(response["error"])
+            elif "result" not in response:
+                call._set_error(
+                    BatchResponseError(
+                        f"Node returned neither a result nor an error for "
+                        f"batched call {i} ({call.abi.get('name')} on {call.to})"
+                    )
+                )
+            else:
+                call._set_output(bytes.fromhex(response["result"][2:]))
+
+    def _send_multicall(self, chunk: List[PendingCall]) -> None:
+        assert self.multicall is not None
+        data = Abi.encode_with_selector(
+            _AGGREGATE3_SELECTOR,
+            ["(address,bool,bytes)[]"],
+            [[(c.to, True, c.data) for c in chunk]],
+        )
+        params: Dict[str, Any] = {"to": self.multicall, "data": data}
+        if self.chain.default_call_account is not None:
+            params["from"] = str(self.chain.default_call_account.address)
+        try:
+            output = self.chain.chain_interface.call(params, self.block)
+        except JsonRpcError as e:
+            for call in chunk:
+                call._set_error(e)
+            self.chain._process_call_revert(e)
+            raise
+        (results,) = Abi.decode(["(bool,bytes)[]"], output)
+        if len(results) != len(chunk):
+            raise BatchResponseError(
+                f"Multicall3 at {self.multicall} returned {len(results)} "
+                f"results for {len(chunk)} calls"
+            )
+        for call, (success, return_data) in zip(chunk, results):
+            if success:
+                call._set_output(return_data)
+            else:
+                call._set_revert(return_data)
+
+
+@contextmanager
+def batch_calls(
+    chain: Optional[Chain] = None,
+    *,
+    multicall: Optional[Union[Account, Address, str]] = None,
+    block: Union[int, str] = "latest",
+    max_size: int = 500,
+) -> Iterator[CallBatch]:
+    if chain is None:
+        import woke.deployment
+        import woke.testing
+
+        if woke.deployment.default_chain.connected:
+            chain = woke.deployment.default_chain
+        elif woke.testing.default_chain.connected:
+            chain = woke.testing.default_chain
+        else:
+            raise ValueError("No chain given and no default_chain connected")
+
+    batch = CallBatch(chain, multicall=multicall, block=block, max_size=max_size)
+    yield batch
+    batch.send()
@@ -0,0 +1,109 @@
+"""
+Precompiled ABI encoders and decoders for the generated contract methods.
+
+Woke re-derives the argument and return types of a function from its ABI
+fragment on every request (`fix_library_abi` deep-copies the fragment each
+time) and builds a fresh eth_abi tuple coder. `SelectorCodec` does that work
+once per fragment; `install` routes the chain's call, transaction, estimate
+and access list requests and the return value decoding through the cached
+codecs. Nothing is patched on import: callers opt in with `install()`, as
+tests/conftest.py and scripts/fuzz_roles.py do.
+"""
+from __future__ import annotations
+
+import functools
+from typing import Any, Dict, Iterable, Tuple, cast
+
+import eth_abi.abi
+import eth_utils
+from eth_abi.decoding import ContextFramesBytesIO, TupleDecoder
+from eth_abi.encoding import TupleEncoder
+from woke.development.core import Chain, fix_library_abi
+
+
+class SelectorCodec:
+    __slots__ = (
+        "abi",
+        "call_abi",
+        "input_types",
+        "output_types",
+        "_encoder",
+        "_decoder",
+    )
+
+    def __init__(self, abi: Dict[str, Any]) -> None:
+        self.abi = abi
+        # requests are passed on to woke with already encoded calldata and
+        # this fragment, so woke encodes no arguments of its own
+        self.call_abi = dict(abi, inputs=[])
+        self.input_types = _types(abi.get("inputs", []))
+        self.output_types = _types(abi.get("outputs", []))
+        registry = eth_abi.abi.default_codec._registry
+        self._encoder = TupleEncoder(
+            encoders=[registry.get_encoder(t) for t in self.input_types]
+        )
+        self._decoder = TupleDecoder(
+            decoders=[registry.get_decoder(t) for t in self.output_types]
+        )
+
+    def encode(self, chain: Chain, arguments: Iterable) -> bytes:
+        return self._encoder(
+            [chain._convert_to_web3_type(arg) for arg in arguments]
+        )
+
+    def decode(self, output: bytes) -> Any:
+        decoded = self._decoder(ContextFramesBytesIO(output))
+        if len(decoded) == 1:
+            return decoded[0]
+        return decoded
+
+
+def _types(args) -> Tuple[str, ...]:
+    return tuple(
+        eth_utils.abi.collapse_if_tuple(cast(Dict[str, Any], arg))
+        for arg in fix_library_abi(args)
+    )
+
+
+# keyed by id() of the fragment; the codec keeps the fragment alive, so the
+# id cannot be reused while the entry exists
+_codecs: Dict[int, SelectorCodec] = {}
+
+
+def codec_for(abi: Dict[str, Any]) -> SelectorCodec:
+    codec = _codecs.get(id(abi))
+    if codec is not None and (codec.abi is abi or codec.call_abi is abi):
+        return codec
+    codec = SelectorCodec(abi)
+    _codecs[id(abi)] = codec
+    _codecs[id(codec.call_abi)] = codec
+    return codec
+
+
+def _encoding(method):
+    @functools.wraps(method)
+    def wrapper(self, abi, arguments, params, *args, **kwargs):
+        if abi is None or abi.get("type") != "function" or "to" not in params:
+            return method(self, abi, arguments, params, *args, **kwargs)
+        codec = codec_for(abi)
+        if abi is codec.call_abi:
+            return method(self, abi, arguments, params, *args, **kwargs)
+        params["data"] = params.get("data", b"") + codec.encode(self, arguments)
+        return method(self, codec.call_abi, (), params, *args, **kwargs)
+
+    wrapper.__wrapped_by_codec__ = True
+    return wrapper
+
+
+def _process_return_data(self, tx, output: bytes, abi: Dict, return_type):
+    return self._convert_from_web3_type(
+        tx, codec_for(abi).decode(output), return_type
+    )
+
+
+def install() -> None:
+    for name in ("_call", "_transact", "_estimate", "_access_list"):
+        method = getattr(Chain, name)
+        if not getattr(method, "__wrapped_by_codec__", False):
+            setattr(Chain, name, _encoding(method))
+    Chain._process_return_data = _process_return_data
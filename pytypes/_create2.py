@@ -0,0 +1,73 @@
+"""
+Offline CREATE2 address prediction for contracts deployed by a GenericFactory.
+
+Mirrors `GenericFactory.addressFor`, which is
+`Create2.computeAddress(keccak256(symbol), _initHash)`, without an eth_call.
+"""
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Type, Union
+
+from woke.development.core import Account, Address, Contract
+from woke.development.utils import keccak256
+
+from pytypes._creation_code import creation_code
+
+
+def calc_salt(symbol: str) -> bytes:
+    return keccak256(symbol.encode("utf-8"))
+
+
+def init_code_hash(init_code: Union[Type[Contract], bytes, bytearray]) -> bytes:
+    if isinstance(init_code, (bytes, bytearray)):
+        return keccak256(bytes(init_code))
+    return keccak256(creation_code(init_code))
+
+
+def _resolve_hash(
+    init_hash: Optional[bytes],
+    init_code: Optional[Union[Type[Contract], bytes, bytearray]],
+) -> bytes:
+    if (init_hash is None) == (init_code is None):
+        raise ValueError("Exactly one of init_hash and init_code must be given")
+    if init_hash is None:
+        assert init_code is not None
+        init_hash = init_code_hash(init_code)
+    if len(init_hash) != 32:
+        raise ValueError("init_hash must be 32 bytes long")
+    return init_hash
+
+
+def _factory_prefix(factory: Union[Account, Address, str]) -> bytes:
+    if isinstance(factory, Account):
+        factory = factory.address
+    return b"\xff" + bytes.fromhex(str(factory)[2:])
+
+
+def predict_address(
+    factory: Union[Account, Address, str],
+    symbol: str,
+    *,
+    init_hash: Optional[bytes] = None,
+    init_code: Optional[Union[Type[Contract], bytes, bytearray]] = None,
+) -> Address:
+    return predict_addresses(
+        factory, [symbol], init_hash=init_hash, init_code=init_code
+    )[0]
+
+
+def predict_addresses(
+    factory: Union[Account, Address, str],
+    symbols: Iterable[str],
+    *,
+    init_hash: Optional[bytes] = None,
+    init_code: Optional[Union[Type[Contract], bytes, bytearray]] = None,
+) -> List[Address]:
+    # the 0xff ++ factory prefix and the init code hash are the same for the
+    # whole batch, so each symbol only costs the two keccak rounds
+    prefix = _factory_prefix(factory)
+    suffix = _resolve_hash(init_hash, init_code)
+    return [
+        Address("0x" + keccak256(prefix + calc_salt(symbol) + suffix)[12:].hex())
+        for symbol in symbols
+    ]
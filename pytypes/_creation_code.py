@@ -0,0 +1,25 @@
+"""
+Creation code of the generated contract classes, decoded once per class.
+
+The generated `get_creation_code()` decodes the `_creation_code` hex string on
+every call. `creation_code` keeps the decoded bytes per class so repeated
+deployments and CREATE2 predictions reuse them. Contracts that link libraries
+take the library addresses in `get_creation_code` and are not supported here.
+"""
+from __future__ import annotations
+
+from typing import Dict, Type
+
+from woke.development.core import Contract
+
+_cache: Dict[Type[Contract], bytes] = {}
+
+
+def creation_code(cls: Type[Contract]) -> bytes:
+    try:
+        return _cache[cls]
+    except KeyError:
+        pass
+    code = bytes(cls.get_creation_code())
+    _cache[cls] = code
+    return code
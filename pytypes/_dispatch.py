@@ -0,0 +1,180 @@
+"""
+Dispatch tables from error selectors and event topics to resolved classes.
+
+Woke resolves the generated class for every revert and log it decodes by
+importing the module listed in `errors`/`events` and walking the nested class
+names, then rebuilds the ABI decoder from the class `_abi`. Here each selector
+is resolved once, together with precompiled decoders, and the chain's revert
+and event processing reuse the entry. Selectors declared by more than one
+source still need a debug trace to pick the right class and are left to Woke.
+Nothing is patched on import: callers opt in with `install()`.
+"""
+from __future__ import annotations
+
+import importlib
+from typing import Dict, List, Optional, Tuple, Type
+
+import eth_abi.abi
+import eth_utils
+import woke.development.core
+from eth_abi.decoding import ContextFramesBytesIO, TupleDecoder
+from woke.development.core import Chain, fix_library_abi
+from woke.development.internal import UnknownEvent
+
+_registry = eth_abi.abi.default_codec._registry
+
+
+def _resolve(source: Tuple[str, Tuple[str, ...]]) -> Type:
+    module_name, attrs = source
+    obj = getattr(importlib.import_module(module_name), attrs[0])
+    for attr in attrs[1:]:
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _single_source(table: Dict, selector: bytes) -> Optional[Tuple]:
+    sources = set(table[selector].values())
+    if len(sources) != 1:
+        return None
+    return sources.pop()
+
+
+class ErrorEntry:
+    __slots__ = ("cls", "_decoder")
+
+    def __init__(self, cls: Type) -> None:
+        self.cls = cls
+        self._decoder = TupleDecoder(
+            decoders=[
+                _registry.get_decoder(eth_utils.abi.collapse_if_tuple(arg))
+                for arg in fix_library_abi(cls._abi["inputs"])
+            ]
+        )
+
+    def decode(self, data: bytes) -> Tuple:
+        return self._decoder(ContextFramesBytesIO(data))
+
+
+class EventEntry:
+    __slots__ = ("cls", "_indexed", "_topic_decoders", "_decoder")
+
+    def __init__(self, cls: Type) -> None:
+        self.cls = cls
+        self._indexed: List[bool] = []
+        self._topic_decoders = []
+        types = []
+        for input in fix_library_abi(cls._abi["inputs"]):
+            self._indexed.append(input["indexed"])
+            if input["indexed"]:
+                # dynamic and struct values are stored as their keccak hash
+                if (
+                    input["type"] in {"string", "bytes"}
+                    or input["internalType"].startswith("struct ")
+                    or input["type"].endswith("]")
+                ):
+                    topic_type = "bytes32"
+                else:
+                    topic_type = input["type"]
+                self._topic_decoders.append(_registry.get_decoder(topic_type))
+            else:
+                types.append(eth_utils.abi.collapse_if_tuple(input))
+        self._decoder = TupleDecoder(
+            decoders=[_registry.get_decoder(t) for t in types]
+        )
+
+    def decode(self, topics: List[bytes], data: bytes) -> Tuple:
+        decoded = iter(self._decoder(ContextFramesBytesIO(data)))
+        indexed = iter(
+            decoder(ContextFramesBytesIO(topic))
+            for decoder, topic in zip(self._topic_decoders, topics[1:])
+        )
+        return tuple(next(indexed if i else decoded) for i in self._indexed)
+
+
+# selector -> entry, or None when the selector is unknown or has several sources
+_errors: Dict[bytes, Optional[ErrorEntry]] = {}
+_events: Dict[bytes, Optional[EventEntry]] = {}
+
+
+def error_entry(selector: bytes) -> Optional[ErrorEntry]:
+    try:
+        return _errors[selector]
+    except KeyError:
+        pass
+    errors = woke.development.core.errors
+    source = _single_source(errors, selector) if selector in errors else None
+    entry = ErrorEntry(_resolve(source)) if source is not None else None
+    _errors[selector] = entry
+    return entry
+
+
+def event_entry(selector: bytes) -> Optional[EventEntry]:
+    try:
+        return _events[selector]
+    except KeyError:
+        pass
+    events = woke.development.core.events
+    source = _single_source(events, selector) if selector in events else None
+    entry = EventEntry(_resolve(source)) if source is not None else None
+    _events[selector] = entry
+    return entry
+
+
+def build() -> None:
+    """
+    Resolves every error and event up front, e.g. before a fuzz campaign forks
+    its workers. Imports all generated modules.
+    """
+    for selector in woke.development.core.errors:
+        error_entry(selector)
+    for selector in woke.development.core.events:
+        event_entry(selector)
+
+
+def _hex_to_bytes(value: str, width: int = 0) -> bytes:
+    if value.startswith("0x"):
+        value = value[2:]
+    return bytes.fromhex(value.zfill(width) if width else value)
+
+
+_original_process_revert_data = Chain._process_revert_data
+_original_process_events = Chain._process_events
+
+
+def _process_revert_data(self, tx, revert_data: bytes):
+    entry = error_entry(revert_data[0:4])
+    if entry is None:
+        return _original_process_revert_data(self, tx, revert_data)
+
+    decoded = entry.decode(revert_data[4:])
+    generated_error = self._convert_from_web3_type(tx, decoded, entry.cls)
+    generated_error.tx = tx
+    # raise native pytypes exception on transaction revert
+    raise generated_error from None
+
+
+def _process_events(self, tx, logs: List) -> list:
+    pending = []
+    for log in logs:
+        topics = [_hex_to_bytes(t, 64) for t in log["topics"]]
+        data = _hex_to_bytes(log["data"])
+        entry = None
+        if len(topics) > 0 and topics[0] in woke.development.core.events:
+            entry = event_entry(topics[0])
+            if entry is None:
+                # an ambiguous topic needs the transaction trace, let Woke
+                # decode all logs of the transaction
+                return _original_process_events(self, tx, logs)
+        pending.append((entry, topics, data))
+
+    return [
+        UnknownEvent(topics, data)
+        if entry is None
+        else self._convert_from_web3_type(tx, entry.decode(topics, data), entry.cls)
+        for entry, topics, data in pending
+    ]
+
+
+def install() -> None:
+    Chain._process_revert_data = _process_revert_data
+    Chain._process_events = _process_events
@@ -951,7 +951,8 @@ export async function simulateServerSigning(
   gasPrice: bigint,
   data: string,
   chainID: bigint,
-  ethers: Ethers
+  ethers: Ethers,
+  nonce?: number
 ): Promise<SignedTxResponse> {
   from = from.toLowerCase();
   // import the keys from the hardhat config
@@ -970,7 +971,9 @@ export async function simulateServerSigning(
     throw new Error("account not found");
   }
 
-  const nonce = await ethers.provider.getTransactionCount(from);
+  if (nonce === undefined) {
+    nonce = await ethers.provider.getTransactionCount(from);
+  }
   const wallet = new Wallet(account.privateKey, ethers.provider);
   const transaction: TransactionRequest = {
     to: to,
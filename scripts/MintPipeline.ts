@@ -0,0 +1,280 @@
+import hre from "hardhat";
+import fs from "fs";
+import * as readline from "readline";
+
+type Ethers = typeof hre.ethers;
+
+export interface CSVRow {
+  [key: string]: string;
+}
+
+/**
+ * Reads a CSV file one line at a time, so large intakes are never held in
+ * memory as a whole.
+ * @param filePath path of the CSV file, the first line holds the headers
+ * @param delimiter column delimiter
+ * @returns the rows keyed by header, in file order
+ */
+export async function* streamCSV(
+  filePath: string,
+  delimiter: string = ","
+): AsyncGenerator<CSVRow> {
+  const lines = readline.createInterface({
+    input: fs.createReadStream(filePath, "utf-8"),
+    crlfDelay: Infinity,
+  });
+  let headers: string[] | undefined;
+  for await (const line of lines) {
+    if (line.trim() === "") {
+      continue;
+    }
+    const values = line.split(delimiter);
+    if (headers === undefined) {
+      headers = values.map((header) => header.trim());
+      continue;
+    }
+    const rowObject: CSVRow = {};
+    headers.forEach((header, index) => {
+      rowObject[header] = values[index]?.trim();
+    });
+    yield rowObject;
+  }
+}
+
+/**
+ * Hands out the nonces of one sender locally, so that several transactions
+ * can be signed and sent before the first one is mined.
+ */
+export class LocalNonce {
+  private next: number;
+
+  private constructor(next: number) {
+    this.next = next;
+  }
+
+  static async fromPending(ethers: Ethers, address: string) {
+    return new LocalNonce(
+      await ethers.provider.getTransactionCount(address, "pending")
+    );
+  }
+
+  take(): number {
+    return this.next++;
+  }
+}
+
+export type SentBatch = {
+  // rows [firstRow, firstRow + rowCount) of the source
+  firstRow: number;
+  rowCount: number;
+  nonce: number;
+  hash: string;
+};
+
+type CheckpointState = {
+  source: string;
+  // merged [start, end) row ranges whose batches are mined
+  confirmed: Array<[number, number]>;
+  // sent and not known to be mined
+  inFlight: SentBatch[];
+  gasUsed: string;
+};
+
+/**
+ * Progress of a batched run over the rows of a source, saved to a JSON file
+ * after every change so that a crashed run resumes where it stopped.
+ */
+export class Checkpoint {
+  path: string;
+  state: CheckpointState;
+
+  private constructor(path: string, state: CheckpointState) {
+    this.path = path;
+    this.state = state;
+  }
+
+  /**
+   * @param path checkpoint file, created on the first save
+   * @param source identifies the input, a checkpoint of another input is refused
+   */
+  static load(path: string, source: string): Checkpoint {
+    if (!fs.existsSync(path)) {
+      return new Checkpoint(path, {
+        source,
+        confirmed: [],
+        inFlight: [],
+        gasUsed: "0",
+      });
+    }
+    const state: CheckpointState = JSON.parse(fs.readFileSync(path, "utf-8"));
+    if (state.source !== source) {
+      throw new Error(
+        `Checkpoint ${path} is for ${state.source}, not ${source}`
+      );
+    }
+    return new Checkpoint(path, state);
+  }
+
+  save() {
+    // written aside and renamed, a crash mid-write keeps the last checkpoint
+    fs.writeFileSync(`${this.path}.tmp`, JSON.stringify(this.state, null, 2));
+    fs.renameSync(`${this.path}.tmp`, this.path);
+  }
+
+  isConfirmed(row: number): boolean {
+    return this.state.confirmed.some(([start, end]) => start <= row && row < end);
+  }
+
+  // rows at the start of the source that are all mined
+  get confirmedRows(): number {
+    const first = this.state.confirmed[0];
+    return first !== undefined && first[0] === 0 ? first[1] : 0;
+  }
+
+  get gasUsed(): bigint {
+    return BigInt(this.state.gasUsed);
+  }
+
+  sent(batch: SentBatch) {
+    this.state.inFlight.push(batch);
+    this.save();
+  }
+
+  confirmed(batch: SentBatch, gasUsed: bigint) {
+    this.forget(batch);
+    const ranges = [
+      ...this.state.confirmed,
+      [batch.firstRow, batch.firstRow + batch.rowCount] as [number, number],
+    ].sort((a, b) => a[0] - b[0]);
+    const merged: Array<[number, number]> = [];
+    for (const range of ranges) {
+      const last = merged[merged.length - 1];
+      if (last !== undefined && range[0] <= last[1]) {
+        last[1] = Math.max(last[1], range[1]);
+      } else {
+        merged.push([range[0], range[1]]);
+      }
+    }
+    this.state.confirmed = merged;
+    this.state.gasUsed = (this.gasUsed + gasUsed).toString();
+    this.save();
+  }
+
+  // the batch was dropped or reverted, its rows are sent again on resume
+  failed(batch: SentBatch) {
+    this.forget(batch);
+    this.save();
+  }
+
+  private forget(batch: SentBatch) {
+    this.state.inFlight = this.state.inFlight.filter(
+      (sent) => sent.hash !== batch.hash
+    );
+  }
+}
+
+/**
+ * Settles the batches a crashed run left in flight: mined ones count as
+ * confirmed, pending ones are waited for and the rest are sent again.
+ * @param timeout milliseconds to wait for a batch still in the mempool
+ */
+export async function settleInFlight(
+  ethers: Ethers,
+  checkpoint: Checkpoint,
+  confirmations: number,
+  timeout: number
+) {
+  for (const batch of [...checkpoint.state.inFlight]) {
+    let receipt = await ethers.provider.getTransactionReceipt(batch.hash);
+    if (
+      receipt === null &&
+      (await ethers.provider.getTransaction(batch.hash)) !== null
+    ) {
+      receipt = await ethers.provider
+        .waitForTransaction(batch.hash, confirmations, timeout)
+        .catch(() => null);
+    }
+    if (receipt !== null && receipt.status === 1) {
+      console.log(
+        `batch of rows ${batch.firstRow}-${
+          batch.firstRow + batch.rowCount - 1
+        } was mined in ${batch.hash}`
+      );
+      checkpoint.confirmed(batch, receipt.gasUsed);
+    } else {
+      console.log(
+        `batch of rows ${batch.firstRow}-${
+          batch.firstRow + batch.rowCount - 1
+        } in ${batch.hash} was not mined, sending it again`
+      );
+      checkpoint.failed(batch);
+    }
+  }
+}
+
+/**
+ * Splits rows into batches whose call stays under a gas limit. The batch
+ * size is guessed from the estimates of one and two rows, then every batch
+ * is estimated and halved until it fits. Batches never span rows skipped
+ * by the checkpoint, so each covers consecutive rows.
+ * @param rows the rows with their index in the source
+ * @param estimate estimates the gas of one call for the given rows
+ * @param gasLimit gas a batch may use
+ * @returns the batches with their estimate
+ */
+export async function* gasSizedBatches<T>(
+  rows: AsyncIterable<{ index: number; input: T; skip: boolean }>,
+  estimate: (inputs: T[]) => Promise<bigint>,
+  gasLimit: bigint
+): AsyncGenerator<{ firstRow: number; inputs: T[]; gas: bigint }> {
+  let batchSize: number | undefined;
+  let pending: { firstRow: number; inputs: T[] } | undefined;
+
+  async function* fit(
+    firstRow: number,
+    inputs: T[]
+  ): AsyncGenerator<{ firstRow: number; inputs: T[]; gas: bigint }> {
+    const gas = await estimate(inputs);
+    if (gas <= gasLimit) {
+      yield { firstRow, inputs, gas };
+      return;
+    }
+    if (inputs.length === 1) {
+      throw new Error(`Row ${firstRow} alone needs ${gas} gas`);
+    }
+    const half = Math.ceil(inputs.length / 2);
+    yield* fit(firstRow, inputs.slice(0, half));
+    yield* fit(firstRow + half, inputs.slice(half));
+  }
+
+  for await (const row of rows) {
+    if (row.skip) {
+      if (pending !== undefined) {
+        yield* fit(pending.firstRow, pending.inputs);
+        pending = undefined;
+      }
+      continue;
+    }
+    if (pending === undefined) {
+      pending = { firstRow: row.index, inputs: [] };
+    }
+    pending.inputs.push(row.input);
+    if (batchSize === undefined && pending.inputs.length === 2) {
+      const one = await estimate(pending.inputs.slice(0, 1));
+      const two = await estimate(pending.inputs);
+      const perRow = two > one ? two - one : one;
+      // a tenth of headroom for rows with longer strings
+      batchSize = Math.max(
+        1,
+        Math.floor(Number(((gasLimit - (one - perRow)) * 9n) / 10n / perRow))
+      );
+    }
+    if (batchSize !== undefined && pending.inputs.length >= batchSize) {
+      yield* fit(pending.firstRow, pending.inputs);
+      pending = undefined;
+    }
+  }
+  if (pending !== undefined) {
+    yield* fit(pending.firstRow, pending.inputs);
+  }
+}
@@ -1,12 +1,16 @@
 import { task } from "hardhat/config";
-import fs from "fs";
-import * as readline from "readline";
+import { TransactionReceipt } from "ethers";
 import { SignerUtil } from "./SignerUtil";
 import { getEnvVar } from "./Config";
 import { promptUser } from "./Utils";
-interface CSVRow {
-  [key: string]: string;
-}
+import {
+  Checkpoint,
+  LocalNonce,
+  SentBatch,
+  gasSizedBatches,
+  settleInFlight,
+  streamCSV,
+} from "./MintPipeline";
 task("mint-asset-nfts", "Mint tokens to the specified address")
   .addParam("to", "The address to mint the tokens to")
   .addParam(
@@ -16,11 +20,25 @@ task("mint-asset-nfts", "Mint tokens to the specified address")
   .addParam("assetNftAddress", "The address of the AssetNFT contract")
   .addParam("nftMinterAddress", "The address of the NFT minter contract")
   .addFlag("test", "flag for hardhat network testing")
+  .addFlag("yes", "skip the confirmation prompt")
   .addOptionalParam(
     "environment",
     "The environment to deploy the key from, ie: dev, prod, staging, or local"
   )
   .addOptionalParam("confirmations", "The number of confirmations to wait for")
+  .addOptionalParam(
+    "batchGasLimit",
+    "The gas a single mint batch may use, a quarter of the block gas limit by default"
+  )
+  .addOptionalParam(
+    "concurrency",
+    "The number of batches sent before waiting for the oldest one to be mined",
+    "4"
+  )
+  .addOptionalParam(
+    "checkpoint",
+    "The file progress is saved to and resumed from, <tokenDataCsv>.checkpoint.json by default"
+  )
   .setAction(async (args, hre) => {
     // Get the signer API endpoint from .env
     const signerAPI = getEnvVar(args.environment, "SIGNER_API_ENDPOINT");
@@ -58,98 +76,155 @@ task("mint-asset-nfts", "Mint tokens to the specified address")
       throw new Error(`Invalid address ${args.to}`);
     }
 
-    // parse the CSV data
-    const csvRows = parseCSV(args.tokenDataCsv);
+    const confirmations = Number(args.confirmations ?? 1);
+    const concurrency = Math.max(1, Number(args.concurrency));
+    let batchGasLimit: bigint;
+    if (args.batchGasLimit !== undefined) {
+      batchGasLimit = BigInt(args.batchGasLimit);
+    } else {
+      const block = await hre.ethers.provider.getBlock("latest");
+      if (block === null) {
+        throw new Error("Failed to get the latest block");
+      }
+      batchGasLimit = block.gasLimit / BigInt(4);
+    }
 
-    //get the address of the erc20 token contract
+    // resume a run that stopped halfway, rows already minted are skipped
+    const checkpointPath =
+      args.checkpoint ?? `${args.tokenDataCsv}.checkpoint.json`;
+    const checkpoint = Checkpoint.load(
+      checkpointPath,
+      `${args.assetNftAddress}:${args.to}:${args.tokenDataCsv}`
+    );
+    await settleInFlight(hre.ethers, checkpoint, confirmations, 5 * 60_000);
+    if (checkpoint.confirmedRows > 0) {
+      console.log(
+        `Resuming from ${checkpointPath}, the first ${checkpoint.confirmedRows} rows are minted`
+      );
+    }
+
+    console.log(`Minting the tokens of ${args.tokenDataCsv} to ${args.to}`);
+    console.log(
+      `Batches of up to ${batchGasLimit} gas, ${concurrency} in flight (decimals: ${erc20Decimals})`
+    );
+    if (!args.yes && !(await promptUser("Confirm minting?"))) {
+      throw new Error("Minting cancelled, fix the input csv file and try again");
+    }
 
+    const mintFunction = "mint((address,uint256,string,string)[])";
     // encode the mint input data
-    const mintInputs = csvRows.map((row) => {
-      // convert the erc20Value to the correct decimal format
-      console.log("row.erc20Value", row.erc20Value);
-      const erc20ValueWei = hre.ethers.parseUnits(
-        row.erc20Value,
-        erc20Decimals
+    async function* mintInputs() {
+      let index = 0;
+      for await (const row of streamCSV(args.tokenDataCsv)) {
+        yield {
+          index,
+          skip: checkpoint.isConfirmed(index),
+          input: {
+            to: args.to,
+            // convert the erc20Value to the correct decimal format
+            erc20Value: hre.ethers.parseUnits(row.erc20Value, erc20Decimals),
+            chip: row.chipID,
+            tokenURI: row.chipID,
+          },
+        };
+        index++;
+      }
+    }
+    const estimate = (inputs: object[]) =>
+      hre.ethers.provider.estimateGas({
+        to: args.assetNftAddress,
+        from: args.nftMinterAddress,
+        data: assetNFT.interface.encodeFunctionData(mintFunction, [inputs]),
+      });
+
+    // log the minted token data of a mined batch
+    const logMinted = (batch: SentBatch, txReceipt: TransactionReceipt) => {
+      const tokenIDs: bigint[] = [];
+      txReceipt.logs.forEach((log) => {
+        const event = assetNFT.interface.parseLog({
+          topics: [...log.topics],
+          data: log.data,
+        });
+        if (event !== null && event.name === "Transfer") {
+          tokenIDs.push(event.args.tokenId);
+          if (event.args.to.toLowerCase() !== args.to.toLowerCase()) {
+            console.error("owner address does not match input address");
+          }
+        }
+      });
+      console.log(
+        `rows ${batch.firstRow}-${batch.firstRow + batch.rowCount - 1}: ` +
+          `minted token IDs ${tokenIDs[0]}-${tokenIDs[tokenIDs.length - 1]} ` +
+          `in block ${txReceipt.blockNumber}, gas used ${txReceipt.gasUsed}`
       );
+      return tokenIDs.length;
+    };
 
-      return {
-        to: args.to,
-        erc20Value: erc20ValueWei,
-        chip: row.chipID,
-        tokenURI: row.chipID,
+    const nonces = await LocalNonce.fromPending(
+      hre.ethers,
+      args.nftMinterAddress
+    );
+    const inFlight: Promise<void>[] = [];
+    const failures: Error[] = [];
+    let minted = 0;
+    for await (const batch of gasSizedBatches(
+      mintInputs(),
+      estimate,
+      batchGasLimit
+    )) {
+      const nonce = nonces.take();
+      const txResponse = await signerUtil.sendRawTxWithData(
+        args.assetNftAddress,
+        args.nftMinterAddress,
+        BigInt(0),
+        assetNFT.interface.encodeFunctionData(mintFunction, [batch.inputs]),
+        // estimated against the current state, leave room for it to change
+        (batch.gas * BigInt(6)) / BigInt(5),
+        nonce
+      );
+      const sent: SentBatch = {
+        firstRow: batch.firstRow,
+        rowCount: batch.inputs.length,
+        nonce,
+        hash: txResponse.hash,
       };
-    });
-    let totalGasUsed = BigInt(0);
-    // Prompt user to confirm the minting for each token
-    for (const input of mintInputs) {
-      console.log(`Minting token with chip ID: ${input.chip}`);
+      checkpoint.sent(sent);
       console.log(
-        `ERC20 value: ${input.erc20Value} wei (decimals: ${erc20Decimals})`
+        `Sent rows ${sent.firstRow}-${sent.firstRow + sent.rowCount - 1} with nonce ${nonce}: ${sent.hash}`
       );
-      console.log(`Token URI: ${input.tokenURI}`);
-      console.log(`Owner address: ${input.to}`);
-      // Prompt user to confirm the minting
-      const confirmed = await promptUser("Confirm minting?");
-      if (!confirmed) {
-        throw new Error(
-          "Minting cancelled, fix the input csv file and try again"
-        );
+      inFlight.push(
+        txResponse
+          .wait(confirmations)
+          .then((txReceipt) => {
+            if (txReceipt === null || txReceipt.status !== 1) {
+              throw new Error(`Transaction ${sent.hash} failed`);
+            }
+            checkpoint.confirmed(sent, txReceipt.gasUsed);
+            minted += logMinted(sent, txReceipt);
+          })
+          .catch((error) => {
+            checkpoint.failed(sent);
+            failures.push(error);
+          })
+      );
+      // wait for the oldest batch before sending more
+      if (inFlight.length >= concurrency) {
+        await inFlight.shift();
+      }
+      if (failures.length > 0) {
+        break;
       }
     }
-    const txResponse = await signerUtil.callContract(
-      "AssetNFT",
-      args.assetNftAddress,
-      "mint((address,uint256,string,string)[])",
-      [mintInputs],
-      args.nftMinterAddress
-    );
-    // wait for the transaction to be mined
-    const txReceipt = await txResponse.wait(args.confirmations);
-    if (txReceipt === null) {
-      throw new Error("Transaction failed");
+    await Promise.all(inFlight);
+    console.log(`Minted ${minted} tokens`);
+    console.log(`Total gas used: ${checkpoint.gasUsed.toString()}`);
+    if (failures.length > 0) {
+      throw new Error(
+        `${failures.length} batches failed, run again to resume from ${checkpointPath}: ${failures[0].message}`
+      );
     }
-    // log the transaction receipt
-    console.log(`Transaction hash: ${txReceipt.hash}`);
-    console.log(`Block number: ${txReceipt.blockNumber}`);
-    console.log(`Gas used: ${txReceipt.gasUsed.toString()}`);
-    totalGasUsed += txReceipt.gasUsed;
-    // log the minted token data
-    txReceipt.logs.forEach(async (log) => {
-      const topics = log.topics.map((topic) => topic);
-      const event = assetNFT.interface.parseLog({
-        topics: topics,
-        data: log.data,
-      });
-      if (event !== null && event.name === "Transfer") {
-        console.log(`minted Token ID: ${event.args.tokenId.toString()}`);
-        if (event.args.to.toLowerCase() !== args.to.toLowerCase()) {
-          console.error("owner address does not match input address");
-        }
-        console.log(`owner address: ${event.args.to}`);
-        const tokenData = await assetNFT.getPositionData(event.args.tokenId);
-        console.log(`chip ID: ${tokenData.erc20Value}`);
-        console.log("token URI: ", tokenData.tokenURI);
-      }
-    });
-    console.log(`Total gas used: ${totalGasUsed.toString()}`);
   });
 
-function parseCSV(filePath: string, delimiter: string = ","): CSVRow[] {
-  const fileContent = fs.readFileSync(filePath, "utf-8");
-  const rows = fileContent.trim().split("\n");
-  const headers = rows.shift()?.split(delimiter) || [];
-
-  return rows.map((row) => {
-    const values = row.split(delimiter);
-    const rowObject: CSVRow = {};
-
-    headers.forEach((header, index) => {
-      rowObject[header.trim()] = values[index];
-    });
-
-    return rowObject;
-  });
-}
 // hardhat task for converting all the minted nfts to erc20 tokens
 
 task(
@@ -161,6 +236,7 @@ task(
   .addParam("tokenRecipient", "The address to receive the ERC20 tokens")
   .addOptionalParam("tokenID", "The token ID of the NFT to convert")
   .addFlag("test", "flag for hardhat network testing")
+  .addFlag("yes", "skip the confirmation prompt")
   .addOptionalParam(
     "environment",
     "The environment to deploy the key from, ie: dev, prod, staging, or local only needed when not running in test mode"
@@ -169,6 +245,16 @@ task(
     "confirmations",
     "The number of confirmations to wait for after sending the transaction"
   )
+  .addOptionalParam(
+    "pageSize",
+    "The number of positions read per getUserPositions call",
+    "200"
+  )
+  .addOptionalParam(
+    "concurrency",
+    "The number of mints sent before waiting for the oldest one to be mined",
+    "16"
+  )
   .setAction(async (args, hre) => {
     // Get the signer API endpoint from .env
     const signerAPI = getEnvVar(args.environment, "SIGNER_API_ENDPOINT");
@@ -199,80 +285,148 @@ task(
       "GenericToken",
       genericTokenAddress
     );
-    // get the balance of the nftOwner
-    const balance = await assetNFT.balanceOf(args.nftMinter);
-    // get all the token IDs owned by the nftOwner
-    const tokenIDs: bigint[] = [];
+    const confirmations = Number(args.confirmations ?? 1);
+    const pageSize = Math.max(1, Number(args.pageSize));
+    const concurrency = Math.max(1, Number(args.concurrency));
+
+    // get the token IDs owned by the nftMinter with their value
+    const tokens: { tokenID: bigint; erc20Value: bigint }[] = [];
     if (args.tokenID) {
-      tokenIDs.push(args.tokenID);
+      const tokenData = await assetNFT.getPositionData(args.tokenID);
+      tokens.push({
+        tokenID: BigInt(args.tokenID),
+        erc20Value: tokenData.erc20Value,
+      });
     } else {
-      for (let i = 0; i < balance; i++) {
-        const tokenID = await assetNFT.tokenOfOwnerByIndex(args.nftMinter, i);
-        tokenIDs.push(tokenID);
+      // read every page at the same block, the enumeration order is only
+      // stable while no token moves
+      const blockTag = await hre.ethers.provider.getBlockNumber();
+      const balance = await assetNFT.balanceOf(args.nftMinter, { blockTag });
+      for (let start = 0; start < balance; start += pageSize) {
+        const end = Math.min(start + pageSize, Number(balance));
+        const indexes = Array.from(
+          { length: end - start },
+          (_, i) => start + i
+        );
+        const [positions, tokenIDs] = await Promise.all([
+          assetNFT.getUserPositions(args.nftMinter, start, end, { blockTag }),
+          Promise.all(
+            indexes.map((i) =>
+              assetNFT.tokenOfOwnerByIndex(args.nftMinter, i, { blockTag })
+            )
+          ),
+        ]);
+        positions.forEach((position, i) => {
+          tokens.push({
+            tokenID: tokenIDs[i],
+            erc20Value: position.erc20Value,
+          });
+        });
       }
     }
-    // extract the token IDs from the positions
+    if (tokens.length === 0) {
+      console.log(`${args.nftMinter} holds no NFTs to convert`);
+      return;
+    }
+    const totalValue = tokens.reduce(
+      (sum, token) => sum + token.erc20Value,
+      BigInt(0)
+    );
+    console.log(
+      `converting ${tokens.length} NFTs of ${args.nftMinter} to ${totalValue} wei tokens for ${args.tokenRecipient}`
+    );
+    if (!args.yes && !(await promptUser("Confirm conversion? "))) {
+      throw new Error("Conversion cancelled");
+    }
+
     let gasUsed = BigInt(0);
     let initialGCoinBalance = await genericToken.balanceOf(args.tokenRecipient);
-    for (let i = 0; i < tokenIDs.length; i++) {
-      const tokenID = tokenIDs[i];
-      const tokenData = await assetNFT.getPositionData(tokenID);
-      console.log(
-        `converting token ID: ${tokenID} to ${tokenData.erc20Value} wei tokens`
-      );
-      console.log(`Token ID: ${tokenID}`);
-      console.log(`Token URI: ${tokenData.tokenURI}`);
-      // prompt user to confirm set approval
-      let confirmed;
-      confirmed = await promptUser(
-        `approve ${genericTokenAddress} to spend the token ID: ${tokenID} for the nftMinter: ${args.nftMinter}\n`
-      );
-      if (!confirmed) {
-        throw new Error("Approval cancelled");
-      }
-      // approve the generic token contract to spend the token ID
-      let txResponse = await signerUtil.callContract(
+    // one approval for every token instead of one per token, revoked once
+    // the conversion is done
+    const approved = await assetNFT.isApprovedForAll(
+      args.nftMinter,
+      genericTokenAddress
+    );
+    const setApproval = async (approve: boolean) => {
+      const txResponse = await signerUtil.callContract(
         "AssetNFT",
         args.assetNftAddress,
-        "approve(address,uint256)",
-        [genericTokenAddress, tokenID],
+        "setApprovalForAll(address,bool)",
+        [genericTokenAddress, approve],
         args.nftMinter
       );
-
-      let txReceipt = await txResponse.wait(args.confirmations);
-      if (txReceipt === null) {
+      const txReceipt = await txResponse.wait(confirmations);
+      if (txReceipt === null || txReceipt.status !== 1) {
         throw new Error("Transaction failed");
       }
       gasUsed += txReceipt.gasUsed;
-      // prompt user to confirm the conversion
-      confirmed = await promptUser("Confirm conversion? ");
-      if (!confirmed) {
-        throw new Error("Conversion cancelled");
+    };
+    if (!approved) {
+      await setApproval(true);
+    }
+
+    // the mints are sent back to back with locally assigned nonces and only
+    // waited for once concurrency of them are in flight
+    const receipts: Promise<TransactionReceipt | null>[] = [];
+    const inFlight: Promise<unknown>[] = [];
+    let settled: PromiseSettledResult<TransactionReceipt | null>[] = [];
+    try {
+      const nonces = await LocalNonce.fromPending(hre.ethers, args.nftMinter);
+      for (const token of tokens) {
+        const data = genericToken.interface.encodeFunctionData(
+          "mint(address,uint256)",
+          [args.tokenRecipient, token.tokenID]
+        );
+        const gas = await hre.ethers.provider.estimateGas({
+          to: genericTokenAddress,
+          from: args.nftMinter,
+          data: data,
+        });
+        const txResponse = await signerUtil.sendRawTxWithData(
+          genericTokenAddress,
+          args.nftMinter,
+          BigInt(0),
+          data,
+          // estimated while earlier mints are pending, leave room for them
+          (gas * BigInt(6)) / BigInt(5),
+          nonces.take()
+        );
+        console.log(
+          `converting token ID: ${token.tokenID} to ${token.erc20Value} wei tokens: ${txResponse.hash}`
+        );
+        const receipt = txResponse.wait(confirmations);
+        receipts.push(receipt);
+        inFlight.push(receipt.catch(() => null));
+        if (inFlight.length >= concurrency) {
+          await inFlight.shift();
+        }
       }
-      // mint tokens to the tokenRecipient
-      txResponse = await signerUtil.callContract(
-        "GenericToken",
-        genericTokenAddress,
-        "mint(address,uint256)",
-        [args.tokenRecipient, tokenID],
-        args.nftMinter
-      );
-      // wait for the transaction to be mined
-      txReceipt = await txResponse.wait(args.confirmations);
-      if (txReceipt === null) {
-        throw new Error("Transaction failed");
+    } finally {
+      // also when a send fails midway: wait for the mints already sent, as
+      // they need the approval, and only then revoke it
+      settled = await Promise.allSettled(receipts);
+      if (!approved) {
+        await setApproval(false);
       }
-      // log the transaction receipt
-      console.log(
-        `successfully converted token ID: ${tokenID} to ${tokenData.erc20Value} for ${args.tokenRecipient} `
-      );
-      console.log(`Transaction hash: ${txReceipt.hash}`);
-      console.log(`Block number: ${txReceipt.blockNumber}`);
-      console.log(`Gas used: ${txReceipt.gasUsed.toString()}`);
-      // log the minted token data
-      const recipientBal = await genericToken.balanceOf(args.tokenRecipient);
-      gasUsed += txReceipt.gasUsed;
     }
+
+    // gas is only counted once every receipt is in
+    let failed = 0;
+    settled.forEach((result, i) => {
+      if (
+        result.status === "fulfilled" &&
+        result.value !== null &&
+        result.value.status === 1
+      ) {
+        gasUsed += result.value.gasUsed;
+        return;
+      }
+      failed++;
+      console.error(
+        `failed to convert token ID: ${tokens[i].tokenID}`,
+        result.status === "rejected" ? result.reason : ""
+      );
+    });
     let finalGCoinBalance = await genericToken.balanceOf(args.tokenRecipient);
     console.log(
       `Minted ${
@@ -280,4 +434,7 @@ task(
       } xgc tokens, to address: ${args.tokenRecipient}`
     );
     console.log(`Total gas used: ${gasUsed.toString()}`);
+    if (failed > 0) {
+      throw new Error(`${failed} of ${tokens.length} conversions failed`);
+    }
   });
@@ -236,11 +236,15 @@ export class SignerUtil {
     gas: bigint,
     maxPriorityFeePerGas: bigint,
     maxFeePerGas: bigint,
-    data: string
+    data: string,
+    nonce?: number
   ): Promise<SignedTxResponse> {
     let signedTxResponse: SignedTxResponse;
     const chainID = (await this.ethers.provider.getNetwork()).chainId;
-    const nonce = await this.ethers.provider.getTransactionCount(from);
+    // callers sending several transactions at once manage nonces locally
+    if (nonce === undefined) {
+      nonce = await this.ethers.provider.getTransactionCount(from);
+    }
     // const simulate = chainID === BigInt(1337);
     if (this.test) {
       signedTxResponse = await simulateServerSigning(
@@ -251,7 +255,8 @@ export class SignerUtil {
         maxFeePerGas,
         data,
         chainID,
-        this.ethers
+        this.ethers,
+        nonce
       );
     } else {
       signedTxResponse = await this.callSigningServer(
@@ -275,6 +280,7 @@ export class SignerUtil {
    * @param value value to send the transaction with
    * @param data transaction data
    * @param gas gas to send the transaction with
+   * @param nonce nonce to sign with, the sender's transaction count if not set
    * @returns a transaction response that can be used to get the receipt
    */
   async sendRawTxWithData(
@@ -282,7 +288,8 @@ export class SignerUtil {
     from: string,
     value: bigint,
     data: string,
-    gas: bigint
+    gas: bigint,
+    nonce?: number
   ): Promise<ContractTransactionResponse> {
     const gasPrices = await getGasPrices(this.ethers);
     const signedTxRes = await this.signTransaction(
@@ -292,7 +299,8 @@ export class SignerUtil {
       gas,
       gasPrices.maxPriorityFeePerGas,
       gasPrices.maxFeePerGas,
-      data
+      data,
+      nonce
     );
     const txRes = (await sendTransaction(
       signedTxRes.signedTx,
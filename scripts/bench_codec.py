@@ -0,0 +1,101 @@
+"""
+Micro-benchmark for the ABI encoding and decoding done per generated method call.
+
+Compares the generic path Woke takes for every request (types re-derived from
+the ABI fragment, fresh eth_abi coders) with the cached per-selector codecs
+from `pytypes._codec`. No chain is needed; the node round trip is left out so
+only the Python side of a call is measured.
+
+    python -m scripts.bench_codec [iterations]
+"""
+import sys
+import time
+from typing import Any, Dict, cast
+
+import eth_utils
+from woke.development.core import Abi, Address, fix_library_abi
+from woke.testing.core import Chain
+
+from pytypes._codec import codec_for
+from pytypes.contracts.mocks.common.roles.minter.minter import MockMinter
+from pytypes.contracts.mocks.common.targets.fee.fee import MockFeeCollectorTarget
+
+ADDRESS = Address("0x00000000000000000000000000000000000000aa")
+
+
+def _generic_encode(chain: Chain, selector: bytes, abi: Dict, arguments) -> bytes:
+    arguments = [chain._convert_to_web3_type(arg) for arg in arguments]
+    types = [
+        eth_utils.abi.collapse_if_tuple(cast(Dict[str, Any], arg))
+        for arg in fix_library_abi(abi["inputs"])
+    ]
+    return selector + Abi.encode(types, arguments)
+
+
+def _generic_decode(abi: Dict, output: bytes) -> Any:
+    types = [
+        eth_utils.abi.collapse_if_tuple(cast(Dict[str, Any], arg))
+        for arg in fix_library_abi(abi["outputs"])
+    ]
+    decoded = Abi.decode(types, output)
+    if isinstance(decoded, (list, tuple)) and len(decoded) == 1:
+        decoded = decoded[0]
+    return decoded
+
+
+def _rate(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - start)
+
+
+def _report(name: str, before: float, after: float) -> None:
+    print(f"{name:<24} {before:>12,.0f} {after:>12,.0f} {after / before:>7.1f}x")
+
+
+def run(iterations: int = 100_000) -> None:
+    chain = Chain()
+    calls = [
+        ("changeMinter", MockMinter, [ADDRESS]),
+        ("lockMinter", MockMinter, []),
+        ("changeFeeCollector", MockFeeCollectorTarget, [ADDRESS]),
+    ]
+
+    print(f"{'calls/sec':<24} {'generic':>12} {'cached':>12} {'speedup':>8}")
+    for name, contract, arguments in calls:
+        selector, abi = next(
+            (s, a)
+            for s, a in contract._abi.items()
+            if isinstance(s, bytes) and a.get("name") == name
+        )
+        codec = codec_for(abi)
+        assert _generic_encode(chain, selector, abi, arguments) == selector + codec.encode(
+            chain, arguments
+        )
+        _report(
+            f"encode {name}",
+            _rate(lambda: _generic_encode(chain, selector, abi, arguments), iterations),
+            _rate(lambda: selector + codec.encode(chain, arguments), iterations),
+        )
+
+    # decoding of a view returning an address, e.g. the role getters
+    _, abi = next(
+        (s, a)
+        for s, a in MockMinter._abi.items()
+        if isinstance(s, bytes)
+        and a.get("stateMutability") == "view"
+        and [o["type"] for o in a["outputs"]] == ["address"]
+    )
+    output = Abi.encode(["address"], [ADDRESS])
+    codec = codec_for(abi)
+    assert _generic_decode(abi, output) == codec.decode(output)
+    _report(
+        f"decode {abi['name']}",
+        _rate(lambda: _generic_decode(abi, output), iterations),
+        _rate(lambda: codec.decode(output), iterations),
+    )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
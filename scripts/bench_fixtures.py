@@ -0,0 +1,54 @@
+"""
+Benchmark of test setup: deploying the role mocks per test versus reverting to
+a snapshot of one shared deployment (`tests/role_fixtures.py`).
+
+Every simulated test does the same work, a role change and a read back, so the
+difference is setup only. Needs anvil on PATH, like `woke test`.
+
+    python -m scripts.bench_fixtures [tests]
+"""
+import sys
+import time
+
+from woke.testing import default_chain
+
+from tests.role_fixtures import FixturePool, RoleFixtures, deploy_role_fixtures
+
+
+def _test_body(fixtures: RoleFixtures) -> None:
+    other = default_chain.accounts[1]
+    fixtures.minter.changeMinter(other, from_=fixtures.owner)
+    assert fixtures.minter.minter() == other.address
+
+
+def _report(name: str, tests: int, elapsed: float) -> None:
+    print(f"{name:<28} {elapsed:>9.2f}s {elapsed / tests * 1000:>9.1f}ms")
+
+
+def run(tests: int = 50) -> None:
+    print(f"{'setup':<28} {'total':>10} {'per test':>11}")
+
+    # the current pattern: each test decorated with `@default_chain.connect()`
+    start = time.perf_counter()
+    for _ in range(tests):
+        with default_chain.connect():
+            _test_body(deploy_role_fixtures(default_chain))
+    _report("connect + deploy per test", tests, time.perf_counter() - start)
+
+    with default_chain.connect():
+        start = time.perf_counter()
+        for _ in range(tests):
+            with default_chain.snapshot_and_revert():
+                _test_body(deploy_role_fixtures(default_chain))
+        _report("deploy per test", tests, time.perf_counter() - start)
+
+        pool = FixturePool(default_chain)
+        start = time.perf_counter()
+        for _ in range(tests):
+            with pool.isolated() as fixtures:
+                _test_body(fixtures)
+        _report("snapshot pool", tests, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
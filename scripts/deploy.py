@@ -1,8 +1,227 @@
+import json
+from dataclasses import dataclass
+from typing import List
+
 from woke.deployment import *
 
+from pytypes._create2 import calc_salt
+
+from scripts.deployment_cache import DeploymentCache
+from scripts.pipeline import (
+    Computed,
+    CreationCode,
+    Deploy,
+    Encoded,
+    Pipeline,
+    Ref,
+    Step,
+    Transact,
+    resolve_contract,
+)
+
 NODE_URL = "ENTER_NODE_URL_HERE"
 
+RG_FACTORY = "contracts/factory/RGFactory.sol:RGFactory"
+ERC20_FACTORY = "contracts/factory/ERC20Factory.sol:ERC20Factory"
+ERC721_FACTORY = "contracts/factory/ERC721Factory.sol:ERC721Factory"
+UUPS_PROXY = "contracts/proxy/UUPSProxy.sol:UUPSProxy"
+GENERIC_TOKEN = "contracts/ERC20/GenericToken.sol:GenericToken"
+ASSET_NFT = "contracts/ERC721/AssetNFT.sol:AssetNFT"
+
+# RGFactoryBase.Factories
+TOKEN_FACTORY = 0
+NFT_FACTORY = 1
+
+
+@dataclass
+class GCoinConfig:
+    rg_factory_owner: Address
+    erc20_factory_owner: Address
+    erc721_factory_owner: Address
+    erc721_admin: Address
+    erc721_minter: Address
+    erc721_burner: Address
+    erc721_metadata_operator: Address
+    erc721_name: str
+    erc721_symbol: str
+    erc721_base_token_uri: str
+    erc20_admin: Address
+    asset_governor: Address
+    fee_collector: Address
+    erc20_name: str
+    erc20_symbol: str
+    erc20_decimals: int
+    # 10: 0.01%, 100: 0.1%, 1000: 1%
+    erc20_fee_percent: int
+
+
+def _factory_proxy(name: str, factory: str, owner: Address) -> List[Step]:
+    # deployed through the RGFactory like `deployCustomContractFromRGFactory`
+    return [
+        Deploy(f"{name}Logic", factory),
+        Transact(
+            name,
+            RG_FACTORY,
+            Ref("rgFactory"),
+            "deployCreateCustomContract",
+            [
+                0,
+                CreationCode(
+                    UUPS_PROXY,
+                    (
+                        Ref(f"{name}Logic"),
+                        Encoded(factory, "initialize", (owner, Ref("rgFactory"))),
+                    ),
+                ),
+                b"",
+            ],
+            address_from=("DeployedCustomContract", "addr"),
+        ),
+    ]
+
+
+def gcoin_plan(config: GCoinConfig) -> List[Step]:
+    """
+    Same deployment as the `deploy-factories` and `deploy-gcoin-contracts`
+    hardhat tasks, as a dependency graph.
+    """
+    erc20_address = Computed(
+        lambda r: resolve_contract(ERC20_FACTORY)(
+            r["erc20Factory"].address, default_chain
+        ).addressFor(calc_salt(config.erc20_symbol)),
+        ("erc20Factory",),
+    )
+    return [
+        Deploy("rgFactoryLogic", RG_FACTORY),
+        Deploy(
+            "rgFactory",
+            UUPS_PROXY,
+            [
+                Ref("rgFactoryLogic"),
+                Encoded(RG_FACTORY, "initialize", (config.rg_factory_owner,)),
+            ],
+        ),
+        *_factory_proxy("erc20Factory", ERC20_FACTORY, config.erc20_factory_owner),
+        *_factory_proxy("erc721Factory", ERC721_FACTORY, config.erc721_factory_owner),
+        Transact(
+            "registerErc20Factory",
+            RG_FACTORY,
+            Ref("rgFactory"),
+            "updateDeployers",
+            [TOKEN_FACTORY, Ref("erc20Factory")],
+        ),
+        Transact(
+            "registerErc721Factory",
+            RG_FACTORY,
+            Ref("rgFactory"),
+            "updateDeployers",
+            [NFT_FACTORY, Ref("erc721Factory")],
+        ),
+        Transact(
+            "assetNFT",
+            RG_FACTORY,
+            Ref("rgFactory"),
+            "deployAssetNFT",
+            [
+                config.erc721_name,
+                config.erc721_symbol,
+                Encoded(
+                    ASSET_NFT,
+                    "initialize",
+                    (
+                        (
+                            config.erc721_admin,
+                            config.asset_governor,
+                            config.erc721_minter,
+                            config.erc721_burner,
+                            config.erc721_metadata_operator,
+                            erc20_address,
+                            config.erc721_name,
+                            config.erc721_symbol,
+                            config.erc721_base_token_uri,
+                        ),
+                    ),
+                ),
+            ],
+            after=["registerErc721Factory"],
+            address_from=("DeployedERC721", "tokenAddress"),
+        ),
+        Transact(
+            "genericToken",
+            RG_FACTORY,
+            Ref("rgFactory"),
+            "deployGenericToken",
+            [
+                config.erc20_name,
+                config.erc20_symbol,
+                Encoded(
+                    GENERIC_TOKEN,
+                    "initialize",
+                    (
+                        (
+                            config.erc20_name,
+                            config.erc20_symbol,
+                            config.erc20_decimals,
+                            config.erc20_admin,
+                            Ref("assetNFT"),
+                            config.asset_governor,
+                            Address(0),
+                            Address(0),
+                            Address(0),
+                            config.fee_collector,
+                            config.erc20_fee_percent,
+                        ),
+                    ),
+                ),
+            ],
+            after=["registerErc20Factory"],
+            address_from=("DeployedERC20", "tokenAddress"),
+        ),
+    ]
+
 
 @default_chain.connect(NODE_URL)
 def main():
     default_chain.set_default_accounts(Account.from_alias("deployment"))
+    deployer = default_chain.default_tx_account.address
+
+    config = GCoinConfig(
+        rg_factory_owner=deployer,
+        erc20_factory_owner=deployer,
+        erc721_factory_owner=deployer,
+        erc721_admin=deployer,
+        erc721_minter=deployer,
+        erc721_burner=deployer,
+        erc721_metadata_operator=deployer,
+        erc721_name="test g-coin assetnft",
+        erc721_symbol="TGCNFT",
+        erc721_base_token_uri="https://test-gcoin.com/",
+        erc20_admin=deployer,
+        asset_governor=deployer,
+        fee_collector=deployer,
+        erc20_name="test g-coin",
+        erc20_symbol="TGC",
+        erc20_decimals=18,
+        erc20_fee_percent=20,
+    )
+    cache = DeploymentCache.for_chain(default_chain)
+    results = Pipeline(gcoin_plan(config), chain=default_chain, cache=cache).run()
+    for name, result in results.items():
+        state = "reused" if result.tx is None else "sent"
+        print(f"{name}: {result.address} ({state})")
+
+    with open(f"gcoinDeploymentData{default_chain.chain_id}.json", "w") as f:
+        json.dump(
+            {
+                "erc20TokenAddress": {
+                    "tokenName": config.erc20_name,
+                    "address": str(results["genericToken"].address),
+                },
+                "assetNFT": {
+                    "tokenName": config.erc721_name,
+                    "address": str(results["assetNFT"].address),
+                },
+            },
+            f,
+            indent=2,
+        )
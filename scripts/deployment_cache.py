@@ -0,0 +1,120 @@
+"""
+Persistent, content-addressed record of what a deployment plan already did.
+
+Entries are keyed on the chain id, the creation code of the contract as
+identified by its `creation_code_index` segment hashes, and the constructor
+arguments, or for transactions on the target and calldata. A deployment is
+reused when the code at the recorded address still has the recorded code hash
+(read with eth_getProof where the node supports it). Creation code is only
+cached when the metadata hash it embeds is the one `contracts_by_metadata`
+lists for the contract, so stale pytypes never match a fresh build.
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import woke.development.core
+from woke.development.core import Address, Chain
+from woke.development.json_rpc.communicator import JsonRpcError
+from woke.development.utils import keccak256
+
+_VERSION = 1
+# CBOR encoded metadata appended to the runtime code by solc
+_METADATA_LENGTH = 53
+
+
+def _creation_code_key(init_code: bytes) -> Optional[bytes]:
+    """
+    Returns the segment hashes of the matching `creation_code_index` entry
+    followed by the constructor arguments, or None for code that pytypes does
+    not know.
+    """
+    try:
+        fqn, constructor_offset = woke.development.core.get_fqn_from_creation_code(
+            init_code
+        )
+    except ValueError:
+        return None
+    # the runtime code, and with it its metadata hash, ends where the
+    # constructor arguments start
+    metadata = init_code[constructor_offset - _METADATA_LENGTH : constructor_offset]
+    if woke.development.core.contracts_by_metadata.get(metadata) != fqn:
+        return None
+    for segments, indexed_fqn in woke.development.core.creation_code_index:
+        if indexed_fqn == fqn:
+            return (
+                fqn.encode("utf-8")
+                + b"".join(h for _, h in segments)
+                + init_code[constructor_offset:]
+            )
+    return None
+
+
+class DeploymentCache:
+    def __init__(self, path: Union[str, os.PathLike], chain_id: int) -> None:
+        self.path = Path(path)
+        self.chain_id = chain_id
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text())
+            if data.get("version") == _VERSION and data.get("chainId") == chain_id:
+                self.entries = data["entries"]
+
+    @classmethod
+    def for_chain(
+        cls, chain: Chain, directory: Union[str, os.PathLike] = "deployments"
+    ) -> DeploymentCache:
+        return cls(Path(directory) / f"{chain.chain_id}.json", chain.chain_id)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps(
+                {"version": _VERSION, "chainId": self.chain_id, "entries": self.entries},
+                indent=2,
+                sort_keys=True,
+            )
+        )
+        # replace atomically so an interrupted run never leaves a torn file
+        os.replace(tmp, self.path)
+
+    def deployment_key(self, init_code: bytes) -> Optional[str]:
+        material = _creation_code_key(init_code)
+        if material is None:
+            return None
+        return self._key(b"deploy", material)
+
+    def transaction_key(self, to: Address, data: bytes, value: int) -> str:
+        return self._key(
+            b"transact", bytes.fromhex(str(to)[2:]) + value.to_bytes(32, "big") + data
+        )
+
+    def _key(self, kind: bytes, material: bytes) -> str:
+        return (
+            "0x" + keccak256(kind + self.chain_id.to_bytes(32, "big") + material).hex()
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(key)
+
+    def record(self, key: str, **entry: Any) -> None:
+        self.entries[key] = entry
+        self.save()
+
+    def code_hash(self, chain: Chain, address: Address) -> str:
+        communicator = chain.chain_interface._communicator
+        try:
+            proof = communicator.send_request("eth_getProof", [str(address), [], "latest"])
+            return proof["codeHash"]
+        except JsonRpcError:
+            # eth_getProof is not available on every node
+            return "0x" + keccak256(chain.chain_interface.get_code(str(address))).hex()
+
+    def verify(self, chain: Chain, entry: Dict[str, Any]) -> bool:
+        if "codeHash" not in entry:
+            return True
+        return self.code_hash(chain, Address(entry["address"])) == entry["codeHash"]
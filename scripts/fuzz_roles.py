@@ -0,0 +1,303 @@
+"""
+Differential fuzzing of the role state machines (change, lock, protected).
+
+Every role contract is driven next to a Python reference model and each call's
+outcome, success or the exact revert, is compared with what the model
+predicts. Runs are independent: each gets its own seed, its own process and
+its own local chain, so throughput grows with the number of cores. Results
+and transition coverage are merged once every run has finished; a failing
+run is reported with its seed so it can be replayed alone.
+
+    python -m scripts.fuzz_roles [-n PROCESSES] [-r RUNS] [--seed HEX]...
+
+Out of scope: OperatorRole. It is abstract in the generated pytypes (empty
+creation code) and the tree has no mock deploying it, so none of its
+transitions are fuzzed; the report lists it as not covered.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple, Type
+
+from woke.development.core import Contract
+from woke.testing import (
+    Account,
+    Address,
+    TransactionRevertedError,
+    default_chain,
+    may_revert,
+)
+from woke.testing.fuzzing import FuzzTest, flow, invariant, random_account
+
+from pytypes._codec import install as install_codecs
+from pytypes._dispatch import build as build_dispatch
+from pytypes._dispatch import install as install_dispatch
+from pytypes.contracts.common.access.roles.burner.burner import BurnerRole
+from pytypes.contracts.common.access.roles.fee.fee import FeeCollectorRole
+from pytypes.contracts.common.access.roles.minter.minter import MinterRole
+from pytypes.contracts.mocks.common.roles.burner.burner import MockBurner
+from pytypes.contracts.mocks.common.roles.minter.minter import MockMinter
+from pytypes.contracts.mocks.common.targets.fee.fee import MockFeeCollectorTarget
+
+
+@dataclass(frozen=True)
+class RoleSpec:
+    name: str
+    contract: Type[Contract]
+    holder: str
+    is_locked: str
+    change: str
+    lock: str
+    locked_error: Type[TransactionRevertedError]
+    change_event: Type
+    # mocks without a `protected()` entry point only fuzz change and lock
+    not_holder_error: Optional[Type[TransactionRevertedError]] = None
+
+
+# roles without a deployable mock, reported as not covered; OperatorRole gets
+# a RoleSpec once a mock for it is generated
+NOT_COVERED: Tuple[str, ...] = ("OperatorRole",)
+
+ROLES: Tuple[RoleSpec, ...] = (
+    RoleSpec(
+        "MinterRole",
+        MockMinter,
+        "minter",
+        "minterIsLocked",
+        "changeMinter",
+        "lockMinter",
+        MinterRole.MinterLocked,
+        MinterRole.MinterChange,
+        MinterRole.NotMinter,
+    ),
+    RoleSpec(
+        "BurnerRole",
+        MockBurner,
+        "burner",
+        "burnerIsLocked",
+        "changeBurner",
+        "lockBurner",
+        BurnerRole.BurnerLocked,
+        BurnerRole.BurnerChange,
+        BurnerRole.NotBurner,
+    ),
+    RoleSpec(
+        "FeeCollectorRole",
+        MockFeeCollectorTarget,
+        "feeCollector",
+        "feeCollectorIsLocked",
+        "changeFeeCollector",
+        "lockFeeCollector",
+        FeeCollectorRole.FeeCollectorLocked,
+        FeeCollectorRole.FeeCollectorChange,
+    ),
+)
+
+
+@dataclass
+class RoleModel:
+    holder: Address
+    locked: bool = False
+
+
+def _outcome(error: Optional[Exception]) -> str:
+    return "ok" if error is None else type(error).__name__
+
+
+class RoleFuzzTest(FuzzTest):
+    contracts: List[Contract]
+    models: List[RoleModel]
+
+    def __init__(self) -> None:
+        # (role, operation, locked before, outcome) -> hits
+        self.transitions: Counter = Counter()
+
+    def pre_sequence(self) -> None:
+        self.contracts = []
+        self.models = []
+        for spec in ROLES:
+            holder = random_account()
+            self.contracts.append(spec.contract.deploy(holder, from_=holder))
+            self.models.append(RoleModel(holder.address))
+
+    def _pick(
+        self, protected_only: bool = False
+    ) -> Tuple[RoleSpec, Contract, RoleModel]:
+        indexes = [
+            i
+            for i, spec in enumerate(ROLES)
+            if not protected_only or spec.not_holder_error is not None
+        ]
+        i = random.choice(indexes)
+        return ROLES[i], self.contracts[i], self.models[i]
+
+    def _check(
+        self,
+        spec: RoleSpec,
+        operation: str,
+        model: RoleModel,
+        error: Optional[Exception],
+        expected: Optional[Type[Exception]],
+    ) -> None:
+        self.transitions[(spec.name, operation, model.locked, _outcome(error))] += 1
+        assert type(error) is (expected or type(None)), (
+            f"{spec.name}.{operation}: contract gave {_outcome(error)}, "
+            f"model expected {expected.__name__ if expected else 'ok'}"
+        )
+
+    @flow(weight=60)
+    def flow_change(self) -> None:
+        spec, contract, model = self._pick()
+        sender: Account = random_account()
+        new_holder: Account = random_account()
+        with may_revert() as e:
+            tx = getattr(contract, spec.change)(
+                new_holder, from_=sender, return_tx=True
+            )
+        self._check(
+            spec, "change", model, e.value, spec.locked_error if model.locked else None
+        )
+        if e.value is None:
+            assert tx.events == [spec.change_event(new_holder.address)]
+            model.holder = new_holder.address
+
+    # the mocks expose change and lock without a caller check (only
+    # `protected()` reads msg.sender, checked against the mock bytecode), and
+    # locking an already locked role succeeds again, so any account may lock
+    @flow(weight=10)
+    def flow_lock(self) -> None:
+        spec, contract, model = self._pick()
+        with may_revert() as e:
+            getattr(contract, spec.lock)(from_=random_account())
+        self._check(spec, "lock", model, e.value, None)
+        model.locked = True
+
+    @flow(weight=30)
+    def flow_protected(self) -> None:
+        spec, contract, model = self._pick(protected_only=True)
+        sender: Account = random_account()
+        with may_revert() as e:
+            assert contract.protected(from_=sender)
+        self._check(
+            spec,
+            "protected",
+            model,
+            e.value,
+            None if sender.address == model.holder else spec.not_holder_error,
+        )
+
+    @invariant()
+    def invariant_state(self) -> None:
+        for spec, contract, model in zip(ROLES, self.contracts, self.models):
+            assert getattr(contract, spec.holder)() == model.holder, spec.name
+            assert getattr(contract, spec.is_locked)() == model.locked, spec.name
+
+
+@dataclass
+class RunResult:
+    seed: bytes
+    flows: int = 0
+    elapsed: float = 0.0
+    transitions: Counter = field(default_factory=Counter)
+    failure: Optional[str] = None
+
+
+def _run_one(seed: bytes, sequences: int, flows: int) -> RunResult:
+    # each worker opts in itself, whatever the start method of the pool
+    install_codecs()
+    install_dispatch()
+    random.seed(seed)
+    result = RunResult(seed)
+    test = RoleFuzzTest()
+    start = time.perf_counter()
+    try:
+        with default_chain.connect():
+            test.run(sequences, flows)
+    except Exception:
+        result.failure = (
+            f"sequence {getattr(test, '_sequence_num', 0)}, "
+            f"flow {getattr(test, '_flow_num', 0)}\n"
+            + traceback.format_exc()
+        )
+    result.elapsed = time.perf_counter() - start
+    result.transitions = test.transitions
+    result.flows = sum(test.transitions.values())
+    return result
+
+
+def fuzz(
+    seeds: Sequence[bytes], processes: int, sequences: int, flows: int
+) -> List[RunResult]:
+    # resolve the revert and event tables once so forked workers inherit them
+    build_dispatch()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(
+            pool.map(
+                _run_one,
+                seeds,
+                [sequences] * len(seeds),
+                [flows] * len(seeds),
+            )
+        )
+
+
+def report(results: Sequence[RunResult], wall_time: float, processes: int) -> bool:
+    merged: Counter = Counter()
+    for result in results:
+        merged.update(result.transitions)
+
+    print(f"{'role':<18} {'operation':<10} {'locked':<7} {'outcome':<20} {'hits':>8}")
+    for (role, operation, locked, outcome), hits in sorted(merged.items()):
+        print(f"{role:<18} {operation:<10} {str(locked):<7} {outcome:<20} {hits:>8}")
+    possible = sum(
+        (3 if spec.not_holder_error is not None else 2) * 2 for spec in ROLES
+    )
+    reached = len({key[:3] for key in merged})
+    print(f"\n{reached}/{possible} (role, operation, locked) states reached")
+    for role in NOT_COVERED:
+        print(f"{role}: not covered, no deployable mock")
+
+    failures = [r for r in results if r.failure is not None]
+    for result in failures:
+        print(f"\nrun with seed {result.seed.hex()} failed at {result.failure}")
+
+    total = sum(r.flows for r in results)
+    print(
+        f"{len(results)} runs, {total} flows in {wall_time:.1f}s, "
+        f"{total / wall_time:.1f} flows/s, {len(failures)} failed"
+    )
+    # 1.0 when every process was busy fuzzing for the whole wall time
+    busy = sum(r.elapsed for r in results)
+    print(f"parallel efficiency {busy / (wall_time * processes):.0%}")
+    return not failures
+
+
+def run(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-r", "--runs", type=int, default=None)
+    parser.add_argument(
+        "-s", "--seed", action="append", default=[], type=bytes.fromhex
+    )
+    parser.add_argument("--sequences", type=int, default=10)
+    parser.add_argument("--flows", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    seeds: List[bytes] = list(args.seed)
+    runs = args.runs if args.runs is not None else max(args.processes, len(seeds))
+    seeds += [os.urandom(8) for _ in range(runs - len(seeds))]
+
+    start = time.perf_counter()
+    results = fuzz(seeds, args.processes, args.sequences, args.flows)
+    return 0 if report(results, time.perf_counter() - start, args.processes) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,422 @@
+"""
+Declarative deployment pipeline for Woke deployment scripts.
+
+A plan is a list of `Deploy` and `Transact` steps. Steps reference each other
+through `Ref`, `Encoded`, `CreationCode` and `Computed` values in their
+arguments, which gives the dependency graph. `Pipeline.run` sends every step
+whose dependencies are mined without waiting for the previous one, using the
+nonces Woke tracks locally for the sender, and collects the receipts as they
+come in. With a `DeploymentCache`, steps already done on the chain are reused
+instead of being sent again.
+"""
+from __future__ import annotations
+
+import dataclasses
+import importlib
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+
+import woke.development.core
+from woke.development.core import Account, Address, Chain, Contract
+from woke.development.transactions import TransactionAbc, TransactionStatusEnum
+from woke.development.utils import get_create_address
+
+from pytypes._codec import codec_for
+from pytypes._creation_code import creation_code
+from scripts.deployment_cache import DeploymentCache
+
+ContractRef = Union[Type[Contract], str]
+
+
+@dataclasses.dataclass(frozen=True)
+class Ref:
+    """Address of the contract deployed (or captured) by another step."""
+
+    step: str
+
+
+@dataclasses.dataclass(frozen=True)
+class Encoded:
+    """Calldata of `contract.method(*args)`, e.g. initializer data for a proxy."""
+
+    contract: ContractRef
+    method: str
+    args: Tuple = ()
+
+
+@dataclasses.dataclass(frozen=True)
+class CreationCode:
+    """Creation code of `contract` with ABI-encoded constructor arguments."""
+
+    contract: ContractRef
+    args: Tuple = ()
+
+
+@dataclasses.dataclass(frozen=True)
+class Computed:
+    """
+    Value computed from the results of `needs` once they are mined, e.g. an
+    address read from a factory.
+    """
+
+    fn: Callable[[Dict[str, "StepResult"]], Any]
+    needs: Tuple[str, ...] = ()
+
+
+@dataclasses.dataclass
+class Deploy:
+    name: str
+    contract: ContractRef
+    args: Sequence[Any] = ()
+    after: Sequence[str] = ()
+    value: int = 0
+    gas_limit: Optional[int] = None
+
+
+@dataclasses.dataclass
+class Transact:
+    name: str
+    contract: ContractRef
+    target: Any
+    method: str
+    args: Sequence[Any] = ()
+    after: Sequence[str] = ()
+    value: int = 0
+    gas_limit: Optional[int] = None
+    # (event name, field) holding the address the step creates, if any
+    address_from: Optional[Tuple[str, str]] = None
+
+
+Step = Union[Deploy, Transact]
+
+
+@dataclasses.dataclass
+class StepResult:
+    step: Step
+    tx: Optional[TransactionAbc]
+    address: Optional[Address]
+
+
+class PipelineError(Exception):
+    def __init__(self, message: str, results: Dict[str, StepResult]) -> None:
+        super().__init__(message)
+        self.results = results
+
+
+def resolve_contract(contract: ContractRef) -> Type[Contract]:
+    if not isinstance(contract, str):
+        return contract
+    contracts_by_fqn = woke.development.core.contracts_by_fqn
+    if contract not in contracts_by_fqn:
+        raise ValueError(
+            f"Unknown contract {contract}, regenerate pytypes with `woke init pytypes`"
+        )
+    module_name, attrs = contracts_by_fqn[contract]
+    obj = getattr(importlib.import_module(module_name), attrs[0])
+    for attr in attrs[1:]:
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _walk(value: Any) -> Iterator[Any]:
+    yield value
+    if isinstance(value, (Encoded, CreationCode)):
+        value = value.args
+    elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+        value = [getattr(value, f.name) for f in dataclasses.fields(value)]
+    elif isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _walk(v)
+
+
+def _dependencies(step: Step) -> Tuple[Set[str], bool]:
+    values: List[Any] = list(step.args)
+    if isinstance(step, Transact):
+        values.append(step.target)
+    deps = set(step.after)
+    needs_state = False
+    for value in values:
+        for v in _walk(value):
+            if isinstance(v, Ref):
+                deps.add(v.step)
+            elif isinstance(v, Computed):
+                deps.update(v.needs)
+                needs_state = True
+    return deps, needs_state
+
+
+class Pipeline:
+    def __init__(
+        self,
+        steps: Sequence[Step],
+        *,
+        chain: Chain,
+        from_: Optional[Account] = None,
+        confirmations: int = 1,
+        max_in_flight: int = 16,
+        poll_interval: float = 1.0,
+        cache: Optional[DeploymentCache] = None,
+    ) -> None:
+        if confirmations < 1:
+            raise ValueError("confirmations must be at least 1")
+        self.chain = chain
+        self.cache = cache
+        self._keys: Dict[str, str] = {}
+        self.from_ = from_
+        self.confirmations = confirmations
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.steps: Dict[str, Step] = {}
+        for step in steps:
+            if step.name in self.steps:
+                raise ValueError(f"Duplicate step {step.name}")
+            self.steps[step.name] = step
+        self._deps: Dict[str, Set[str]] = {}
+        self._needs_state: Set[str] = set()
+        for name, step in self.steps.items():
+            deps, needs_state = _dependencies(step)
+            unknown = deps - self.steps.keys()
+            if unknown:
+                raise ValueError(f"Step {name} depends on unknown steps {sorted(unknown)}")
+            self._deps[name] = deps
+            if needs_state:
+                self._needs_state.add(name)
+        self.order = self._toposort()
+
+    def _toposort(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, int] = {}
+
+        def visit(name: str, path: Tuple[str, ...]) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + (name,))}")
+            state[name] = 1
+            for dep in sorted(self._deps[name]):
+                visit(dep, path + (name,))
+            state[name] = 2
+            order.append(name)
+
+        for name in self.steps:
+            visit(name, ())
+        return order
+
+    def _ready(self, name: str, submitted: Dict[str, StepResult], mined: Set[str]) -> bool:
+        deps = self._deps[name]
+        if deps <= mined:
+            return True
+        # gas estimation runs against the current state, so a step may only
+        # follow unmined dependencies when its gas limit is fixed
+        step = self.steps[name]
+        return (
+            step.gas_limit is not None
+            and name not in self._needs_state
+            and deps <= submitted.keys()
+            and all(submitted[d].address is not None for d in deps if self._refers_to(name, d))
+        )
+
+    def _refers_to(self, name: str, dep: str) -> bool:
+        step = self.steps[name]
+        values = list(step.args) + ([step.target] if isinstance(step, Transact) else [])
+        return any(isinstance(v, Ref) and v.step == dep for value in values for v in _walk(value))
+
+    def _resolve(self, value: Any, results: Dict[str, StepResult]) -> Any:
+        if isinstance(value, Ref):
+            address = results[value.step].address
+            if address is None:
+                raise ValueError(f"Step {value.step} did not produce an address")
+            return Account(address, self.chain)
+        elif isinstance(value, Computed):
+            return value.fn(results)
+        elif isinstance(value, Encoded):
+            cls = resolve_contract(value.contract)
+            func = getattr(cls, value.method)
+            args = self._resolve(value.args, results)
+            return func.selector + codec_for(cls._abi[func.selector]).encode(self.chain, args)
+        elif isinstance(value, CreationCode):
+            cls = resolve_contract(value.contract)
+            code = creation_code(cls)
+            if "constructor" not in cls._abi:
+                return code
+            args = self._resolve(value.args, results)
+            return code + codec_for(cls._abi["constructor"]).encode(self.chain, args)
+        elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+            return dataclasses.replace(
+                value,
+                **{
+                    f.name: self._resolve(getattr(value, f.name), results)
+                    for f in dataclasses.fields(value)
+                    if f.init
+                },
+            )
+        elif isinstance(value, list):
+            return [self._resolve(v, results) for v in value]
+        elif isinstance(value, tuple):
+            return tuple(self._resolve(v, results) for v in value)
+        elif isinstance(value, dict):
+            return {k: self._resolve(v, results) for k, v in value.items()}
+        return value
+
+    def _cache_key(self, step: Step, cls: Type[Contract], args: List, target: Any) -> Optional[str]:
+        assert self.cache is not None
+        if isinstance(step, Deploy):
+            init_code = self._resolve(CreationCode(cls, tuple(args)), {})
+            return self.cache.deployment_key(init_code)
+        selector = getattr(cls, step.method).selector
+        data = selector + codec_for(cls._abi[selector]).encode(self.chain, args)
+        return self.cache.transaction_key(target.address, data, step.value)
+
+    def _cached(self, step: Step, key: str) -> Optional[StepResult]:
+        assert self.cache is not None
+        entry = self.cache.get(key)
+        if entry is None or not self.cache.verify(self.chain, entry):
+            return None
+        address = entry.get("address")
+        return StepResult(step, None, Address(address) if address is not None else None)
+
+    def _record(self, name: str, result: StepResult) -> None:
+        key = self._keys.get(name)
+        if self.cache is None or key is None:
+            return
+        assert result.tx is not None
+        entry: Dict[str, Any] = {"step": name, "txHash": result.tx.tx_hash}
+        if result.address is not None:
+            entry["address"] = str(result.address)
+            entry["codeHash"] = self.cache.code_hash(self.chain, result.address)
+        self.cache.record(key, **entry)
+
+    def _submit(
+        self, step: Step, results: Dict[str, StepResult], skipped: Set[str]
+    ) -> StepResult:
+        cls = resolve_contract(step.contract)
+        args = self._resolve(list(step.args), results)
+        target = None
+        if isinstance(step, Transact):
+            target = self._resolve(step.target, results)
+
+        if self.cache is not None:
+            key = self._cache_key(step, cls, args, target)
+            if key is not None:
+                self._keys[step.name] = key
+                # a step is only reused when everything it builds on was
+                # reused too, otherwise e.g. a reset dev chain would skip
+                # transactions against freshly deployed contracts
+                if self._deps[step.name] <= skipped:
+                    cached = self._cached(step, key)
+                    if cached is not None:
+                        return cached
+
+        if isinstance(step, Deploy):
+            tx = cls.deploy(
+                *args,
+                from_=self.from_,
+                value=step.value,
+                gas_limit=step.gas_limit,
+                return_tx=True,
+                chain=self.chain,
+                confirmations=0,
+            )
+            return StepResult(step, tx, get_create_address(tx.from_, tx.nonce))
+
+        contract = cls(target, self.chain)
+        tx = getattr(contract, step.method)(
+            *args,
+            from_=self.from_,
+            value=step.value,
+            gas_limit=step.gas_limit,
+            confirmations=0,
+        )
+        return StepResult(step, tx, None)
+
+    def _finish(self, result: StepResult) -> Optional[str]:
+        step = result.step
+        tx = result.tx
+        assert tx is not None
+        if tx.status != TransactionStatusEnum.SUCCESS:
+            return repr(tx.error)
+        if isinstance(step, Transact) and step.address_from is not None:
+            event_name, field = step.address_from
+            for event in tx.events:
+                if getattr(event, "original_name", None) == event_name:
+                    value = getattr(event, field)
+                    if isinstance(value, Account):
+                        value = value.address
+                    result.address = Address(value)
+                    return None
+            return f"no {event_name} event emitted"
+        return None
+
+    def run(self) -> Dict[str, StepResult]:
+        results: Dict[str, StepResult] = {}
+        mined: Set[str] = set()
+        waiting = list(self.order)
+        in_flight: List[str] = []
+        failures: Dict[str, str] = {}
+        skipped: Set[str] = set()
+
+        while waiting or in_flight:
+            progressed = False
+            if not failures:
+                for name in list(waiting):
+                    if len(in_flight) >= self.max_in_flight:
+                        break
+                    if self._ready(name, results, mined):
+                        waiting.remove(name)
+                        result = self._submit(self.steps[name], results, skipped)
+                        results[name] = result
+                        if result.tx is None:
+                            mined.add(name)
+                            skipped.add(name)
+                        else:
+                            in_flight.append(name)
+                        progressed = True
+            if not in_flight:
+                if failures or not waiting:
+                    break
+                if progressed:
+                    continue
+                # only reachable when a dependency produced no address
+                raise PipelineError(f"Steps {waiting} cannot be scheduled", results)
+
+            latest = None
+            for name in list(in_flight):
+                tx = results[name].tx
+                assert tx is not None
+                if tx.status == TransactionStatusEnum.PENDING:
+                    continue
+                if self.confirmations > 1:
+                    if latest is None:
+                        latest = self.chain.chain_interface.get_block_number()
+                    if latest - tx.block_number < self.confirmations - 1:
+                        continue
+                in_flight.remove(name)
+                progressed = True
+                error = self._finish(results[name])
+                if error is None:
+                    mined.add(name)
+                    self._record(name, results[name])
+                else:
+                    failures[name] = error
+
+            if not progressed:
+                time.sleep(self.poll_interval)
+
+        if failures:
+            errors = ", ".join(f"{name}: {error}" for name, error in failures.items())
+            raise PipelineError(f"Deployment failed ({errors})", results)
+        return results
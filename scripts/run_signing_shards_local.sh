@@ -0,0 +1,22 @@
+#!/bin/bash
+
+# Starts $1 (default 3) signing server instances on ports 8080 and up that
+# split the senders of testPrivateKeys.json between them, against the local
+# hardhat node on 8545. Any instance takes any request; requests for the
+# senders of another instance are forwarded to it.
+count=${1:-3}
+
+peers=""
+for ((i = 0; i < count; i++)); do
+  peers+="http://127.0.0.1:$((8080 + i)),"
+done
+peers=${peers%,}
+
+cd "$(dirname "$0")/../SigningServer" &&
+go build -o /tmp/signing-server . || exit 1
+
+trap 'kill $(jobs -p) 2>/dev/null' EXIT
+for ((i = 0; i < count; i++)); do
+  /tmp/signing-server -listen "127.0.0.1:$((8080 + i))" -peers "$peers" &
+done
+wait
@@ -0,0 +1,203 @@
+import { ethers } from "hardhat";
+import { expect } from "chai";
+import { loadFixture } from "@nomicfoundation/hardhat-network-helpers";
+
+import { SignerWithAddress } from "@nomicfoundation/hardhat-ethers/signers";
+import { deployGenericToken, deployMockERC20HookLogic } from "../setup";
+import {
+  GenericToken,
+  MockAssetNFT,
+  MockERC20HookLogic,
+} from "../../typechain-types";
+import { GenericTokenConfigStruct } from "../../typechain-types/contracts/ERC20/GenericToken";
+
+describe("GenericTokenMintBatch", () => {
+  let mockERC20HookLogic: MockERC20HookLogic;
+  let token: GenericToken;
+  let assetGovernor: SignerWithAddress;
+  let admin: SignerWithAddress;
+  let minter: SignerWithAddress;
+  let feeCollector: SignerWithAddress;
+  let user1: SignerWithAddress;
+  let mockAssetNFT: MockAssetNFT;
+  const tokenValues = [
+    ethers.parseEther("100"),
+    ethers.parseEther("100"),
+    ethers.parseEther("250"),
+  ];
+  const tokenIDs = [1, 2, 3];
+  async function deployFixture() {
+    [assetGovernor, admin, minter, feeCollector, user1] =
+      await ethers.getSigners();
+    // deploy mock erc721
+    const mockAssetNFTBase = await ethers.getContractFactory("MockAssetNFT");
+    const mockAssetNFTDeployTx = await mockAssetNFTBase.deploy();
+    await mockAssetNFTDeployTx.waitForDeployment();
+    const mockAssetNFTAddress = await mockAssetNFTDeployTx.getAddress();
+    mockAssetNFT = await ethers.getContractAt(
+      "MockAssetNFT",
+      mockAssetNFTAddress
+    );
+    const tokenConfig: GenericTokenConfigStruct = {
+      name: "TestToken",
+      symbol: "TEST",
+      decimals: 18,
+      transferHook: ethers.ZeroAddress,
+      mintHook: ethers.ZeroAddress,
+      burnHook: ethers.ZeroAddress,
+      feeCollector: feeCollector.address,
+      admin: admin.address,
+      assetNFT: mockAssetNFTAddress,
+      feePercent: 0,
+      assetGovernor: assetGovernor.address,
+    };
+    token = await deployGenericToken("GenericToken", tokenConfig);
+    mockERC20HookLogic = await deployMockERC20HookLogic(
+      await token.getAddress()
+    );
+    // mint asset nfts to minter
+    for (let i = 0; i < tokenIDs.length; i++) {
+      await mockAssetNFT.mint(tokenValues[i], tokenIDs[i], minter.address);
+    }
+    // approve token to spend every nft of the minter
+    await mockAssetNFT
+      .connect(minter)
+      .setApprovalForAll(await token.getAddress(), true);
+  }
+
+  beforeEach(async () => {
+    await loadFixture(deployFixture);
+  });
+
+  describe("mintBatch", async () => {
+    it("should mint the summed value of every nft to the recipient", async () => {
+      const initialBalance = await token.balanceOf(user1.address);
+      await token.connect(minter).mintBatch(user1.address, tokenIDs);
+      const finalBalance = await token.balanceOf(user1.address);
+      const total = tokenValues.reduce((sum, value) => sum + value, BigInt(0));
+      expect(finalBalance).to.equal(initialBalance + total);
+      for (const tokenID of tokenIDs) {
+        expect(await mockAssetNFT.ownerOf(tokenID)).to.equal(
+          await token.getAddress()
+        );
+      }
+    });
+
+    it("should record every nft so that each can be burned for", async () => {
+      await token.connect(minter).mintBatch(user1.address, tokenIDs);
+      for (const value of tokenValues) {
+        await token.connect(user1).burn(value);
+      }
+      expect(await token.balanceOf(user1.address)).to.equal(0);
+      expect(await mockAssetNFT.balanceOf(user1.address)).to.equal(
+        tokenIDs.length
+      );
+    });
+
+    it("should run the mint hooks once with the summed value", async () => {
+      await mockERC20HookLogic.turnOnAfterHook();
+      const tx = await token
+        .connect(admin)
+        .setExtMintHook(await mockERC20HookLogic.getAddress());
+      await tx.wait();
+      await token.connect(minter).mintBatch(user1.address, tokenIDs);
+      const total = tokenValues.reduce((sum, value) => sum + value, BigInt(0));
+      expect(await mockERC20HookLogic.beforeMintTo()).to.equal(user1.address);
+      expect(await mockERC20HookLogic.beforeMintAmount()).to.equal(total);
+      expect(await mockERC20HookLogic.afterMintHookRan()).to.equal(true);
+    });
+
+    it("should fail to mint if any nft is not owned by caller", async () => {
+      await mockAssetNFT.mint(tokenValues[0], 4, user1.address);
+      const tx = token
+        .connect(minter)
+        .mintBatch(user1.address, [...tokenIDs, 4]);
+      await expect(tx).to.be.revertedWith(
+        "ERC721: transfer from incorrect owner"
+      );
+    });
+
+    it("should fail to mint while paused", async () => {
+      await token.connect(admin).pause();
+      const tx = token.connect(minter).mintBatch(user1.address, tokenIDs);
+      await expect(tx).to.be.revertedWith("Pausable: paused");
+    });
+
+    it("should fail to mint an empty batch", async () => {
+      const tx = token.connect(minter).mintBatch(user1.address, []);
+      await expect(tx).to.be.revertedWithCustomError(token, "EmptyMintBatch");
+    });
+
+    it("should fail to mint more than the max batch size", async () => {
+      const maxSize = await token.MAX_MINT_BATCH_SIZE();
+      const ids = Array.from({ length: Number(maxSize) + 1 }, (_, i) => i + 1);
+      const tx = token.connect(minter).mintBatch(user1.address, ids);
+      await expect(tx)
+        .to.be.revertedWithCustomError(token, "MintBatchTooLarge")
+        .withArgs(maxSize + BigInt(1), maxSize);
+    });
+  });
+
+  describe("gas", async () => {
+    it("should report the gas used per converted bar", async () => {
+      const tokenValue = ethers.parseEther("100");
+      // block gas limit of the chains the token is deployed to, a batch at
+      // MAX_MINT_BATCH_SIZE has to fit into one block
+      const blockGasLimit = BigInt(30_000_000);
+      let nextTokenID = 1000;
+      const mintNFTs = async (count: number) => {
+        const ids: number[] = [];
+        for (let i = 0; i < count; i++) {
+          await mockAssetNFT.mint(tokenValue, nextTokenID, minter.address);
+          ids.push(nextTokenID++);
+        }
+        return ids;
+      };
+      const mintBatchGas = async (batchSize: number) => {
+        const ids = await mintNFTs(batchSize);
+        const tx = await token.connect(minter).mintBatch(user1.address, ids);
+        const receipt = await tx.wait();
+        return receipt!.gasUsed;
+      };
+      const [single] = await mintNFTs(1);
+      const singleTx = await token
+        .connect(minter)
+        ["mint(address,uint256)"](user1.address, single);
+      const singleReceipt = await singleTx.wait();
+      const perSingleMint = singleReceipt!.gasUsed;
+      const rows = [{ call: "mint", "gas per bar": perSingleMint.toString() }];
+      const maxSize = Number(await token.MAX_MINT_BATCH_SIZE());
+      let perBarAt100 = BigInt(0);
+      for (const batchSize of [1, 10, 100, 500]) {
+        const call = `mintBatch(${batchSize})`;
+        if (batchSize > maxSize) {
+          const ids = await mintNFTs(batchSize);
+          await expect(token.connect(minter).mintBatch(user1.address, ids))
+            .to.be.revertedWithCustomError(token, "MintBatchTooLarge")
+            .withArgs(batchSize, maxSize);
+          rows.push({ call, "gas per bar": "reverts, above the cap" });
+          continue;
+        }
+        const gasPerBar = (await mintBatchGas(batchSize)) / BigInt(batchSize);
+        rows.push({ call, "gas per bar": gasPerBar.toString() });
+        if (batchSize > 1) {
+          expect(gasPerBar).to.be.lessThan(perSingleMint);
+        }
+        if (batchSize === 100) {
+          perBarAt100 = gasPerBar;
+        }
+      }
+      const fullBatchGas = await mintBatchGas(maxSize);
+      rows.push({
+        call: `mintBatch(${maxSize}), the cap`,
+        "gas per bar": (fullBatchGas / BigInt(maxSize)).toString(),
+      });
+      console.table(rows);
+      console.log(
+        `mintBatch(${maxSize}) used ${fullBatchGas} gas, a ${blockGasLimit} ` +
+          `gas block fits about ${blockGasLimit / perBarAt100} bars`
+      );
+      expect(fullBatchGas).to.be.lessThan(blockGasLimit);
+    });
+  });
+});
@@ -0,0 +1,210 @@
+import { ethers } from "hardhat";
+import { expect } from "chai";
+import { loadFixture } from "@nomicfoundation/hardhat-network-helpers";
+
+import { SignerWithAddress } from "@nomicfoundation/hardhat-ethers/signers";
+import { deployGenericToken, deployMockERC20HookLogic } from "../setup";
+import {
+  GenericToken,
+  MockAssetNFT,
+  MockERC20HookLogic,
+} from "../../typechain-types";
+import { GenericTokenConfigStruct } from "../../typechain-types/contracts/ERC20/GenericToken";
+
+describe("GenericTokenRedeem", () => {
+  let mockERC20HookLogic: MockERC20HookLogic;
+  let token: GenericToken;
+  let assetGovernor: SignerWithAddress;
+  let admin: SignerWithAddress;
+  let minter: SignerWithAddress;
+  let feeCollector: SignerWithAddress;
+  let user1: SignerWithAddress;
+  let mockAssetNFT: MockAssetNFT;
+  const large = ethers.parseEther("1000");
+  const medium = ethers.parseEther("100");
+  const small = ethers.parseEther("10");
+  // two large, three medium and ten small bars
+  const tokenValues: bigint[] = [
+    ...Array<bigint>(2).fill(large),
+    ...Array<bigint>(3).fill(medium),
+    ...Array<bigint>(10).fill(small),
+  ];
+  const tokenIDs = tokenValues.map((_, i) => i + 1);
+  const total = tokenValues.reduce((sum, value) => sum + value, BigInt(0));
+  async function deployFixture() {
+    [assetGovernor, admin, minter, feeCollector, user1] =
+      await ethers.getSigners();
+    // deploy mock erc721
+    const mockAssetNFTBase = await ethers.getContractFactory("MockAssetNFT");
+    const mockAssetNFTDeployTx = await mockAssetNFTBase.deploy();
+    await mockAssetNFTDeployTx.waitForDeployment();
+    const mockAssetNFTAddress = await mockAssetNFTDeployTx.getAddress();
+    mockAssetNFT = await ethers.getContractAt(
+      "MockAssetNFT",
+      mockAssetNFTAddress
+    );
+    const tokenConfig: GenericTokenConfigStruct = {
+      name: "TestToken",
+      symbol: "TEST",
+      decimals: 18,
+      transferHook: ethers.ZeroAddress,
+      mintHook: ethers.ZeroAddress,
+      burnHook: ethers.ZeroAddress,
+      feeCollector: feeCollector.address,
+      admin: admin.address,
+      assetNFT: mockAssetNFTAddress,
+      feePercent: 0,
+      assetGovernor: assetGovernor.address,
+    };
+    token = await deployGenericToken("GenericToken", tokenConfig);
+    mockERC20HookLogic = await deployMockERC20HookLogic(
+      await token.getAddress()
+    );
+    // convert every asset nft of the minter to tokens for user1
+    for (let i = 0; i < tokenIDs.length; i++) {
+      await mockAssetNFT.mint(tokenValues[i], tokenIDs[i], minter.address);
+    }
+    await mockAssetNFT
+      .connect(minter)
+      .setApprovalForAll(await token.getAddress(), true);
+    await token.connect(minter).mintBatch(user1.address, tokenIDs);
+  }
+
+  beforeEach(async () => {
+    await loadFixture(deployFixture);
+  });
+
+  describe("available values", async () => {
+    it("should index every value with an nft", async () => {
+      const values = await token.getAvailableValues();
+      expect(values).to.have.members([large, medium, small]);
+      expect(await token.getAvailableNFTCount(large)).to.equal(2);
+      expect(await token.getAvailableNFTCount(medium)).to.equal(3);
+      expect(await token.getAvailableNFTCount(small)).to.equal(10);
+    });
+
+    it("should drop a value once its last nft is burned for", async () => {
+      await token.connect(user1).burn(large);
+      await token.connect(user1).burn(large);
+      const values = await token.getAvailableValues();
+      expect(values).to.not.include(large);
+      expect(await token.getAvailableNFTCount(large)).to.equal(0);
+    });
+
+    it("should only index values that have nfts", async () => {
+      await token
+        .connect(admin)
+        .indexAvailableValues([large, ethers.parseEther("5")]);
+      const values = await token.getAvailableValues();
+      expect(values).to.have.members([large, medium, small]);
+    });
+
+    it("should only let the admin index values", async () => {
+      const defaultAdminRole = await token.DEFAULT_ADMIN_ROLE();
+      const tx = token.connect(user1).indexAvailableValues([large]);
+      await expect(tx).to.be.revertedWith(
+        `AccessControl: account ${user1.address.toLowerCase()} is missing role ${defaultAdminRole}`
+      );
+    });
+  });
+
+  describe("redeem", async () => {
+    it("should redeem several bars across values in one call", async () => {
+      const amount = large + medium * BigInt(2) + small * BigInt(3);
+      const initialBalance = await token.balanceOf(user1.address);
+      await token.connect(user1).redeem(amount, [large, medium, small]);
+      expect(await token.balanceOf(user1.address)).to.equal(
+        initialBalance - amount
+      );
+      expect(await mockAssetNFT.balanceOf(user1.address)).to.equal(6);
+      expect(await token.getAvailableNFTCount(large)).to.equal(1);
+      expect(await token.getAvailableNFTCount(medium)).to.equal(1);
+      expect(await token.getAvailableNFTCount(small)).to.equal(7);
+    });
+
+    it("should fall back to smaller values when a value runs out", async () => {
+      // four medium bars are asked for, only three exist
+      await token.connect(user1).redeem(medium * BigInt(4), [medium, small]);
+      expect(await token.getAvailableNFTCount(medium)).to.equal(0);
+      expect(await token.getAvailableNFTCount(small)).to.equal(0);
+      expect(await token.getAvailableValues()).to.deep.equal([large]);
+    });
+
+    it("should redeem every bar and empty the index", async () => {
+      await token.connect(user1).redeem(total, [large, medium, small]);
+      expect(await token.balanceOf(user1.address)).to.equal(0);
+      expect(await mockAssetNFT.balanceOf(user1.address)).to.equal(
+        tokenIDs.length
+      );
+      expect(await token.getAvailableValues()).to.deep.equal([]);
+    });
+
+    it("should fail to redeem an amount the bars do not add up to", async () => {
+      const amount = medium + BigInt(1);
+      await expect(token.connect(user1).redeem(amount, [medium, small]))
+        .to.be.revertedWithCustomError(token, "NoNFTsForAmount")
+        .withArgs(amount, BigInt(1));
+    });
+
+    it("should fail to redeem a zero amount", async () => {
+      await expect(
+        token.connect(user1).redeem(0, [large, medium, small])
+      ).to.be.revertedWithCustomError(token, "ZeroAmount");
+    });
+
+    it("should fail to redeem with denominations that are not descending", async () => {
+      await expect(
+        token.connect(user1).redeem(medium + small, [small, medium])
+      ).to.be.revertedWithCustomError(token, "InvalidDenominations");
+      await expect(
+        token.connect(user1).redeem(medium * BigInt(2), [medium, medium])
+      ).to.be.revertedWithCustomError(token, "InvalidDenominations");
+      await expect(
+        token.connect(user1).redeem(medium, [medium, BigInt(0)])
+      ).to.be.revertedWithCustomError(token, "InvalidDenominations");
+    });
+
+    it("should run the burn hooks once with the redeemed amount", async () => {
+      await mockERC20HookLogic.turnOnAfterHook();
+      const tx = await token
+        .connect(admin)
+        .setExtBurnHook(await mockERC20HookLogic.getAddress());
+      await tx.wait();
+      const amount = medium * BigInt(3);
+      await token.connect(user1).redeem(amount, [medium]);
+      expect(await mockERC20HookLogic.beforeBurnFrom()).to.equal(
+        user1.address
+      );
+      expect(await mockERC20HookLogic.beforeBurnAmount()).to.equal(amount);
+      expect(await mockERC20HookLogic.beforeBurnCalls()).to.equal(1);
+      expect(await mockERC20HookLogic.afterBurnCalls()).to.equal(1);
+    });
+
+    it("should fail to redeem while paused", async () => {
+      await token.connect(admin).pause();
+      const tx = token.connect(user1).redeem(total, [large, medium, small]);
+      await expect(tx).to.be.revertedWith("Pausable: paused");
+    });
+  });
+
+  describe("gas", async () => {
+    it("should report the gas of one redeem against one burn per bar", async () => {
+      const snapshot = await ethers.provider.send("evm_snapshot", []);
+      let burnGas = BigInt(0);
+      for (const value of tokenValues) {
+        const tx = await token.connect(user1).burn(value);
+        burnGas += (await tx.wait())!.gasUsed;
+      }
+      await ethers.provider.send("evm_revert", [snapshot]);
+      const tx = await token
+        .connect(user1)
+        .redeem(total, [large, medium, small]);
+      const redeemGas = (await tx.wait())!.gasUsed;
+      console.table([
+        { call: `burn x${tokenValues.length}`, gas: burnGas.toString() },
+        { call: "redeem", gas: redeemGas.toString() },
+      ]);
+      expect(redeemGas).to.be.lessThan(burnGas);
+    });
+  });
+});
@@ -0,0 +1,27 @@
+from typing import Iterator
+
+import pytest
+from woke.testing import default_chain
+
+from pytypes._codec import install as install_codecs
+from pytypes._dispatch import install as install_dispatch
+from tests.role_fixtures import FixturePool, RoleFixtures
+
+# route the chain requests of every test through the cached method codecs,
+# and revert and event decoding through the resolved dispatch tables
+install_codecs()
+install_dispatch()
+
+
+@pytest.fixture(scope="session")
+def fixture_pool():
+    # one connection and one set of deployments per `woke test` worker;
+    # tests using the pool must not connect the chain themselves
+    with default_chain.connect():
+        yield FixturePool(default_chain)
+
+
+@pytest.fixture
+def roles(fixture_pool: FixturePool) -> Iterator[RoleFixtures]:
+    with fixture_pool.isolated() as fixtures:
+        yield fixtures
@@ -0,0 +1,71 @@
+"""
+Shared deployments for Woke tests, isolated with chain snapshots.
+
+The role mocks and tooling factories are deployed once per chain (so once per
+`woke test -n` worker). Every test then runs against a snapshot of that state
+and the chain is reverted when the test finishes.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from woke.development.core import Account, Chain
+
+from pytypes.contracts.common.tooling.deployment.deployer.deployer import CreateFactory
+from pytypes.contracts.common.tooling.deployment.factory.factory import GenericFactory
+from pytypes.contracts.mocks.common.roles.burner.burner import MockBurner
+from pytypes.contracts.mocks.common.roles.minter.minter import MockMinter
+from pytypes.contracts.mocks.common.targets.fee.fee import MockFeeCollectorTarget
+
+
+@dataclass(frozen=True)
+class RoleFixtures:
+    owner: Account
+    minter: MockMinter
+    burner: MockBurner
+    fee_collector_target: MockFeeCollectorTarget
+    generic_factory: GenericFactory
+    create_factory: CreateFactory
+
+
+def deploy_role_fixtures(chain: Chain, owner: Optional[Account] = None) -> RoleFixtures:
+    """
+    Deploys the canonical set from scratch; every role is assigned to `owner`.
+    """
+    if owner is None:
+        owner = chain.accounts[0]
+    return RoleFixtures(
+        owner=owner,
+        minter=MockMinter.deploy(owner, from_=owner, chain=chain),
+        burner=MockBurner.deploy(owner, from_=owner, chain=chain),
+        fee_collector_target=MockFeeCollectorTarget.deploy(
+            owner, from_=owner, chain=chain
+        ),
+        generic_factory=GenericFactory.deploy(from_=owner, chain=chain),
+        create_factory=CreateFactory.deploy(from_=owner, chain=chain),
+    )
+
+
+class FixturePool:
+    def __init__(self, chain: Chain, owner: Optional[Account] = None) -> None:
+        self.chain = chain
+        self._owner = owner
+        self._fixtures: Optional[RoleFixtures] = None
+
+    @property
+    def fixtures(self) -> RoleFixtures:
+        if self._fixtures is None:
+            self._fixtures = deploy_role_fixtures(self.chain, self._owner)
+        return self._fixtures
+
+    @contextmanager
+    def isolated(self) -> Iterator[RoleFixtures]:
+        fixtures = self.fixtures
+        # a snapshot is consumed by the revert, so each test takes its own
+        snapshot_id = self.chain.snapshot()
+        try:
+            yield fixtures
+        finally:
+            self.chain.revert(snapshot_id)
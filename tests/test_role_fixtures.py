@@ -0,0 +1,27 @@
+from woke.testing import default_chain, must_revert
+
+from pytypes.contracts.common.access.roles.minter.minter import MinterRole
+from tests.role_fixtures import FixturePool, RoleFixtures
+
+
+def test_roles_start_from_the_shared_deployment(roles: RoleFixtures):
+    assert roles.minter.minter() == roles.owner.address
+    assert not roles.minter.minterIsLocked()
+    assert roles.burner.burner() == roles.owner.address
+    assert roles.fee_collector_target.feeCollector() == roles.owner.address
+
+
+def test_isolated_reverts_role_changes(fixture_pool: FixturePool):
+    other = default_chain.accounts[1]
+    with fixture_pool.isolated() as fixtures:
+        fixtures.minter.changeMinter(other, from_=fixtures.owner)
+        fixtures.minter.lockMinter(from_=other)
+        assert fixtures.minter.minter() == other.address
+        assert fixtures.minter.minterIsLocked()
+        with must_revert(MinterRole.MinterLocked):
+            fixtures.minter.changeMinter(fixtures.owner, from_=other)
+
+    # the next test's context must not see the change or the lock
+    with fixture_pool.isolated() as fixtures:
+        assert fixtures.minter.minter() == fixtures.owner.address
+        assert not fixtures.minter.minterIsLocked()